@@ -0,0 +1,302 @@
+# Agregados do painel calculados em blocos, para exportações maiores que a memória.
+# Cada bloco do CSV gera um ResumoPainel parcial (contagens e somas), e os parciais
+# são combinados somando os contadores. Como nada depende da divisão em blocos, o
+# resultado é idêntico ao de resumir o conjunto inteiro em memória. Com --comparar,
+# cada tabela do resumo em blocos é conferida com a do cubo (cubo.py) e a
+# frequência de palavras com a do IndicePalavras, calculados com o conjunto inteiro.
+#
+# Uso: python agregados.py publicacoes_analizadas.csv --tamanho-bloco 100000 --comparar
+import argparse
+import heapq
+import json
+from collections import Counter, namedtuple
+
+import pandas as pd
+
+import cubo
+from cubo import (
+    EPOCA,
+    GRANULARIDADE_PADRAO,
+    QUANTIDADE_USUARIOS_PADRAO,
+    TIPOS_VISUALIZACOES,
+    CuboAgregado,
+    FatiaCubo,
+    periodo_de_dias,
+    rotulo_mes,
+    tabela_periodos,
+)
+from dados import NAO_E_DISCURSO_ODIO, ROTULOS_ODIO, ler_publicacoes, ler_textos
+from palavras import IndicePalavras, tokenizar
+
+# Filtros do painel; None em qualquer campo significa "sem restrição"
+FiltrosPainel = namedtuple("FiltrosPainel", ["data_inicio", "data_fim", "discursos", "emocoes"])
+SEM_FILTROS = FiltrosPainel(None, None, None, None)
+
+METRICAS_DISCURSO = ["contagem", "upvotes", "comentarios", "visualizacoes"]
+
+# Tabelas do ResumoPainel e as funções equivalentes do cubo, usadas em comparar_com_cubo
+TABELAS_CUBO = {
+    "tabela_contagem_odio": FatiaCubo.contagem_odio,
+    "tabela_tipos_discurso": cubo.tabela_tipos_discurso,
+    "tabela_emocoes": cubo.tabela_emocoes,
+    "tabela_frequencia_tipo": cubo.tabela_frequencia_tipo,
+    "tabela_media_likes": cubo.tabela_media_likes,
+    "tabela_visualizacoes": cubo.tabela_visualizacoes,
+    "tabela_frequencia_usuario": cubo.tabela_frequencia_usuario,
+    "tabela_comentarios": cubo.tabela_comentarios,
+}
+
+COLUNAS_BLOCO = ["usuario", "texto", "upvotes", "comentarios", "visualizacoes",
+                 "hora_postagem", "resultado_analise", "emocao"]
+
+
+def mascara_filtros(bloco, filtros):
+    # Mesma semântica dos filtros do app: datas inclusivas; datas, tipos e emoções
+    # ausentes nunca passam pelo filtro
+    datas = bloco["hora_postagem"].dt.normalize()
+    mascara = datas.notna() & bloco["resultado_analise"].notna() & bloco["emocao"].notna()
+    if filtros.data_inicio is not None:
+        mascara &= datas >= pd.Timestamp(filtros.data_inicio)
+    if filtros.data_fim is not None:
+        mascara &= datas <= pd.Timestamp(filtros.data_fim)
+    if filtros.discursos is not None:
+        mascara &= bloco["resultado_analise"].isin(list(filtros.discursos))
+    if filtros.emocoes is not None:
+        mascara &= bloco["emocao"].isin(list(filtros.emocoes))
+    return mascara.to_numpy()
+
+
+def mais_frequentes(contagem, quantidade):
+    # Como Counter.most_common, mas com empates desempatados pela chave, para que o
+    # resultado não dependa da ordem em que os blocos foram combinados. Com um heap,
+    # só os `quantidade` primeiros são ordenados.
+    return heapq.nsmallest(quantidade, contagem.items(), key=lambda item: (-item[1], item[0]))
+
+
+class ResumoPainel:
+    def __init__(self):
+        self.contagem_odio = Counter()
+        self.por_discurso = {metrica: Counter() for metrica in METRICAS_DISCURSO}
+        self.discurso_emocao = Counter()
+        # Contagem diária por tipo; a série temporal é reagrupada por período a partir dela
+        self.dia_discurso = Counter()
+        self.usuarios_odio = Counter()
+        # Engajamento (upvotes + comentários) das publicações de ódio de cada usuário
+        self.engajamento_usuarios_odio = Counter()
+        self.palavras_odio = Counter()
+
+    @classmethod
+    def de_bloco(cls, bloco, filtros=SEM_FILTROS, incluir_palavras=True):
+        # bloco: DataFrame com as colunas de COLUNAS_BLOCO (texto é opcional)
+        resumo = cls()
+        bloco = bloco[mascara_filtros(bloco, filtros)]
+        if bloco.empty:
+            return resumo
+
+        discurso = bloco["resultado_analise"].astype(str)
+        odio = (bloco["resultado_analise"] != NAO_E_DISCURSO_ODIO).to_numpy()
+
+        resumo.contagem_odio.update({ROTULOS_ODIO[0]: int(odio.sum()), ROTULOS_ODIO[1]: int((~odio).sum())})
+        resumo.por_discurso["contagem"].update(discurso.value_counts().to_dict())
+        for metrica in METRICAS_DISCURSO[1:]:
+            resumo.por_discurso[metrica].update(
+                bloco[metrica].astype("int64").groupby(discurso.to_numpy()).sum().to_dict()
+            )
+
+        emocao = bloco["emocao"].astype(str)
+        resumo.discurso_emocao.update(
+            pd.DataFrame({"r": discurso[odio], "e": emocao[odio]}).value_counts().to_dict()
+        )
+        dias = (bloco["hora_postagem"].to_numpy(dtype="datetime64[D]") - EPOCA).astype("int64")
+        resumo.dia_discurso.update(
+            pd.DataFrame({"d": dias, "r": discurso.to_numpy()}).value_counts().to_dict()
+        )
+        usuarios = bloco["usuario"][odio].astype(str)
+        resumo.usuarios_odio.update(usuarios.value_counts().to_dict())
+        engajamento = bloco["upvotes"][odio].astype("int64") + bloco["comentarios"][odio].astype("int64")
+        resumo.engajamento_usuarios_odio.update(engajamento.groupby(usuarios.to_numpy()).sum().to_dict())
+
+        if incluir_palavras and "texto" in bloco.columns:
+            for texto in bloco["texto"][odio].fillna(""):
+                resumo.palavras_odio.update(tokenizar(texto))
+        return resumo
+
+    def combinar(self, outro):
+        # Soma os contadores de outro resumo parcial a este
+        self.contagem_odio.update(outro.contagem_odio)
+        for metrica in METRICAS_DISCURSO:
+            self.por_discurso[metrica].update(outro.por_discurso[metrica])
+        self.discurso_emocao.update(outro.discurso_emocao)
+        self.dia_discurso.update(outro.dia_discurso)
+        self.usuarios_odio.update(outro.usuarios_odio)
+        self.engajamento_usuarios_odio.update(outro.engajamento_usuarios_odio)
+        self.palavras_odio.update(outro.palavras_odio)
+        return self
+
+    # Tabelas no mesmo formato das funções tabela_* de cubo.py
+
+    def tabela_contagem_odio(self):
+        contagem = pd.Series({r: self.contagem_odio[r] for r in ROTULOS_ODIO}, name="count")
+        return contagem[contagem > 0]
+
+    def tabela_tipos_discurso(self):
+        contagem = pd.Series(self.por_discurso["contagem"], dtype="int64")
+        contagem = contagem[contagem > 0].sort_index().sort_values(ascending=False, kind="stable")
+        return pd.DataFrame({"Tipo de Discurso": contagem.index, "Quantidade": contagem.to_numpy()})
+
+    def tabela_emocoes(self):
+        itens = sorted(self.discurso_emocao.items())
+        return pd.DataFrame(
+            [(r, e, c) for (r, e), c in itens], columns=["resultado_analise", "emocao", "count"]
+        )
+
+    def contagem_por_periodo(self, granularidade=GRANULARIDADE_PADRAO):
+        # {(periodo, resultado_analise): quantidade} a partir das contagens diárias
+        contagem = Counter()
+        if self.dia_discurso:
+            dias, discursos = zip(*self.dia_discurso)
+            periodos = periodo_de_dias(list(dias), granularidade).tolist()
+            for periodo, discurso, quantidade in zip(periodos, discursos, self.dia_discurso.values()):
+                contagem[(periodo, discurso)] += quantidade
+        return contagem
+
+    def tabela_frequencia_tipo(self, granularidade=GRANULARIDADE_PADRAO):
+        itens = sorted((p, r, c) for (p, r), c in self.contagem_por_periodo(granularidade).items())
+        return tabela_periodos([p for p, _, _ in itens], [r for _, r, _ in itens],
+                               [c for _, _, c in itens], granularidade)
+
+    def tabela_media_likes(self):
+        contagem = pd.Series(self.por_discurso["contagem"], dtype="int64").sort_index()
+        contagem = contagem[contagem > 0]
+        soma = pd.Series(self.por_discurso["upvotes"], dtype="int64").reindex(contagem.index, fill_value=0)
+        return pd.DataFrame({"Tipo de Discurso": contagem.index, "Média de Likes": (soma / contagem).to_numpy()})
+
+    def tabela_visualizacoes(self):
+        contagem = self.por_discurso["contagem"]
+        totais = {r: self.por_discurso["visualizacoes"][r] for r in sorted(contagem) if contagem[r] > 0}
+        for tipo in TIPOS_VISUALIZACOES:
+            totais.setdefault(tipo, 0)
+        tabela = pd.DataFrame({"resultado_analise": list(totais), "visualizacoes": list(totais.values())})
+        return tabela.sort_values("visualizacoes", ascending=False, kind="stable")
+
+    def tabela_frequencia_usuario(self, quantidade=QUANTIDADE_USUARIOS_PADRAO):
+        tabela = pd.DataFrame(mais_frequentes(self.usuarios_odio, quantidade),
+                              columns=["usuario", "quantidade_postagens"])
+        total = sum(self.engajamento_usuarios_odio.values())
+        engajamento = [self.engajamento_usuarios_odio[usuario] for usuario in tabela["usuario"]]
+        tabela["participacao_engajamento"] = [e / total if total else 0.0 for e in engajamento]
+        return tabela
+
+    def tabela_comentarios(self):
+        contagem = self.por_discurso["contagem"]
+        itens = [(r, self.por_discurso["comentarios"][r]) for r in sorted(contagem)
+                 if contagem[r] > 0 and r != NAO_E_DISCURSO_ODIO]
+        return pd.DataFrame(itens, columns=["resultado_analise", "comentarios"])
+
+    def para_dict(self):
+        return {
+            "contagem_odio": dict(self.contagem_odio),
+            "por_discurso": {m: dict(c) for m, c in self.por_discurso.items()},
+            "discurso_emocao": {f"{r}|{e}": c for (r, e), c in self.discurso_emocao.items()},
+            "mes_discurso": {f"{rotulo_mes(m)}|{r}": c for (m, r), c in self.contagem_por_periodo("mes").items()},
+            "usuarios_odio_top": dict(mais_frequentes(self.usuarios_odio, 20)),
+            "palavras_odio_top": dict(mais_frequentes(self.palavras_odio, 50)),
+        }
+
+    def __eq__(self, outro):
+        return (
+            self.contagem_odio == outro.contagem_odio
+            and self.por_discurso == outro.por_discurso
+            and self.discurso_emocao == outro.discurso_emocao
+            and self.dia_discurso == outro.dia_discurso
+            and self.usuarios_odio == outro.usuarios_odio
+            and self.engajamento_usuarios_odio == outro.engajamento_usuarios_odio
+            and self.palavras_odio == outro.palavras_odio
+        )
+
+
+def ler_blocos(caminho_arquivo, tamanho_bloco=100_000, incluir_palavras=True):
+    # Gera os blocos do CSV com as colunas usadas pelos agregados
+    colunas = pd.read_csv(caminho_arquivo, nrows=0).columns
+    usar = [c for c in COLUNAS_BLOCO if c in colunas and (incluir_palavras or c != "texto")]
+    tipos = {"usuario": "string", "texto": "string", "resultado_analise": "string", "emocao": "string",
+             "upvotes": "int64", "comentarios": "int64", "visualizacoes": "int64"}
+    for bloco in pd.read_csv(caminho_arquivo, usecols=usar, dtype={c: tipos[c] for c in usar if c in tipos},
+                             chunksize=tamanho_bloco):
+        bloco["hora_postagem"] = pd.to_datetime(bloco["hora_postagem"], errors="coerce")
+        yield bloco
+
+
+def resumir_csv_em_blocos(caminho_arquivo, filtros=SEM_FILTROS, tamanho_bloco=100_000, incluir_palavras=True):
+    # Uma passada pelo CSV; a memória usada é limitada pelo tamanho do bloco
+    resumo = ResumoPainel()
+    for bloco in ler_blocos(caminho_arquivo, tamanho_bloco, incluir_palavras):
+        resumo.combinar(ResumoPainel.de_bloco(bloco, filtros, incluir_palavras))
+    return resumo
+
+
+def comparar_com_cubo(resumo, dados, textos=None, filtros=SEM_FILTROS):
+    # Confere cada tabela do resumo com a calculada pelo cubo sobre o conjunto em
+    # memória (e, com textos, a frequência de palavras com a do IndicePalavras);
+    # devolve os nomes das que diferem
+    datas = dados["hora_postagem"].dropna().dt.date
+    limites = [
+        filtros.data_inicio if filtros.data_inicio is not None else min(datas, default=EPOCA),
+        filtros.data_fim if filtros.data_fim is not None else max(datas, default=EPOCA),
+    ]
+    discursos = filtros.discursos if filtros.discursos is not None else dados["resultado_analise"].dropna().unique()
+    emocoes = filtros.emocoes if filtros.emocoes is not None else dados["emocao"].dropna().unique()
+    fatia = CuboAgregado(dados).fatiar(*limites, discursos, emocoes)
+
+    diferentes = []
+    for nome, funcao in TABELAS_CUBO.items():
+        esperada = funcao(fatia).astype(str).to_numpy().tolist()
+        if getattr(resumo, nome)().astype(str).to_numpy().tolist() != esperada:
+            diferentes.append(nome)
+    if textos is not None:
+        odio = [d for d in discursos if d != NAO_E_DISCURSO_ODIO]
+        palavras = IndicePalavras.construir(dados, textos).frequencias(*limites, odio, emocoes)
+        if +palavras != +resumo.palavras_odio:
+            diferentes.append("palavras_odio")
+    return diferentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume os agregados do painel lendo o CSV em blocos.")
+    parser.add_argument("csv", help="CSV de publicações analisadas")
+    parser.add_argument("--tamanho-bloco", type=int, default=100_000)
+    parser.add_argument("--sem-palavras", action="store_true", help="Não calcula a frequência de palavras")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resumo")
+    parser.add_argument("--comparar", action="store_true",
+                        help="Confere as tabelas do resultado em blocos com as do cubo em memória")
+    parser.add_argument("--trabalhadores", type=int, default=1,
+                        help="Processa os blocos em paralelo com N processos (padrão: 1, em série)")
+    args = parser.parse_args()
+
+    incluir_palavras = not args.sem_palavras
+    if args.trabalhadores > 1:
+        from paralelo import MotorAgregacao
+        motor = MotorAgregacao(args.trabalhadores)
+        blocos = ler_blocos(args.csv, args.tamanho_bloco, incluir_palavras)
+        resumo = motor.resumir_blocos(blocos, incluir_palavras=incluir_palavras)
+        motor.fechar()
+    else:
+        resumo = resumir_csv_em_blocos(args.csv, tamanho_bloco=args.tamanho_bloco, incluir_palavras=incluir_palavras)
+
+    if args.comparar:
+        textos = ler_textos(args.csv) if incluir_palavras else None
+        diferentes = comparar_com_cubo(resumo, ler_publicacoes(args.csv), textos)
+        if diferentes:
+            raise SystemExit(f"O resumo em blocos difere do cubo em memória: {', '.join(diferentes)}")
+        print("Tabelas do resumo em blocos idênticas às do cubo em memória.")
+
+    conteudo = json.dumps(resumo.para_dict(), ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+    else:
+        print(conteudo)
+
+
+if __name__ == "__main__":
+    main()
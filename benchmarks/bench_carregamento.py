@@ -0,0 +1,102 @@
+# Compara o carregamento a frio do pd.read_csv original com o carregador
+# colunar (Parquet, apenas as colunas do painel). Cada medição roda em um
+# processo novo para que caches do interpretador não distorçam o resultado. A
+# memória é a residente do processo depois do carregamento (interpretador,
+# pyarrow e alocador incluídos) e quanto ela cresceu com o carregamento; o
+# tamanho do próprio DataFrame (memory_usage(deep=True)) vai em uma coluna à
+# parte. O Parquet é gerado em um diretório temporário, para não mudar a fonte de
+# dados usada pelo app.
+# Uso: python benchmarks/bench_carregamento.py publicacoes_analizadas.csv
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO_MEDICAO = """
+import resource, sys, time
+sys.path.insert(0, {raiz!r})
+import pandas as pd
+import dados
+from instrumentacao import memoria_atual_mb
+
+def residente_mb():
+    # /proc/self/statm; sem ele, o pico do processo (ru_maxrss: KiB no Linux,
+    # bytes no macOS)
+    atual = memoria_atual_mb()
+    if atual is not None:
+        return atual
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (2**20 if sys.platform == "darwin" else 2**10)
+
+residente_antes = residente_mb()
+inicio = time.perf_counter()
+{carregar}
+duracao = time.perf_counter() - inicio
+residente = residente_mb()
+print(duracao, residente, residente - residente_antes, df.memory_usage(deep=True).sum() / 2**20, len(df))
+"""
+
+CARREGADORES = {
+    "csv_original": "df = pd.read_csv({caminho!r})",
+    "csv_tipado": "df = dados.ler_publicacoes({caminho!r})",
+    "colunar_completo": "df = dados.ler_publicacoes({colunar!r})",
+    "colunar_painel": "df = dados.ler_publicacoes({colunar!r}, dados.COLUNAS_PAINEL)",
+}
+
+
+def medir(codigo_carregar, repeticoes):
+    medicoes = []
+    for _ in range(repeticoes):
+        codigo = CODIGO_MEDICAO.format(raiz=RAIZ, carregar=codigo_carregar)
+        saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+        *valores, linhas = saida.stdout.split()
+        medicoes.append([float(valor) for valor in valores] + [int(linhas)])
+    # Mediana do tempo; memória residente do pior caso
+    tempos = sorted(m[0] for m in medicoes)
+    pior = max(medicoes, key=lambda m: m[1])
+    return {
+        "tempo_s": tempos[len(tempos) // 2],
+        "memoria_residente_mb": pior[1],
+        "memoria_carregamento_mb": pior[2],
+        "memoria_dataframe_mb": medicoes[0][3],
+        "linhas": medicoes[0][4],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carregamento a frio das publicações.")
+    parser.add_argument("csv", help="CSV de publicações")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    from dados import converter_para_colunar
+
+    caminho = os.path.abspath(args.csv)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as temporario:
+        colunar = converter_para_colunar(caminho, os.path.join(temporario, "publicacoes.parquet"))
+        for nome, modelo in CARREGADORES.items():
+            resultados[nome] = medir(modelo.format(caminho=caminho, colunar=colunar), args.repeticoes)
+            r = resultados[nome]
+            print(f"{nome:18s} {r['tempo_s'] * 1000:8.1f} ms  residente {r['memoria_residente_mb']:8.1f} MB "
+                  f"(+{r['memoria_carregamento_mb']:.1f})  DataFrame {r['memoria_dataframe_mb']:8.1f} MB "
+                  f"{r['linhas']:>9d} linhas")
+        resultados["tamanho_colunar_mb"] = os.path.getsize(colunar) / 2**20
+
+    resultados["tamanho_csv_mb"] = os.path.getsize(caminho) / 2**20
+    print(f"tamanho em disco: CSV {resultados['tamanho_csv_mb']:.2f} MB, "
+          f"Parquet {resultados['tamanho_colunar_mb']:.2f} MB")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
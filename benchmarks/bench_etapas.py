@@ -0,0 +1,156 @@
+# Mede separadamente cada etapa do painel (leitura do CSV, colunas derivadas,
+# filtros, agregação e construção de cada gráfico, nuvem de palavras) sobre
+# publicações sintéticas de tamanhos crescentes (dados_sinteticos.py). O tempo é
+# a mediana de várias repetições sem instrumentação; a memória é o pico alocado
+# durante a etapa, medido em uma execução à parte com tracemalloc.
+# O resultado vai para um JSON; --comparar mostra a variação em relação a outro
+# JSON gravado antes (por exemplo, em outro commit).
+# Uso: python benchmarks/bench_etapas.py --linhas 10000 100000 1000000 --saida etapas.json
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import matplotlib  # noqa: E402
+
+matplotlib.use("Agg")
+
+import pandas as pd  # noqa: E402
+
+from cache_figuras import serializar_plotly, serializar_png  # noqa: E402
+from cubo import CuboAgregado  # noqa: E402
+from dados import (  # noqa: E402
+    COLUNAS_DERIVACAO,
+    COLUNAS_PAINEL,
+    calcular_colunas_derivadas,
+    ler_colunas,
+    ler_textos,
+    ordenar_por_data,
+)
+from dados_sinteticos import gravar_csv  # noqa: E402
+from filtros import IndiceFiltros  # noqa: E402
+from palavras import IndicePalavras  # noqa: E402
+from visoes import DATA_FIM_PADRAO, DATA_INICIO_PADRAO, VISOES, ContextoVisoes, opcoes_filtro  # noqa: E402
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+
+
+def medir(funcao, repeticoes):
+    # Mediana do tempo de funcao() e pico de memória (MB) alocado durante a chamada
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {"tempo_s": sorted(tempos)[len(tempos) // 2], "memoria_mb": pico / 2**20}
+
+
+def medir_etapas(caminho, repeticoes=3):
+    etapas = {}
+
+    def etapa(nome, funcao, vezes=repeticoes):
+        resultado, etapas[nome] = medir(funcao, vezes)
+        return resultado
+
+    colunas = list(dict.fromkeys(COLUNAS_PAINEL + COLUNAS_DERIVACAO))
+    bruto = etapa("leitura_csv", lambda: ler_colunas(caminho, colunas))
+    dados = etapa("colunas_derivadas", lambda: ordenar_por_data(calcular_colunas_derivadas(bruto.copy())))
+
+    discursos = opcoes_filtro(dados, "resultado_analise")
+    emocoes = opcoes_filtro(dados, "emocao")
+    filtros = (DATA_INICIO_PADRAO, DATA_FIM_PADRAO, discursos, emocoes)
+
+    indice = etapa("indice_filtros", lambda: IndiceFiltros(dados))
+    etapa("filtro", lambda: indice.filtrar(*filtros))
+    # Referência: o filtro original do app, com máscaras booleanas sobre o DataFrame
+    etapa("filtro_mascaras", lambda: dados[
+        (dados["hora_postagem"].dt.date >= filtros[0]) & (dados["hora_postagem"].dt.date <= filtros[1])
+        & dados["resultado_analise"].isin(discursos) & dados["emocao"].isin(emocoes)
+    ])
+    cubo = etapa("cubo", lambda: CuboAgregado(dados))
+    fatia = etapa("fatia_cubo", lambda: cubo.fatiar(*filtros))
+
+    # O índice de palavras é caro: uma repetição só
+    textos = etapa("leitura_textos", lambda: ler_textos(caminho), 1)
+    indice_palavras = etapa("indice_palavras", lambda: IndicePalavras.construir(dados, textos), 1)
+    contexto = ContextoVisoes(fatia, lambda: indice_palavras, *filtros)
+
+    for visao in VISOES:
+        tabela = etapa(f"agregacao_{visao.id}", lambda: visao.tabela(contexto))
+        serializar = serializar_plotly if visao.tipo == "plotly" else serializar_png
+        etapa(f"figura_{visao.id}", lambda: serializar(visao.figura(tabela)))
+    return etapas
+
+
+def commit_atual():
+    try:
+        saida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                               capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultados, anterior):
+    # Razão entre o tempo atual e o do JSON anterior, por tamanho e etapa
+    for linhas, etapas in resultados["tamanhos"].items():
+        base = anterior.get("tamanhos", {}).get(linhas, {})
+        for nome, medida in etapas.items():
+            if nome in base and base[nome]["tempo_s"] > 0:
+                razao = medida["tempo_s"] / base[nome]["tempo_s"]
+                marca = "  <-- mais lento" if razao > 1.2 else ""
+                print(f"{linhas:>9s} {nome:32s} {razao:6.2f}x{marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por etapa do painel com dados sintéticos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--diretorio", help="Onde gravar os CSVs sintéticos (padrão: diretório temporário)")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar os tempos")
+    args = parser.parse_args()
+
+    resultados = {
+        "commit": commit_atual(),
+        "gerado_em": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "repeticoes": args.repeticoes,
+        "tamanhos": {},
+    }
+    with tempfile.TemporaryDirectory() as temporario:
+        diretorio = args.diretorio or temporario
+        for linhas in args.linhas:
+            caminho = os.path.join(diretorio, f"publicacoes_{linhas}.csv")
+            if not os.path.exists(caminho):
+                gravar_csv(linhas, caminho, args.semente)
+            etapas = medir_etapas(caminho, args.repeticoes)
+            resultados["tamanhos"][str(linhas)] = etapas
+            for nome, medida in etapas.items():
+                print(f"{linhas:>9d} {nome:32s} {medida['tempo_s'] * 1000:10.1f} ms {medida['memoria_mb']:9.1f} MB")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(resultados, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
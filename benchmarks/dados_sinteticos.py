@@ -0,0 +1,128 @@
+# Gera publicações sintéticas com o formato de publicacoes_analizadas.csv: mesmas
+# colunas, tamanho dos textos parecido com o real (mediana ~1.100 caracteres,
+# cauda longa) e as cardinalidades observadas em resultado_analise, emocao,
+# subreddit e usuario. As distribuições das categorias e o vocabulário são
+# tirados do CSV de referência quando ele existe.
+# Uso: python benchmarks/dados_sinteticos.py 100000 --saida /tmp/publicacoes_100k.csv
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCIA_PADRAO = os.path.join(RAIZ, "publicacoes_analizadas.csv")
+
+COLUNAS = ["id", "usuario", "texto", "upvotes", "comentarios", "compartilhamentos", "visualizacoes",
+           "hora_postagem", "engajamento", "frequencia_postagens_usuario", "resultado_analise", "emocao",
+           "link", "subreddit"]
+
+# Usadas quando não há CSV de referência
+CATEGORIAS_PADRAO = {
+    "resultado_analise": {"não é discurso de ódio": 0.6, "homofobia": 0.11, "racismo": 0.03, "sexismo": 0.02,
+                          "machismo": 0.01, "xenofobia": 0.01, "transfobia": 0.01, "discurso de ódio": 0.03,
+                          "desabafo": 0.01, "preconceito": 0.01, "Não é discurso de ódio": 0.16},
+    "emocao": {"raiva": 0.28, "tristeza": 0.23, "alegria": 0.18, "surpresa": 0.06, "neutra": 0.04,
+               "indignação": 0.03, "medo": 0.02, "nojo": 0.01, "confusão": 0.03, "preocupação": 0.02,
+               "reflexão": 0.02, "não identificada": 0.08},
+    "subreddit": {"desabafos": 0.2, "arco_iris": 0.1, "EuSouOBabaca": 0.04, "transbr": 0.04, "brasil": 0.02,
+                  "opiniaoimpopular": 0.03, "relacionamentos": 0.03, "futebol": 0.02, "outros": 0.52},
+}
+VOCABULARIO_PADRAO = ("eu não sei o que fazer minha mãe disse que ele foi embora ontem e hoje "
+                      "ninguém quer falar sobre isso no trabalho porque todo mundo acha que "
+                      "é culpa minha mas eu só queria desabafar com alguém").split()
+
+INICIO = np.datetime64("2017-09-01T00:00:00")
+FIM = np.datetime64("2024-12-31T23:59:59")
+
+
+def distribuicoes(referencia=REFERENCIA_PADRAO):
+    # Frequências relativas das categorias e do vocabulário do CSV de referência
+    if referencia is None or not os.path.exists(referencia):
+        palavras = pd.Series(VOCABULARIO_PADRAO).value_counts(normalize=True)
+        return CATEGORIAS_PADRAO, palavras
+    real = pd.read_csv(referencia, usecols=["texto", *CATEGORIAS_PADRAO])
+    categorias = {coluna: real[coluna].dropna().value_counts(normalize=True).to_dict() for coluna in CATEGORIAS_PADRAO}
+    palavras = real["texto"].dropna().str.split().explode().value_counts(normalize=True)
+    return categorias, palavras
+
+
+def sortear(rng, frequencias, quantidade):
+    valores = list(frequencias)
+    pesos = np.array([frequencias[v] for v in valores], dtype=float)
+    return pd.Categorical.from_codes(rng.choice(len(valores), quantidade, p=pesos / pesos.sum()), valores)
+
+
+def contagens(rng, quantidade, media_log, desvio_log):
+    # Contagens de cauda longa (a maioria das publicações tem poucos likes)
+    return np.floor(rng.lognormal(media_log, desvio_log, quantidade) - 1).clip(0).astype(np.int64)
+
+
+def gerar_textos(rng, palavras, quantidade):
+    # Cada texto é um recorte de um corpus sorteado a partir do vocabulário, com
+    # comprimento log-normal como nos textos reais; recortar evita juntar palavras
+    # uma a uma, o que tornaria 1 milhão de linhas lento demais
+    tamanhos = rng.lognormal(7.0, 1.0, quantidade).clip(50, 30_000).astype(np.int64)
+    sorteadas = rng.choice(palavras.index.to_numpy(), 400_000, p=palavras.to_numpy() / palavras.sum())
+    corpus = " ".join(sorteadas)
+    inicios = rng.integers(0, len(corpus) - tamanhos.max(), quantidade)
+    return [corpus[i:i + t] for i, t in zip(inicios.tolist(), tamanhos.tolist())]
+
+
+def gerar_publicacoes(linhas, semente=0, referencia=REFERENCIA_PADRAO):
+    rng = np.random.default_rng(semente)
+    categorias, palavras = distribuicoes(referencia)
+
+    # Poucos usuários muito ativos e uma cauda de usuários com uma publicação só
+    quantidade_usuarios = max(10, int(linhas * 0.6))
+    usuarios = np.where(
+        rng.random(linhas) < 0.3,
+        (rng.zipf(1.6, linhas) - 1) % quantidade_usuarios,
+        rng.integers(0, quantidade_usuarios, linhas),
+    )
+    frequencia = np.bincount(usuarios, minlength=quantidade_usuarios)[usuarios]
+
+    upvotes = contagens(rng, linhas, 2.0, 1.6)
+    comentarios = contagens(rng, linhas, 2.0, 1.3)
+    visualizacoes = upvotes + comentarios + contagens(rng, linhas, 1.0, 1.0)
+    segundos = rng.integers(0, int((FIM - INICIO) / np.timedelta64(1, "s")), linhas)
+    subreddit = sortear(rng, categorias["subreddit"], linhas)
+    ids = pd.Series(np.arange(linhas)).map(lambda i: np.base_repr(i + 10 * 36 ** 6, 36).lower())
+
+    return pd.DataFrame({
+        "id": ids,
+        "usuario": pd.Series(usuarios).map("usuario_{}".format),
+        "texto": gerar_textos(rng, palavras, linhas),
+        "upvotes": upvotes,
+        "comentarios": comentarios,
+        "compartilhamentos": np.zeros(linhas, dtype=np.int64),
+        "visualizacoes": visualizacoes,
+        "hora_postagem": pd.Series(INICIO + segundos.astype("timedelta64[s]")).dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "engajamento": upvotes + comentarios,
+        "frequencia_postagens_usuario": frequencia,
+        "resultado_analise": sortear(rng, categorias["resultado_analise"], linhas),
+        "emocao": sortear(rng, categorias["emocao"], linhas),
+        "link": "https://www.reddit.com/r/" + subreddit.astype(str) + "/comments/" + ids,
+        "subreddit": subreddit,
+    }, columns=COLUNAS)
+
+
+def gravar_csv(linhas, caminho, semente=0, referencia=REFERENCIA_PADRAO):
+    gerar_publicacoes(linhas, semente, referencia).to_csv(caminho, index=False)
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um CSV de publicações sintéticas.")
+    parser.add_argument("linhas", type=int)
+    parser.add_argument("--saida", required=True, help="CSV a gravar")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--referencia", default=REFERENCIA_PADRAO,
+                        help="CSV real de onde vêm as distribuições (padrão: publicacoes_analizadas.csv)")
+    args = parser.parse_args()
+    gravar_csv(args.linhas, args.saida, args.semente, args.referencia)
+    print(f"{args.linhas} publicações em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
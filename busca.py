@@ -0,0 +1,200 @@
+# Busca textual nas publicações por um índice invertido: cada termo (palavra em
+# minúsculas e sem acentos, então "ódio" e "odio" são o mesmo termo) guarda a
+# lista ordenada das linhas do arquivo em que aparece; cada par de termos
+# consecutivos ("discurso de", "de odio") também tem a sua lista. Uma consulta
+# intersecta as listas pedidas, começando pela menor, e não percorre os textos:
+#   palavra   publicações com o termo
+#   prefixo*  publicações com algum termo que começa com o prefixo
+#   "frase"   publicações com os termos em sequência
+# Todos os itens da consulta precisam aparecer. Frases de mais de duas palavras
+# são conferidas no texto apenas das publicações que já têm todos os pares.
+import bisect
+import re
+import unicodedata
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+PADRAO_TERMO = re.compile(r"\w+")
+COMBINANTES = re.compile("[\u0300-\u036f]")
+PADRAO_CONSULTA = re.compile(r'"([^"]*)"?|(\S+)')
+
+# termos: termos e pares de termos consecutivos das frases; frases: sequências
+# de mais de dois termos, conferidas no texto
+Consulta = namedtuple("Consulta", ["termos", "prefixos", "frases"])
+
+
+def normalizar_busca(texto):
+    # Minúsculas e sem acentos: os diacríticos separados pela decomposição NFKD
+    # são descartados ("ação" -> "acao")
+    return COMBINANTES.sub("", unicodedata.normalize("NFKD", texto.lower()))
+
+
+def termos(texto):
+    return PADRAO_TERMO.findall(normalizar_busca(texto or ""))
+
+
+def pares(sequencia):
+    return [f"{a} {b}" for a, b in zip(sequencia, sequencia[1:])]
+
+
+def interpretar(consulta):
+    termos_consulta, prefixos, frases = [], [], []
+    for frase, palavra in PADRAO_CONSULTA.findall(consulta):
+        if frase:
+            sequencia = termos(frase)
+            if len(sequencia) > 2:
+                frases.append(sequencia)
+            termos_consulta.extend(pares(sequencia) or sequencia)
+        elif palavra.endswith("*"):
+            sequencia = termos(palavra)
+            if sequencia:
+                termos_consulta.extend(sequencia[:-1])
+                prefixos.append(sequencia[-1])
+        else:
+            termos_consulta.extend(termos(palavra))
+    return Consulta(list(dict.fromkeys(termos_consulta)), list(dict.fromkeys(prefixos)), frases)
+
+
+def intersecao(menor, maior):
+    # Interseção de dois arrays ordenados e sem repetições, com uma busca binária
+    # no maior para cada elemento do menor
+    if len(menor) > len(maior):
+        menor, maior = maior, menor
+    if not len(menor):
+        return menor
+    posicoes = np.searchsorted(maior, menor)
+    encontrados = posicoes < len(maior)
+    encontrados[encontrados] = maior[posicoes[encontrados]] == menor[encontrados]
+    return menor[encontrados]
+
+
+def posicoes_no_indice(indice, rotulos):
+    # Posições (iloc), em ordem crescente, das linhas do arquivo em rotulos que
+    # estão no índice de um DataFrame
+    posicoes = indice.get_indexer(rotulos)
+    return np.sort(posicoes[posicoes >= 0]).astype(np.int64)
+
+
+class IndiceBusca:
+    def __init__(self):
+        # termo ou par de termos -> linhas do arquivo em ordem crescente (int32,
+        # 4 bytes por ocorrência)
+        self.linhas = {}
+        # Termos (sem os pares) em ordem alfabética, para resolver prefixos por
+        # busca binária
+        self.vocabulario = []
+
+    @classmethod
+    def construir(cls, textos, motor=None):
+        indice = cls()
+        indice.adicionar(textos, motor)
+        return indice
+
+    def adicionar(self, textos, motor=None):
+        # Acrescenta publicações (série de textos indexada pela linha do arquivo),
+        # alterando o índice; a ingestão usa combinado. As listas continuam
+        # ordenadas porque só são acrescentadas linhas depois das já indexadas.
+        # Com um motor de agregação (paralelo.py), a tokenização é dividida entre
+        # os trabalhadores
+        textos = textos.sort_index()
+        if motor is not None and motor.deve_paralelizar(textos):
+            for parcial in motor.mapear(indexar_particao, motor.particionar(textos)):
+                self.combinar(parcial)
+            return
+
+        novos = []
+        for linha, texto in zip(textos.index.tolist(), textos.fillna("").tolist()):
+            sequencia = termos(texto)
+            for termo in set(sequencia):
+                linhas = self.linhas.get(termo)
+                if linhas is None:
+                    linhas = self.linhas[termo] = array("i")
+                    novos.append(termo)
+                linhas.append(linha)
+            for par in set(pares(sequencia)):
+                linhas = self.linhas.get(par)
+                if linhas is None:
+                    linhas = self.linhas[par] = array("i")
+                linhas.append(linha)
+        self.incluir_vocabulario(novos)
+
+    def combinar(self, outro):
+        # Acrescenta as listas de outro índice, com linhas posteriores às deste
+        # (por exemplo, a partição seguinte), alterando-o; só para índices que
+        # ainda estão sendo montados
+        novos = []
+        for termo, linhas in outro.linhas.items():
+            if termo in self.linhas:
+                self.linhas[termo].extend(linhas)
+            else:
+                self.linhas[termo] = linhas
+                if " " not in termo:
+                    novos.append(termo)
+        self.incluir_vocabulario(novos)
+        return self
+
+    def combinado(self, outro):
+        # Novo índice com as listas deste e as de outro (linhas posteriores), sem
+        # alterar este, que pode estar sendo lido por outras sessões. Só as
+        # listas dos termos de outro são copiadas; as demais são compartilhadas
+        novo = IndiceBusca()
+        novo.linhas = dict(self.linhas)
+        for termo, linhas in outro.linhas.items():
+            novo.linhas[termo] = self.linhas[termo] + linhas if termo in self.linhas else linhas
+        novos = [termo for termo in outro.vocabulario if termo not in self.linhas]
+        novo.vocabulario = sorted(self.vocabulario + novos)
+        return novo
+
+    def incluir_vocabulario(self, novos):
+        if len(novos) > len(self.vocabulario) // 10:
+            self.vocabulario = sorted(self.vocabulario + novos)
+        else:
+            for termo in novos:
+                bisect.insort(self.vocabulario, termo)
+
+    def linhas_termo(self, termo):
+        return np.array(self.linhas.get(termo, ()), dtype=np.int64)
+
+    def linhas_prefixo(self, prefixo):
+        inicio = bisect.bisect_left(self.vocabulario, prefixo)
+        fim = bisect.bisect_left(self.vocabulario, prefixo + "\uffff")
+        partes = [self.linhas_termo(termo) for termo in self.vocabulario[inicio:fim]]
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(partes))
+
+    def buscar(self, consulta, textos=None):
+        # Linhas do arquivo, em ordem crescente, das publicações que atendem à
+        # consulta, ou None quando a consulta não tem nenhum termo. As frases
+        # longas são conferidas em textos (série indexada pela linha do arquivo)
+        consulta = interpretar(consulta) if isinstance(consulta, str) else consulta
+        if not (consulta.termos or consulta.prefixos):
+            return None
+        listas = [self.linhas_termo(termo) for termo in consulta.termos]
+        listas += [self.linhas_prefixo(prefixo) for prefixo in consulta.prefixos]
+        listas.sort(key=len)
+        resultado = listas[0]
+        for linhas in listas[1:]:
+            if not len(resultado):
+                break
+            resultado = intersecao(resultado, linhas)
+
+        if consulta.frases and len(resultado) and textos is not None:
+            frases = [" " + " ".join(frase) + " " for frase in consulta.frases]
+            candidatos = textos.reindex(resultado).fillna("").tolist()
+            manter = [
+                all(frase in " " + " ".join(termos(texto)) + " " for frase in frases)
+                for texto in candidatos
+            ]
+            resultado = resultado[np.array(manter, dtype=bool)]
+        return resultado
+
+    def memoria_bytes(self):
+        return sum(linhas.itemsize * len(linhas) for linhas in self.linhas.values())
+
+
+def indexar_particao(textos):
+    # Executada nos trabalhadores: índice parcial de uma partição dos textos
+    return IndiceBusca.construir(textos)
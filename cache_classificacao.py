@@ -0,0 +1,101 @@
+# Cache persistente (SQLite) dos resultados de classificação, endereçado pelo
+# conteúdo: a chave é o hash do texto normalizado, e cada resultado fica associado
+# à versão do classificador (modelo + prompt). Reposts e publicações coletadas de
+# novo reaproveitam o resultado já pago; só os textos inéditos vão ao classificador.
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CAMINHO_PADRAO = ".cache_classificacao.sqlite3"
+
+ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_texto(texto):
+    # Mesma forma Unicode, minúsculas e espaços colapsados: diferenças só de
+    # formatação não geram uma nova classificação
+    texto = unicodedata.normalize("NFC", texto or "")
+    return ESPACOS.sub(" ", texto).strip().lower()
+
+
+def chave_texto(texto):
+    return hashlib.sha256(normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+
+class CacheClassificacao:
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        with self.conexao:
+            self.conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resultados (
+                    chave TEXT NOT NULL,
+                    versao TEXT NOT NULL,
+                    resultado_analise TEXT,
+                    emocao TEXT,
+                    criado_em REAL NOT NULL,
+                    PRIMARY KEY (chave, versao)
+                )
+                """
+            )
+            self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_criado_em ON resultados (criado_em)")
+
+    def buscar(self, chaves, versao):
+        # Devolve {chave: {"resultado_analise": ..., "emocao": ...}} para as chaves em cache
+        chaves = list(dict.fromkeys(chaves))
+        encontrados = {}
+        with self.trava:
+            # Consultas em blocos para respeitar o limite de parâmetros do SQLite
+            for i in range(0, len(chaves), 500):
+                bloco = chaves[i:i + 500]
+                marcadores = ",".join("?" * len(bloco))
+                linhas = self.conexao.execute(
+                    f"SELECT chave, resultado_analise, emocao FROM resultados "
+                    f"WHERE versao = ? AND chave IN ({marcadores})",
+                    [versao, *bloco],
+                )
+                for chave, resultado_analise, emocao in linhas:
+                    encontrados[chave] = {"resultado_analise": resultado_analise, "emocao": emocao}
+            self.acertos += len(encontrados)
+            self.falhas += len(chaves) - len(encontrados)
+        return encontrados
+
+    def guardar(self, itens, versao):
+        # itens: pares (chave, {"resultado_analise": ..., "emocao": ...})
+        agora = time.time()
+        with self.trava, self.conexao:
+            self.conexao.executemany(
+                "INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?)",
+                [(chave, versao, r["resultado_analise"], r["emocao"], agora) for chave, r in itens],
+            )
+
+    def remover_antigos(self, dias):
+        limite = time.time() - dias * 86400
+        with self.trava, self.conexao:
+            return self.conexao.execute("DELETE FROM resultados WHERE criado_em < ?", (limite,)).rowcount
+
+    def remover_outras_versoes(self, versao):
+        # Descarta resultados de modelos ou prompts que não estão mais em uso
+        with self.trava, self.conexao:
+            return self.conexao.execute("DELETE FROM resultados WHERE versao != ?", (versao,)).rowcount
+
+    def estatisticas(self):
+        with self.trava:
+            total, = self.conexao.execute("SELECT COUNT(*) FROM resultados").fetchone()
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": total,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+    def fechar(self):
+        self.conexao.close()
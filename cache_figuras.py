@@ -0,0 +1,85 @@
+# Cache LRU das figuras já renderizadas, compartilhado entre as sessões do app.
+# A chave combina a versão dos dados, os filtros ativos e o gráfico; o valor é a
+# figura serializada (JSON do Plotly ou PNG do Matplotlib), de modo que repetir a
+# mesma combinação, como ao trocar de página na tabela, não reconstrói o gráfico.
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import plotly.io as pio
+
+LIMITE_PADRAO_BYTES = 64 * 1024 * 1024
+
+
+def chave_figura(versao_dados, data_inicio, data_fim, filtro_discurso, filtro_emocao, id_grafico):
+    # A ordem das opções selecionadas não altera o gráfico
+    return (
+        versao_dados,
+        data_inicio,
+        data_fim,
+        tuple(sorted(filtro_discurso)),
+        tuple(sorted(filtro_emocao)),
+        id_grafico,
+    )
+
+
+def serializar_plotly(fig):
+    return fig.to_json().encode("utf-8")
+
+
+def desserializar_plotly(conteudo):
+    return pio.from_json(conteudo.decode("utf-8"))
+
+
+def serializar_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", facecolor=fig.get_facecolor())
+    # Libera a figura do Matplotlib; só os bytes ficam guardados
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+class CacheFiguras:
+    def __init__(self, limite_bytes=LIMITE_PADRAO_BYTES):
+        self.limite_bytes = limite_bytes
+        self.itens = OrderedDict()
+        self.tamanho_bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.trava = threading.Lock()
+
+    def buscar(self, chave):
+        # Bytes guardados para a chave, ou None
+        with self.trava:
+            if chave in self.itens:
+                self.itens.move_to_end(chave)
+                self.acertos += 1
+                return self.itens[chave]
+            self.falhas += 1
+            return None
+
+    def guardar(self, chave, conteudo):
+        with self.trava:
+            if chave in self.itens:
+                self.tamanho_bytes -= len(self.itens.pop(chave))
+            if len(conteudo) > self.limite_bytes:
+                return
+            self.itens[chave] = conteudo
+            self.tamanho_bytes += len(conteudo)
+            # Remove as figuras usadas há mais tempo até respeitar o limite de memória
+            while self.tamanho_bytes > self.limite_bytes:
+                _, removido = self.itens.popitem(last=False)
+                self.tamanho_bytes -= len(removido)
+
+    def estatisticas(self):
+        with self.trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self.itens),
+                "tamanho_bytes": self.tamanho_bytes,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
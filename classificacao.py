@@ -0,0 +1,276 @@
+# Etapa de classificação que gera resultado_analise e emocao a partir do texto das
+# publicações. As publicações são enviadas em lotes a um classificador plugável,
+# com concorrência limitada (asyncio), novas tentativas com espera exponencial e
+# limite de requisições por minuto. Cada lote concluído é gravado imediatamente
+# no CSV de saída, então uma execução interrompida pode ser retomada. Com o cache
+# de resultados (cache_classificacao.py), só textos inéditos vão ao classificador.
+#
+# Uso: python classificacao.py publicacoes.csv publicacoes_analizadas.csv --backend chatgpt
+import abc
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+
+import pandas as pd
+
+from cache_classificacao import CAMINHO_PADRAO, CacheClassificacao, chave_texto
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_RESULTADO = ["resultado_analise", "emocao"]
+
+PROMPT_CLASSIFICACAO = """Você receberá uma lista JSON de publicações do Reddit em português.
+Para cada publicação, classifique:
+- "resultado_analise": o tipo de discurso de ódio (por exemplo "racismo", "homofobia",
+  "machismo", "sexismo", "xenofobia", "transfobia") ou "não é discurso de ódio";
+- "emocao": a emoção predominante (por exemplo "raiva", "tristeza", "alegria", "medo",
+  "surpresa", "nojo", "desdém" ou "não identificada").
+Responda apenas com uma lista JSON, na mesma ordem, de objetos com as chaves
+"resultado_analise" e "emocao"."""
+
+
+class Classificador(abc.ABC):
+    # Interface dos backends de classificação. versao identifica o modelo e o
+    # prompt, para que resultados de versões diferentes não sejam misturados
+    nome = "base"
+    versao = "0"
+
+    @abc.abstractmethod
+    async def classificar_lote(self, textos):
+        # Recebe uma lista de textos e devolve uma lista de dicionários com as
+        # chaves de COLUNAS_RESULTADO, na mesma ordem
+        ...
+
+
+class ClassificadorChatGPT(Classificador):
+    nome = "chatgpt"
+
+    def __init__(self, modelo="gpt-4o-mini", prompt=PROMPT_CLASSIFICACAO):
+        try:
+            from openai import AsyncOpenAI
+        except ImportError as erro:
+            raise RuntimeError("O backend 'chatgpt' requer o pacote openai (pip install openai).") from erro
+        self.cliente = AsyncOpenAI()
+        self.modelo = modelo
+        self.prompt = prompt
+        self.versao = f"{modelo}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}"
+
+    async def classificar_lote(self, textos):
+        resposta = await self.cliente.chat.completions.create(
+            model=self.modelo,
+            temperature=0,
+            messages=[
+                {"role": "system", "content": self.prompt},
+                {"role": "user", "content": json.dumps(textos, ensure_ascii=False)},
+            ],
+        )
+        resultados = json.loads(resposta.choices[0].message.content)
+        if not isinstance(resultados, list) or len(resultados) != len(textos):
+            raise ValueError("A resposta do modelo não corresponde ao lote enviado.")
+        return [{coluna: item[coluna] for coluna in COLUNAS_RESULTADO} for item in resultados]
+
+
+class ClassificadorLocal(Classificador):
+    # Backend offline por palavras-chave, útil para validar o pipeline sem custo de API
+    nome = "local"
+    versao = "palavras-chave-1"
+
+    TERMOS = {
+        "racismo": ["macaco", "preto imundo", "raça inferior"],
+        "homofobia": ["viado", "bicha", "sapatão"],
+        "machismo": ["lugar de mulher", "vagabunda"],
+        "transfobia": ["traveco"],
+        "xenofobia": ["nordestino burro", "paraíba"],
+    }
+    PADROES = {
+        tipo: re.compile(r"\b(" + "|".join(map(re.escape, termos)) + r")\b")
+        for tipo, termos in TERMOS.items()
+    }
+
+    async def classificar_lote(self, textos):
+        resultados = []
+        for texto in textos:
+            texto = texto.lower()
+            tipo = next(
+                (tipo for tipo, padrao in self.PADROES.items() if padrao.search(texto)),
+                "não é discurso de ódio",
+            )
+            emocao = "raiva" if tipo != "não é discurso de ódio" else "não identificada"
+            resultados.append({"resultado_analise": tipo, "emocao": emocao})
+        return resultados
+
+
+BACKENDS = {
+    "chatgpt": ClassificadorChatGPT,
+    "local": ClassificadorLocal,
+}
+
+
+class LimitadorTaxa:
+    # Espaça os envios para no máximo requisicoes_por_minuto (0 desativa o limite)
+    def __init__(self, requisicoes_por_minuto):
+        self.intervalo = 60.0 / requisicoes_por_minuto if requisicoes_por_minuto else 0.0
+        self.proximo_envio = 0.0
+        self.trava = asyncio.Lock()
+
+    async def aguardar(self):
+        if not self.intervalo:
+            return
+        async with self.trava:
+            agora = time.monotonic()
+            espera = self.proximo_envio - agora
+            self.proximo_envio = max(agora, self.proximo_envio) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+async def classificar_com_tentativas(classificador, textos, limitador, tentativas=5, espera_inicial=1.0):
+    for tentativa in range(1, tentativas + 1):
+        await limitador.aguardar()
+        try:
+            return await classificador.classificar_lote(textos)
+        except Exception as erro:
+            if tentativa == tentativas:
+                raise
+            # Espera exponencial com variação aleatória para não sincronizar os lotes
+            espera = espera_inicial * 2 ** (tentativa - 1) * (1 + random.random())
+            logger.warning("Falha ao classificar lote (tentativa %d/%d): %s", tentativa, tentativas, erro)
+            await asyncio.sleep(espera)
+
+
+async def classificar_em_lotes(publicacoes, classificador, tamanho_lote=20, concorrencia=4,
+                               requisicoes_por_minuto=60, tentativas=5, espera_inicial=1.0):
+    # Gera (lote, resultados) à medida que cada lote termina. Lotes que falham em
+    # todas as tentativas são registrados no log e ficam para a próxima execução
+    limitador = LimitadorTaxa(requisicoes_por_minuto)
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def processar(lote):
+        async with semaforo:
+            try:
+                resultados = await classificar_com_tentativas(
+                    classificador, lote["texto"].tolist(), limitador, tentativas, espera_inicial
+                )
+            except Exception as erro:
+                logger.error("Lote com %d publicações não classificado: %s", len(lote), erro)
+                return lote, None
+            return lote, resultados
+
+    lotes = [publicacoes.iloc[i:i + tamanho_lote] for i in range(0, len(publicacoes), tamanho_lote)]
+    tarefas = [asyncio.ensure_future(processar(lote)) for lote in lotes]
+    for tarefa in asyncio.as_completed(tarefas):
+        lote, resultados = await tarefa
+        if resultados is not None:
+            yield lote, resultados
+
+
+def anexar_resultados(publicacoes, resultados_por_chave, caminho_saida, cabecalho=None):
+    # Grava as publicações com os resultados correspondentes à chave do texto. Com
+    # o cabeçalho de uma saída já existente, as colunas seguem a ordem dele (as
+    # que faltam ficam vazias e as que ele não tem são descartadas); sem ele, o
+    # arquivo é criado com cabeçalho
+    lote = publicacoes.drop(columns=["chave_texto"]).reset_index(drop=True)
+    resultados = pd.DataFrame([resultados_por_chave[c] for c in publicacoes["chave_texto"]], columns=COLUNAS_RESULTADO)
+    linhas = pd.concat([lote, resultados], axis=1)
+    if cabecalho is not None:
+        linhas = linhas.reindex(columns=cabecalho)
+    linhas.to_csv(caminho_saida, mode="a", header=cabecalho is None, index=False)
+    return list(linhas.columns)
+
+
+async def classificar_arquivo(caminho_entrada, caminho_saida, classificador, cache=None, **opcoes):
+    publicacoes = pd.read_csv(caminho_entrada, dtype={"id": "string", "texto": "string"})
+    publicacoes = publicacoes.drop(columns=[c for c in COLUNAS_RESULTADO if c in publicacoes.columns])
+    publicacoes["texto"] = publicacoes["texto"].fillna("")
+
+    # Retomar: publicações já presentes na saída não são enviadas de novo, e as
+    # novas linhas seguem as colunas do cabeçalho já gravado
+    cabecalho = None
+    if os.path.exists(caminho_saida):
+        cabecalho = list(pd.read_csv(caminho_saida, nrows=0).columns)
+        faltando = [col for col in ["id"] + COLUNAS_RESULTADO if col not in cabecalho]
+        if faltando:
+            raise ValueError(f"As colunas ausentes na saída são: {faltando}. Verifique o arquivo {caminho_saida}.")
+        ja_classificados = pd.read_csv(caminho_saida, usecols=["id"], dtype={"id": "string"})["id"]
+        publicacoes = publicacoes[~publicacoes["id"].isin(ja_classificados)]
+
+    # Publicações com o mesmo texto normalizado compartilham uma única classificação
+    publicacoes = publicacoes.assign(chave_texto=publicacoes["texto"].map(chave_texto))
+    total = 0
+
+    if cache is not None:
+        em_cache = cache.buscar(publicacoes["chave_texto"], classificador.versao)
+        reaproveitadas = publicacoes["chave_texto"].isin(em_cache.keys())
+        if reaproveitadas.any():
+            cabecalho = anexar_resultados(publicacoes[reaproveitadas], em_cache, caminho_saida, cabecalho)
+            total += int(reaproveitadas.sum())
+            logger.info("%d publicações reaproveitadas do cache", total)
+        publicacoes = publicacoes[~reaproveitadas]
+
+    ineditas = publicacoes.drop_duplicates("chave_texto")
+    logger.info("%d textos inéditos para %d publicações pendentes", len(ineditas), len(publicacoes))
+    async for lote, resultados in classificar_em_lotes(ineditas, classificador, **opcoes):
+        resultados_por_chave = dict(zip(lote["chave_texto"], resultados))
+        if cache is not None:
+            cache.guardar(resultados_por_chave.items(), classificador.versao)
+        correspondentes = publicacoes[publicacoes["chave_texto"].isin(resultados_por_chave.keys())]
+        cabecalho = anexar_resultados(correspondentes, resultados_por_chave, caminho_saida, cabecalho)
+        total += len(correspondentes)
+        logger.info("%d publicações classificadas", total)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classifica publicações em lotes (resultado_analise e emocao).")
+    parser.add_argument("entrada", help="CSV de publicações (ex.: publicacoes.csv)")
+    parser.add_argument("saida", help="CSV analisado a ser criado ou completado")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="chatgpt")
+    parser.add_argument("--tamanho-lote", type=int, default=20)
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--requisicoes-por-minuto", type=int, default=60)
+    parser.add_argument("--tentativas", type=int, default=5)
+    parser.add_argument("--cache", default=CAMINHO_PADRAO, help="Arquivo SQLite do cache de resultados")
+    parser.add_argument("--sem-cache", action="store_true", help="Classifica tudo sem consultar o cache")
+    parser.add_argument("--expirar-dias", type=float, help="Remove do cache resultados mais antigos que N dias")
+    parser.add_argument("--somente-versao-atual", action="store_true",
+                        help="Remove do cache resultados de outras versões do classificador")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    classificador = BACKENDS[args.backend]()
+
+    cache = None
+    if not args.sem_cache:
+        cache = CacheClassificacao(args.cache)
+        if args.expirar_dias is not None:
+            logger.info("%d resultados expirados removidos do cache", cache.remover_antigos(args.expirar_dias))
+        if args.somente_versao_atual:
+            removidos = cache.remover_outras_versoes(classificador.versao)
+            logger.info("%d resultados de outras versões removidos do cache", removidos)
+
+    total = asyncio.run(classificar_arquivo(
+        args.entrada,
+        args.saida,
+        classificador,
+        cache=cache,
+        tamanho_lote=args.tamanho_lote,
+        concorrencia=args.concorrencia,
+        requisicoes_por_minuto=args.requisicoes_por_minuto,
+        tentativas=args.tentativas,
+    ))
+    print(f"{total} publicações classificadas em {args.saida}")
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        print(f"cache: {estatisticas['acertos']} acertos, {estatisticas['falhas']} falhas "
+              f"({estatisticas['taxa_acerto']:.1%}), {estatisticas['itens']} resultados guardados")
+        cache.fechar()
+
+
+if __name__ == "__main__":
+    main()
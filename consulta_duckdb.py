@@ -0,0 +1,356 @@
+# Backend opcional de consultas sobre o DuckDB. O arquivo de publicações (CSV ou
+# Parquet) é registrado uma vez em um banco DuckDB gravado em disco (um arquivo
+# temporário), com as mesmas colunas derivadas e a mesma ordem cronológica de
+# dados.ler_publicacoes, mas sem a coluna texto: os textos são lidos do próprio
+# arquivo por uma view, só quando a página da tabela ou a nuvem de palavras
+# precisam deles. Assim o banco fica no disco, o DuckDB mantém na memória só o
+# que couber no seu cache, e exportações maiores que a memória funcionam.
+# Filtros, ordenação da tabela e a agregação de cada gráfico viram consultas SQL,
+# e só o resultado agregado (ou a página exibida) volta para o pandas.
+#
+# FonteDuckDB oferece a mesma interface usada pelo app no caminho pandas
+# (IndiceFiltros.filtrar, OrdensTabela.ordenar, CuboAgregado.fatiar e
+# IndicePalavras.frequencias), e FatiaDuckDB a de FatiaCubo, de modo que as
+# funções tabela_* de cubo.py produzem as mesmas tabelas nos dois caminhos.
+# Selecionado no app com ANALISE_BACKEND=duckdb.
+#
+# Uso: python consulta_duckdb.py publicacoes.csv (compara as tabelas com o pandas)
+import argparse
+import os
+import tempfile
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from cubo import GRANULARIDADE_PADRAO, CuboAgregado, tabela_periodos
+from dados import (
+    COLUNAS_NECESSARIAS,
+    COLUNAS_PAINEL,
+    EXTENSAO_COLUNAR,
+    NAO_E_DISCURSO_ODIO,
+    ROTULOS_ODIO,
+    ler_publicacoes,
+    ler_textos,
+    resolver_fonte,
+)
+from palavras import IndicePalavras, tokenizar
+from visoes import DATA_FIM_PADRAO, DATA_INICIO_PADRAO, VISOES, ContextoVisoes, SemDados, opcoes_filtro
+
+COLUNAS_FONTE = ["id", "usuario", "texto", "upvotes", "comentarios", "visualizacoes",
+                 "hora_postagem", "resultado_analise", "emocao", "subreddit"]
+
+# Chave inteira do período no SQL, equivalente a cubo.periodo_de_dias
+DIAS_DESDE_EPOCA = "date_diff('day', DATE '1970-01-01', dia)"
+EXPRESSOES_PERIODO = {
+    "dia": DIAS_DESDE_EPOCA,
+    "semana": f"({DIAS_DESDE_EPOCA} + 3) // 7",
+    "mes": "year(dia) * 12 + month(dia) - 1",
+    "trimestre": "(year(dia) * 12 + month(dia) - 1) // 3",
+}
+
+# Textos lidos por vez ao contar as palavras
+TAMANHO_LOTE_TEXTOS = 10_000
+
+
+def lista_sql(coluna, valores, parametros):
+    # "coluna IN (?, ?, ...)" com os valores acrescentados aos parâmetros
+    valores = list(dict.fromkeys(valores))
+    if not valores:
+        return "FALSE"
+    parametros.extend(valores)
+    return f"{coluna} IN ({', '.join('?' * len(valores))})"
+
+
+class FonteDuckDB:
+    def __init__(self, caminho_arquivo, banco=None):
+        # banco: arquivo do DuckDB; sem ele, um arquivo em um diretório temporário
+        # removido em fechar()
+        import duckdb
+
+        fonte = resolver_fonte(caminho_arquivo)
+        self.temporario = None
+        if banco is None:
+            self.temporario = tempfile.TemporaryDirectory(prefix="analise_duckdb_")
+            banco = os.path.join(self.temporario.name, "publicacoes.duckdb")
+        self.conexao = duckdb.connect(banco)
+        self.trava = threading.Lock()
+        # O caminho vai no texto do SQL porque views não aceitam parâmetros
+        literal = "'" + fonte.replace("'", "''") + "'"
+        if fonte.endswith(EXTENSAO_COLUNAR):
+            leitura = f"read_parquet({literal})"
+        else:
+            leitura = f"read_csv({literal}, header = true, all_varchar = true)"
+        existentes = [linha[0] for linha in self.conexao.execute(f"DESCRIBE SELECT * FROM {leitura}").fetchall()]
+        faltando = [col for col in COLUNAS_NECESSARIAS if col not in existentes]
+        if faltando:
+            raise ValueError(f"As colunas ausentes são: {faltando}. Verifique o arquivo CSV.")
+
+        # Textos lidos direto do arquivo, numerados pela mesma ordem de leitura da
+        # tabela publicacoes
+        self.conexao.execute(
+            f"CREATE VIEW textos AS SELECT row_number() OVER () - 1 AS linha, CAST(texto AS VARCHAR) AS texto "
+            f"FROM {leitura}"
+        )
+        texto = {col: f"CAST({col} AS VARCHAR)" if col in existentes else "CAST(NULL AS VARCHAR)"
+                 for col in ["id", "usuario", "resultado_analise", "emocao", "subreddit"]}
+        inteiro = {col: f"CAST({col} AS INTEGER)" if col in existentes else "CAST(0 AS INTEGER)"
+                   for col in ["upvotes", "comentarios", "visualizacoes"]}
+        # Mesma ordem de ordenar_por_data: cronológica, datas inválidas primeiro,
+        # empates na ordem do arquivo; posicao equivale ao iloc do caminho pandas
+        self.conexao.execute(f"""
+            CREATE TABLE publicacoes AS
+            WITH arquivo AS (
+                SELECT row_number() OVER () - 1 AS linha, *
+                FROM (SELECT {', '.join(f'{expr} AS {col}' for col, expr in {**texto, **inteiro}.items())},
+                             TRY_CAST(hora_postagem AS TIMESTAMP) AS hora_postagem
+                      FROM {leitura})
+            )
+            SELECT row_number() OVER (ORDER BY hora_postagem ASC NULLS FIRST, linha) - 1 AS posicao,
+                   *, CAST(upvotes + comentarios AS INTEGER) AS engajamento,
+                   CAST(hora_postagem AS DATE) AS dia
+            FROM arquivo
+            ORDER BY posicao
+        """)
+        self.colunas = [c for c in existentes if c in COLUNAS_FONTE] + ["engajamento"]
+
+    def consultar(self, sql, parametros=()):
+        # Um cursor por consulta: o banco é compartilhado entre as sessões do app
+        with self.trava:
+            cursor = self.conexao.cursor()
+        try:
+            return cursor.execute(sql, list(parametros)).df()
+        finally:
+            cursor.close()
+
+    def __len__(self):
+        return int(self.consultar("SELECT count(*) AS n FROM publicacoes")["n"].iloc[0])
+
+    def opcoes(self, coluna):
+        # Valores da coluna na ordem em que aparecem, como opcoes_filtro no pandas
+        return self.consultar(
+            f"SELECT {coluna} AS valor FROM publicacoes WHERE {coluna} IS NOT NULL "
+            f"GROUP BY {coluna} ORDER BY min(posicao)"
+        )["valor"].tolist()
+
+    def condicao_filtros(self, data_inicio, data_fim, discursos, emocoes):
+        parametros = [data_inicio, data_fim]
+        condicoes = [
+            "dia BETWEEN ? AND ?",
+            lista_sql("resultado_analise", discursos, parametros),
+            lista_sql("emocao", emocoes, parametros),
+        ]
+        return condicoes, parametros
+
+    def filtrar(self, data_inicio, data_fim, discursos, emocoes):
+        condicoes, parametros = self.condicao_filtros(data_inicio, data_fim, discursos, emocoes)
+        posicoes = self.consultar(
+            f"SELECT posicao FROM publicacoes WHERE {' AND '.join(condicoes)} ORDER BY posicao", parametros
+        )["posicao"]
+        return posicoes.to_numpy(dtype=np.int64)
+
+    def ordenar(self, linhas, coluna, decrescente=False):
+        # Mesmo desempate de OrdensTabela: a posição cronológica
+        direcao = "DESC NULLS LAST" if decrescente else "ASC NULLS FIRST"
+        desempate = "DESC" if decrescente else "ASC"
+        with self.trava:
+            cursor = self.conexao.cursor()
+        try:
+            cursor.register("selecionadas", pd.DataFrame({"posicao": np.asarray(linhas, dtype=np.int64)}))
+            ordem = cursor.execute(
+                f"SELECT p.posicao FROM publicacoes p JOIN selecionadas s USING (posicao) "
+                f"ORDER BY p.{coluna} {direcao}, p.posicao {desempate}"
+            ).df()["posicao"]
+        finally:
+            cursor.close()
+        return ordem.to_numpy(dtype=np.int64)
+
+    def linhas(self, posicoes, colunas):
+        # Linhas da página, na ordem de posicoes e indexadas pela linha do arquivo
+        posicoes = [int(p) for p in posicoes]
+        if not posicoes:
+            return pd.DataFrame(columns=colunas)
+        parametros = []
+        selecao = ", ".join(f"p.{coluna}" for coluna in colunas if coluna != "texto")
+        sql = f"SELECT linha, posicao{', ' + selecao if selecao else ''} FROM publicacoes p " \
+              f"WHERE {lista_sql('posicao', posicoes, parametros)}"
+        if "texto" in colunas:
+            # Só os textos das linhas da página, lidos do arquivo
+            sql = f"SELECT pagina.*, t.texto FROM ({sql}) pagina LEFT JOIN textos t USING (linha)"
+        pagina = self.consultar(sql, parametros)
+        pagina = pagina.set_index("posicao").loc[posicoes]
+        return pagina.set_index("linha").rename_axis(None)[colunas]
+
+    def fatiar(self, data_inicio, data_fim, discursos, emocoes):
+        condicoes, parametros = self.condicao_filtros(data_inicio, data_fim, discursos, emocoes)
+        return FatiaDuckDB(self, condicoes, parametros)
+
+    def frequencias(self, data_inicio, data_fim, discursos, emocoes):
+        # Os textos filtrados são lidos em lotes e tokenizados a cada consulta; o
+        # resultado fica no cache de figuras do app
+        condicoes, parametros = self.condicao_filtros(data_inicio, data_fim, discursos, emocoes)
+        with self.trava:
+            cursor = self.conexao.cursor()
+        total = Counter()
+        try:
+            cursor.execute(
+                f"SELECT t.texto FROM publicacoes JOIN textos t USING (linha) "
+                f"WHERE {' AND '.join(condicoes)} AND t.texto IS NOT NULL", parametros
+            )
+            while True:
+                lote = cursor.fetchmany(TAMANHO_LOTE_TEXTOS)
+                if not lote:
+                    break
+                for (texto,) in lote:
+                    total.update(tokenizar(texto))
+        finally:
+            cursor.close()
+        return total
+
+    def fechar(self):
+        self.conexao.close()
+        if self.temporario is not None:
+            self.temporario.cleanup()
+
+
+class FatiaDuckDB:
+    def __init__(self, fonte, condicoes, parametros):
+        self.fonte = fonte
+        self.condicoes = condicoes
+        self.parametros = parametros
+
+    def restringir(self, condicao, parametros=()):
+        return FatiaDuckDB(self.fonte, self.condicoes + [condicao], self.parametros + list(parametros))
+
+    def agregar(self, selecao, agrupar=None, ordem=None, parametros_selecao=(), limite=None):
+        sql = f"SELECT {selecao} FROM publicacoes WHERE {' AND '.join(self.condicoes)}"
+        if agrupar:
+            sql += f" GROUP BY {agrupar}"
+        if ordem:
+            sql += f" ORDER BY {ordem}"
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        return self.fonte.consultar(sql, list(parametros_selecao) + self.parametros)
+
+    def __len__(self):
+        return int(self.agregar("count(*) AS n")["n"].iloc[0])
+
+    def somente_odio(self):
+        return self.restringir("resultado_analise != ?", [NAO_E_DISCURSO_ODIO])
+
+    def valores(self, metrica):
+        # Apenas o total da métrica na fatia; as células não são materializadas
+        expressao = "count(*)" if metrica == "contagem" else f"sum({metrica})"
+        return np.array([int(self.agregar(f"coalesce({expressao}, 0) AS total")["total"].iloc[0])], dtype=np.int64)
+
+    def somar_por(self, dimensao, metrica="contagem"):
+        expressao = "count(*)" if metrica == "contagem" else f"sum({metrica})"
+        totais = self.restringir(f"{dimensao} IS NOT NULL").agregar(
+            f"{dimensao} AS valor, {expressao} AS total", agrupar=dimensao, ordem=dimensao
+        )
+        return pd.Series(totais["total"].to_numpy(dtype=np.int64), index=pd.Index(totais["valor"].tolist()),
+                         name=metrica)
+
+    def maiores_por(self, dimensao, quantidade, metrica="contagem"):
+        # ORDER BY ... LIMIT vira um top-N no DuckDB, sem ordenar todas as categorias
+        expressao = "count(*)" if metrica == "contagem" else f"sum({metrica})"
+        totais = self.restringir(f"{dimensao} IS NOT NULL").agregar(
+            f"{dimensao} AS valor, {expressao} AS total", agrupar=dimensao,
+            ordem=f"total DESC, {dimensao}", limite=quantidade,
+        )
+        return pd.Series(totais["total"].to_numpy(dtype=np.int64), index=pd.Index(totais["valor"].tolist()),
+                         name=metrica)
+
+    def somar_para(self, dimensao, valores, metrica="contagem"):
+        valores = list(valores)
+        expressao = "count(*)" if metrica == "contagem" else f"sum({metrica})"
+        parametros = []
+        totais = self.restringir(lista_sql(dimensao, valores, parametros), parametros).agregar(
+            f"{dimensao} AS valor, {expressao} AS total", agrupar=dimensao
+        )
+        totais = dict(zip(totais["valor"], totais["total"]))
+        return pd.Series([int(totais.get(valor, 0)) for valor in valores], index=valores, name=metrica,
+                         dtype=np.int64)
+
+    def media_por(self, dimensao, metrica):
+        soma = self.somar_por(dimensao, metrica)
+        return soma / self.somar_por(dimensao, "contagem")
+
+    def contagem_odio(self):
+        totais = self.agregar(
+            "count(*) AS total, count(*) FILTER (WHERE resultado_analise != ?) AS odio",
+            parametros_selecao=[NAO_E_DISCURSO_ODIO],
+        )
+        total, odio = int(totais["total"].iloc[0]), int(totais["odio"].iloc[0])
+        contagem = pd.Series([odio, total - odio], index=ROTULOS_ODIO, name="count")
+        return contagem[contagem > 0]
+
+    def contagem_por_discurso_emocao(self):
+        tabela = self.agregar(
+            "resultado_analise, emocao, count(*) AS count", agrupar="resultado_analise, emocao",
+            ordem="resultado_analise, emocao",
+        )
+        tabela["count"] = tabela["count"].astype(np.int64)
+        return tabela
+
+    def contagem_por_periodo_discurso(self, granularidade=GRANULARIDADE_PADRAO):
+        # Mesmas chaves inteiras de cubo.periodo_de_dias, calculadas no DuckDB
+        tabela = self.agregar(
+            f"{EXPRESSOES_PERIODO[granularidade]} AS periodo, resultado_analise, count(*) AS count",
+            agrupar="periodo, resultado_analise", ordem="periodo, resultado_analise",
+        )
+        return tabela_periodos(tabela["periodo"].to_numpy(), tabela["resultado_analise"].to_numpy(),
+                               tabela["count"].to_numpy(), granularidade)
+
+    def filtrar_discursos(self, discursos):
+        parametros = []
+        return self.restringir(lista_sql("resultado_analise", discursos, parametros), parametros)
+
+
+def comparar_com_pandas(caminho_arquivo, data_inicio, data_fim):
+    # Confere, para todos os tipos e emoções no período, se cada visualização tem a
+    # mesma tabela nos dois backends; devolve os ids das que diferem
+    dados = ler_publicacoes(caminho_arquivo, COLUNAS_PAINEL)
+    fonte = FonteDuckDB(caminho_arquivo)
+    discursos = opcoes_filtro(dados, "resultado_analise")
+    emocoes = opcoes_filtro(dados, "emocao")
+    indice = []
+
+    def indice_palavras():
+        if not indice:
+            indice.append(IndicePalavras.construir(dados, ler_textos(caminho_arquivo)))
+        return indice[0]
+
+    filtros = (data_inicio, data_fim, discursos, emocoes)
+    contextos = [
+        ContextoVisoes(CuboAgregado(dados).fatiar(*filtros), indice_palavras, *filtros),
+        ContextoVisoes(fonte.fatiar(*filtros), lambda: fonte, *filtros),
+    ]
+    diferentes = []
+    for visao in VISOES:
+        tabelas = []
+        for contexto in contextos:
+            try:
+                tabelas.append(visao.tabela(contexto).astype(str).to_numpy().tolist())
+            except SemDados as aviso:
+                tabelas.append(str(aviso))
+        if tabelas[0] != tabelas[1]:
+            diferentes.append(visao.id)
+    fonte.fechar()
+    return diferentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara as tabelas dos gráficos entre os backends pandas e DuckDB.")
+    parser.add_argument("arquivo", help="CSV ou Parquet de publicações")
+    args = parser.parse_args()
+
+    diferentes = comparar_com_pandas(args.arquivo, DATA_INICIO_PADRAO, DATA_FIM_PADRAO)
+    if diferentes:
+        raise SystemExit(f"Tabelas diferentes entre pandas e DuckDB: {', '.join(diferentes)}")
+    print("Tabelas idênticas nos backends pandas e DuckDB.")
+
+
+if __name__ == "__main__":
+    main()
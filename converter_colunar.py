@@ -0,0 +1,20 @@
+# Converte os CSVs de publicações para o formato colunar (Parquet) lido pelo app.
+# Uso: python converter_colunar.py publicacoes.csv publicacoes_analizadas.csv
+import argparse
+
+from dados import converter_para_colunar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte CSVs de publicações para Parquet.")
+    parser.add_argument("arquivos", nargs="+", help="CSVs a converter")
+    parser.add_argument("--compressao", default="zstd", help="Codec de compressão do Parquet (padrão: zstd)")
+    args = parser.parse_args()
+
+    for caminho_csv in args.arquivos:
+        saida = converter_para_colunar(caminho_csv, compressao=args.compressao)
+        print(f"{caminho_csv} -> {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# Cubo pré-agregado para os gráficos do painel. As publicações são agrupadas uma
+# vez por (dia, resultado_analise, emocao, usuario), guardando a contagem e as
+# somas das métricas de engajamento. Cada gráfico soma as células do cubo que
+# atendem aos filtros em vez de reagrupar as linhas do conjunto de dados.
+import numpy as np
+import pandas as pd
+
+from dados import NAO_E_DISCURSO_ODIO, ROTULOS_ODIO
+
+METRICAS = ["upvotes", "comentarios", "visualizacoes", "engajamento"]
+DIMENSOES = ["resultado_analise", "emocao", "usuario"]
+
+EPOCA = np.datetime64("1970-01-01", "D")
+
+
+def dia_ordinal(data):
+    # Dias desde 1970-01-01, a mesma chave usada nas células do cubo
+    return int((np.datetime64(data, "D") - EPOCA).astype(np.int64))
+
+
+def mes_de_dias(dias):
+    # Chave inteira de mês (ano * 12 + mês - 1) a partir de dias ordinais
+    meses = dias.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return meses + 1970 * 12
+
+
+def rotulo_mes(chave):
+    return f"{chave // 12:04d}-{chave % 12 + 1:02d}"
+
+
+# Granularidades da série temporal: rótulo exibido -> chave
+GRANULARIDADES = {"Dia": "dia", "Semana": "semana", "Mês": "mes", "Trimestre": "trimestre"}
+GRANULARIDADE_PADRAO = "mes"
+ROTULOS_GRANULARIDADE = {chave: rotulo for rotulo, chave in GRANULARIDADES.items()}
+
+# Quantidade de usuários no ranking de "Frequência por usuário"
+QUANTIDADE_USUARIOS_PADRAO = 5
+
+
+def periodo_de_dias(dias, granularidade):
+    # Chave inteira do período (dia, semana, mês ou trimestre) a partir de dias ordinais
+    dias = np.asarray(dias, dtype=np.int64)
+    if granularidade == "dia":
+        return dias
+    if granularidade == "semana":
+        # Semanas começando na segunda-feira (1970-01-01 foi uma quinta)
+        return (dias + 3) // 7
+    if granularidade == "mes":
+        return mes_de_dias(dias)
+    if granularidade == "trimestre":
+        return mes_de_dias(dias) // 3
+    raise ValueError(f"Granularidade desconhecida: {granularidade}")
+
+
+def inicio_periodo(chaves, granularidade):
+    # Primeiro dia de cada período, para o eixo de datas do gráfico
+    chaves = np.asarray(chaves, dtype=np.int64)
+    if granularidade == "dia":
+        return EPOCA + chaves
+    if granularidade == "semana":
+        return EPOCA + chaves * 7 - 3
+    meses = chaves if granularidade == "mes" else chaves * 3
+    return (meses - 1970 * 12).astype("datetime64[M]").astype("datetime64[D]")
+
+
+def maiores(valores, quantidade):
+    # Posições dos `quantidade` maiores valores, do maior para o menor e, nos
+    # empates, pela posição. Seleção parcial (np.partition) em vez de ordenar o
+    # vetor inteiro: só os escolhidos são ordenados no final.
+    valores = np.asarray(valores)
+    if quantidade <= 0:
+        return np.array([], dtype=np.int64)
+    if quantidade < len(valores):
+        limiar = np.partition(valores, len(valores) - quantidade)[len(valores) - quantidade]
+        acima = np.flatnonzero(valores > limiar)
+        empatados = np.flatnonzero(valores == limiar)[:quantidade - len(acima)]
+        escolhidos = np.concatenate([acima, empatados])
+    else:
+        escolhidos = np.arange(len(valores))
+    return escolhidos[np.lexsort((escolhidos, -valores[escolhidos]))]
+
+
+def tabela_periodos(periodos, discursos, contagens, granularidade):
+    # Colunas "periodo" (chave inteira), início do período (coluna com o rótulo da
+    # granularidade), "resultado_analise" e "count", em ordem de período e tipo
+    return pd.DataFrame({
+        "periodo": np.asarray(periodos, dtype=np.int64),
+        ROTULOS_GRANULARIDADE[granularidade]: pd.to_datetime(inicio_periodo(periodos, granularidade)),
+        "resultado_analise": discursos,
+        "count": np.asarray(contagens, dtype=np.int64),
+    })
+
+
+class CuboAgregado:
+    def __init__(self, dados):
+        validos = dados[dados["hora_postagem"].notna()]
+        categorias = {
+            dim: validos[dim].astype("category").cat.categories for dim in DIMENSOES
+        }
+        chaves = pd.DataFrame({
+            "dia": (validos["hora_postagem"].to_numpy(dtype="datetime64[D]") - EPOCA).astype(np.int32),
+            **{dim: validos[dim].astype("category").cat.codes.to_numpy() for dim in DIMENSOES},
+        })
+        for metrica in METRICAS:
+            chaves[metrica] = validos[metrica].to_numpy(dtype=np.int64)
+
+        celulas = (
+            chaves.groupby(["dia"] + DIMENSOES, sort=True)
+            .agg(contagem=("dia", "size"), **{m: (m, "sum") for m in METRICAS})
+            .reset_index()
+        )
+        self.montar(categorias, celulas)
+
+    def montar(self, categorias, celulas):
+        # celulas: colunas "dia", códigos das DIMENSOES, "contagem" e METRICAS, em
+        # ordem de (dia, dimensões)
+        self.categorias = categorias
+        self.dia = celulas["dia"].to_numpy(dtype=np.int32)
+        # Chaves de período das células por granularidade; o mês é o padrão e as
+        # demais são calculadas na primeira vez que forem pedidas
+        self.periodos = {GRANULARIDADE_PADRAO: periodo_de_dias(self.dia, GRANULARIDADE_PADRAO)}
+        self.codigos = {dim: celulas[dim].to_numpy() for dim in DIMENSOES}
+        self.contagem = celulas["contagem"].to_numpy(dtype=np.int64)
+        self.somas = {m: celulas[m].to_numpy(dtype=np.int64) for m in METRICAS}
+        # Código do "não é discurso de ódio" (ou -2 se a categoria não existir)
+        discursos = self.categorias["resultado_analise"]
+        self.codigo_nao_odio = discursos.get_loc(NAO_E_DISCURSO_ODIO) if NAO_E_DISCURSO_ODIO in discursos else -2
+
+    def __len__(self):
+        return len(self.dia)
+
+    def acrescentar(self, novos):
+        # Cubo com as publicações novas somadas às células deste, sem reagrupar as
+        # publicações anteriores. As categorias de novos já devem incluir as deste
+        # cubo (dados.concatenar_publicacoes), para que o resultado seja igual ao
+        # de montar o cubo do conjunto completo
+        parcial = CuboAgregado(novos)
+        celulas = []
+        for cubo in (self, parcial):
+            colunas = {"dia": cubo.dia, "contagem": cubo.contagem, **cubo.somas}
+            for dim in DIMENSOES:
+                # Códigos traduzidos para as categorias do cubo parcial (-1 continua -1)
+                traducao = np.append(parcial.categorias[dim].get_indexer(cubo.categorias[dim]), -1)
+                colunas[dim] = traducao[cubo.codigos[dim]]
+            celulas.append(pd.DataFrame(colunas))
+        celulas = (
+            pd.concat(celulas, ignore_index=True)
+            .groupby(["dia"] + DIMENSOES, sort=True)[["contagem"] + METRICAS].sum()
+            .reset_index()
+        )
+        combinado = CuboAgregado.__new__(CuboAgregado)
+        combinado.montar(parcial.categorias, celulas)
+        return combinado
+
+    def periodo(self, granularidade):
+        if granularidade not in self.periodos:
+            self.periodos[granularidade] = periodo_de_dias(self.dia, granularidade)
+        return self.periodos[granularidade]
+
+    def selecao_codigos(self, dimensao, valores):
+        categorias = self.categorias[dimensao]
+        selecionados = np.zeros(len(categorias) + 1, dtype=bool)
+        posicoes = categorias.get_indexer(list(valores))
+        selecionados[posicoes[posicoes >= 0]] = True
+        # A última posição corresponde ao código -1 (valor nulo), nunca selecionado
+        return selecionados
+
+    def fatiar(self, data_inicio, data_fim, discursos, emocoes):
+        # Células dentro do intervalo de dias (busca binária) e das categorias escolhidas
+        a, b = np.searchsorted(self.dia, [dia_ordinal(data_inicio), dia_ordinal(data_fim) + 1])
+        discurso = self.codigos["resultado_analise"][a:b]
+        emocao = self.codigos["emocao"][a:b]
+        mascara = (
+            self.selecao_codigos("resultado_analise", discursos)[discurso]
+            & self.selecao_codigos("emocao", emocoes)[emocao]
+        )
+        return FatiaCubo(self, a + np.flatnonzero(mascara))
+
+
+class FatiaCubo:
+    def __init__(self, cubo, celulas):
+        self.cubo = cubo
+        self.celulas = celulas
+
+    def __len__(self):
+        return len(self.celulas)
+
+    def somente_odio(self):
+        discurso = self.cubo.codigos["resultado_analise"][self.celulas]
+        return FatiaCubo(self.cubo, self.celulas[discurso != self.cubo.codigo_nao_odio])
+
+    def valores(self, metrica):
+        if metrica == "contagem":
+            return self.cubo.contagem[self.celulas]
+        return self.cubo.somas[metrica][self.celulas]
+
+    def totais_por_codigo(self, dimensao, metrica="contagem"):
+        # Soma da métrica por código da dimensão e quais códigos aparecem na fatia
+        n_categorias = len(self.cubo.categorias[dimensao])
+        codigos = self.cubo.codigos[dimensao][self.celulas]
+        validos = codigos >= 0
+        codigos = codigos[validos]
+        totais = np.bincount(codigos, weights=self.valores(metrica)[validos], minlength=n_categorias)
+        presentes = np.bincount(codigos, minlength=n_categorias) > 0
+        return totais.astype(np.int64), presentes
+
+    def somar_por(self, dimensao, metrica="contagem"):
+        # Soma da métrica por categoria da dimensão, sem categorias vazias
+        totais, presentes = self.totais_por_codigo(dimensao, metrica)
+        return pd.Series(totais[presentes], index=self.cubo.categorias[dimensao][presentes], name=metrica)
+
+    def maiores_por(self, dimensao, quantidade, metrica="contagem"):
+        # As `quantidade` categorias de maior soma da métrica (empates pela ordem
+        # das categorias), sem ordenar todas as categorias presentes
+        totais, presentes = self.totais_por_codigo(dimensao, metrica)
+        codigos = np.flatnonzero(presentes)
+        codigos = codigos[maiores(totais[codigos], quantidade)]
+        return pd.Series(totais[codigos], index=self.cubo.categorias[dimensao][codigos], name=metrica)
+
+    def somar_para(self, dimensao, valores, metrica="contagem"):
+        # Soma da métrica para as categorias pedidas, na ordem pedida
+        totais, _ = self.totais_por_codigo(dimensao, metrica)
+        codigos = self.cubo.categorias[dimensao].get_indexer(list(valores))
+        return pd.Series(np.where(codigos >= 0, totais[codigos], 0), index=list(valores), name=metrica)
+
+    def media_por(self, dimensao, metrica):
+        soma = self.somar_por(dimensao, metrica)
+        return soma / self.somar_por(dimensao, "contagem")
+
+    def contagem_odio(self):
+        # Quantidade de publicações com e sem discurso de ódio
+        total = int(self.cubo.contagem[self.celulas].sum())
+        odio = int(self.somente_odio().valores("contagem").sum())
+        contagem = pd.Series([odio, total - odio], index=ROTULOS_ODIO, name="count")
+        return contagem[contagem > 0]
+
+    def contagem_por_discurso_emocao(self):
+        discurso = self.cubo.codigos["resultado_analise"][self.celulas]
+        emocao = self.cubo.codigos["emocao"][self.celulas]
+        n_emocoes = len(self.cubo.categorias["emocao"])
+        chave = discurso.astype(np.int64) * n_emocoes + emocao
+        chaves, inversos = np.unique(chave, return_inverse=True)
+        contagem = np.bincount(inversos, weights=self.valores("contagem")).astype(np.int64)
+        return pd.DataFrame({
+            "resultado_analise": self.cubo.categorias["resultado_analise"][chaves // n_emocoes],
+            "emocao": self.cubo.categorias["emocao"][chaves % n_emocoes],
+            "count": contagem,
+        })
+
+    def contagem_por_periodo_discurso(self, granularidade=GRANULARIDADE_PADRAO):
+        # Contagens diárias do cubo reagrupadas por período e tipo de discurso,
+        # com chaves inteiras (sem converter datas em texto)
+        periodo = self.cubo.periodo(granularidade)[self.celulas]
+        discurso = self.cubo.codigos["resultado_analise"][self.celulas]
+        n_discursos = len(self.cubo.categorias["resultado_analise"])
+        chaves, inversos = np.unique(periodo * n_discursos + discurso, return_inverse=True)
+        contagem = np.bincount(inversos, weights=self.valores("contagem")).astype(np.int64)
+        return tabela_periodos(
+            chaves // n_discursos, self.cubo.categorias["resultado_analise"][chaves % n_discursos],
+            contagem, granularidade,
+        )
+
+    def filtrar_discursos(self, discursos):
+        selecionados = self.cubo.selecao_codigos("resultado_analise", discursos)
+        discurso = self.cubo.codigos["resultado_analise"][self.celulas]
+        return FatiaCubo(self.cubo, self.celulas[selecionados[discurso]])
+
+
+# Tabelas prontas para cada gráfico do painel, calculadas a partir de uma fatia
+
+# Tipos que sempre aparecem no gráfico de visualizações, mesmo sem dados
+TIPOS_VISUALIZACOES = ["não é discurso de ódio", "racismo", "homofobia", "machismo", "sexismo"]
+
+
+def tabela_tipos_discurso(fatia):
+    discurso_tipo = fatia.somar_por("resultado_analise").sort_values(ascending=False, kind="stable")
+    discurso_tipo = discurso_tipo.reset_index()
+    discurso_tipo.columns = ["Tipo de Discurso", "Quantidade"]
+    return discurso_tipo
+
+
+def tabela_emocoes(fatia):
+    return fatia.somente_odio().contagem_por_discurso_emocao()
+
+
+def tabela_frequencia_tipo(fatia, granularidade=GRANULARIDADE_PADRAO):
+    # Todos os tipos selecionados no filtro, por período
+    return fatia.contagem_por_periodo_discurso(granularidade)
+
+
+def tabela_media_likes(fatia):
+    media_upvotes = fatia.media_por("resultado_analise", "upvotes").reset_index()
+    media_upvotes.columns = ["Tipo de Discurso", "Média de Likes"]
+    return media_upvotes
+
+
+def tabela_visualizacoes(fatia):
+    visualizacoes = fatia.somar_por("resultado_analise", "visualizacoes")
+    visualizacoes.index = visualizacoes.index.astype(object)
+    # Garantir que todos os tipos de discurso apareçam, mesmo os sem dados
+    for tipo in TIPOS_VISUALIZACOES:
+        if tipo not in visualizacoes.index:
+            visualizacoes[tipo] = 0
+    visualizacoes_por_tipo = visualizacoes.rename_axis("resultado_analise").reset_index(name="visualizacoes")
+    # Ordenar as barras em ordem decrescente de visualizações
+    return visualizacoes_por_tipo.sort_values("visualizacoes", ascending=False, kind="stable")
+
+
+def tabela_frequencia_usuario(fatia, quantidade=QUANTIDADE_USUARIOS_PADRAO):
+    # Usuários com mais publicações de ódio na fatia e a participação de cada um no
+    # engajamento (upvotes + comentários) de todas as publicações de ódio da fatia
+    odio = fatia.somente_odio()
+    frequencia = odio.maiores_por("usuario", quantidade)
+    engajamento = odio.somar_para("usuario", frequencia.index, "engajamento").to_numpy()
+    total = int(odio.valores("engajamento").sum())
+    return pd.DataFrame({
+        "usuario": frequencia.index,
+        "quantidade_postagens": frequencia.to_numpy(),
+        "participacao_engajamento": engajamento / total if total else np.zeros(len(engajamento)),
+    })
+
+
+def tabela_comentarios(fatia):
+    comentarios = fatia.somente_odio().somar_por("resultado_analise", "comentarios")
+    return comentarios.rename_axis("resultado_analise").reset_index(name="comentarios")
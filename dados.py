@@ -0,0 +1,210 @@
+# Camada de carregamento das publicações: leitura tipada do CSV (ou do arquivo
+# colunar convertido) e cálculo das colunas derivadas uma única vez por versão.
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_NECESSARIAS = ["resultado_analise", "emocao", "hora_postagem", "upvotes", "comentarios", "texto"]
+
+# Colunas usadas pelos filtros, gráficos e tabela; o texto fica de fora e só é
+# carregado sob demanda para a tabela e a nuvem de palavras. id e subreddit não
+# são exibidos e não ficam na memória do app
+COLUNAS_PAINEL = ["usuario", "upvotes", "comentarios", "visualizacoes",
+                  "hora_postagem", "resultado_analise", "emocao"]
+
+# Colunas exigidas pelo cálculo das colunas derivadas
+COLUNAS_DERIVACAO = ["hora_postagem", "upvotes", "comentarios", "resultado_analise"]
+
+# Tipos explícitos evitam a inferência do pandas (object/int64) e reduzem a memória
+TIPOS_COLUNAS = {
+    "id": "string",
+    "usuario": "category",
+    "texto": "string",
+    "upvotes": "int32",
+    "comentarios": "int32",
+    "compartilhamentos": "int32",
+    "visualizacoes": "int32",
+    "engajamento": "int32",
+    "frequencia_postagens_usuario": "int32",
+    "resultado_analise": "category",
+    "emocao": "category",
+    "link": "string",
+    "subreddit": "category",
+}
+
+NAO_E_DISCURSO_ODIO = "não é discurso de ódio"
+ROTULOS_ODIO = ["Discurso de Ódio", "Não é Discurso de Ódio"]
+
+EXTENSAO_COLUNAR = ".parquet"
+
+
+def caminho_colunar(caminho_arquivo):
+    return os.path.splitext(caminho_arquivo)[0] + EXTENSAO_COLUNAR
+
+
+def resolver_fonte(caminho_arquivo):
+    # Prefere o arquivo colunar convertido quando ele existe e é mais novo que o
+    # CSV; caso contrário o CSV continua sendo a fonte
+    if caminho_arquivo.endswith(EXTENSAO_COLUNAR):
+        return caminho_arquivo
+    colunar = caminho_colunar(caminho_arquivo)
+    try:
+        if os.stat(colunar).st_mtime_ns >= os.stat(caminho_arquivo).st_mtime_ns:
+            return colunar
+    except FileNotFoundError:
+        pass
+    return caminho_arquivo
+
+
+def versao_arquivo(caminho_arquivo):
+    # Identifica a versão do arquivo pelo caminho, data de modificação e tamanho;
+    # qualquer alteração no arquivo gera uma chave nova e invalida o cache
+    fonte = resolver_fonte(caminho_arquivo)
+    info = os.stat(fonte)
+    return (os.path.abspath(fonte), info.st_mtime_ns, info.st_size)
+
+
+def hash_arquivo(caminho_arquivo):
+    # Identifica o conteúdo do arquivo independentemente de onde e quando foi
+    # copiado; usado para conferir se relatórios pré-calculados ainda valem
+    fonte = resolver_fonte(caminho_arquivo)
+    resumo = hashlib.sha256()
+    with open(fonte, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def colunas_disponiveis(fonte):
+    if fonte.endswith(EXTENSAO_COLUNAR):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(fonte).names)
+    # Ler somente o cabeçalho do CSV
+    return list(pd.read_csv(fonte, nrows=0).columns)
+
+
+def ler_colunas(caminho_arquivo, colunas=None):
+    # Lê apenas as colunas pedidas (todas quando colunas=None), já tipadas
+    fonte = resolver_fonte(caminho_arquivo)
+    existentes = colunas_disponiveis(fonte)
+    if colunas is not None:
+        colunas = [col for col in existentes if col in colunas]
+
+    if fonte.endswith(EXTENSAO_COLUNAR):
+        return pd.read_parquet(fonte, columns=colunas)
+
+    lidas = existentes if colunas is None else colunas
+    tipos = {col: tipo for col, tipo in TIPOS_COLUNAS.items() if col in lidas}
+    return pd.read_csv(fonte, usecols=colunas, dtype=tipos)
+
+
+def ler_publicacoes(caminho_arquivo, colunas=None):
+    existentes = colunas_disponiveis(resolver_fonte(caminho_arquivo))
+    colunas_faltando = [col for col in COLUNAS_NECESSARIAS if col not in existentes]
+    if colunas_faltando:
+        raise ValueError(f"As colunas ausentes são: {colunas_faltando}. Verifique o arquivo CSV.")
+
+    if colunas is not None:
+        colunas = list(dict.fromkeys(list(colunas) + COLUNAS_DERIVACAO))
+    return ordenar_por_data(calcular_colunas_derivadas(ler_colunas(caminho_arquivo, colunas)))
+
+
+def ordenar_por_data(dados):
+    # Ordem cronológica (datas inválidas primeiro) para que o índice de filtros
+    # resolva o intervalo de datas por busca binária. O índice original é
+    # mantido e continua apontando para a linha do arquivo
+    return dados.sort_values("hora_postagem", kind="stable", na_position="first")
+
+
+def concatenar_publicacoes(dados, novos):
+    # Acrescenta publicações (já com as colunas derivadas) a um conjunto carregado
+    # por ler_publicacoes. As categorias dos dois lados são unidas em ordem
+    # alfabética, como na leitura do CSV, e a ordem cronológica é refeita: o
+    # resultado é o mesmo de ler o arquivo com as novas linhas no final
+    novos = novos[list(dados.columns)]
+    colunas = {}
+    for coluna in dados.columns:
+        if isinstance(dados[coluna].dtype, pd.CategoricalDtype):
+            anteriores = dados[coluna].cat.categories
+            recebidas = novos[coluna].astype("category").cat.categories
+            if not recebidas.isin(anteriores).all():
+                categorias = anteriores.union(recebidas)
+                colunas[coluna] = (dados[coluna].cat.set_categories(categorias),
+                                   novos[coluna].astype(pd.CategoricalDtype(categorias)))
+            else:
+                colunas[coluna] = (dados[coluna], novos[coluna].astype(dados[coluna].dtype))
+    if colunas:
+        dados = dados.assign(**{coluna: partes[0] for coluna, partes in colunas.items()})
+        novos = novos.assign(**{coluna: partes[1] for coluna, partes in colunas.items()})
+    return ordenar_por_data(pd.concat([dados, novos]))
+
+
+def colapsar_duplicatas(dados, grupos, mantidos=()):
+    # Mantém uma publicação por grupo de quase duplicatas (duplicatas.py): a de
+    # menor linha do arquivo, a menos que o grupo já esteja em mantidos. Como a
+    # ingestão só acrescenta linhas no final, a publicação mantida não muda
+    # quando chegam duplicatas dela. grupos tem o índice de dados; publicações
+    # fora do índice de duplicatas (<NA>) são sempre mantidas
+    repetidas = grupos.sort_index().duplicated().reindex(grupos.index) | grupos.isin(mantidos)
+    return dados[grupos.isna() | ~repetidas]
+
+
+def ler_textos(caminho_arquivo):
+    # Série de textos indexada pela linha do arquivo, o mesmo índice de ler_publicacoes
+    return ler_colunas(caminho_arquivo, ["texto"])["texto"]
+
+
+def ler_textos_linhas(caminho_arquivo, linhas, tamanho_bloco=50_000):
+    # Textos só das linhas do arquivo pedidas (por exemplo, a página da tabela),
+    # indexados pela linha, sem manter a coluna inteira em memória. No Parquet só
+    # os grupos de linhas que as contêm são lidos; no CSV a leitura é feita em
+    # blocos e termina no bloco da última linha pedida
+    linhas = np.unique(np.asarray(linhas, dtype=np.int64))
+    if not len(linhas):
+        return pd.Series(dtype=TIPOS_COLUNAS["texto"], name="texto")
+    fonte = resolver_fonte(caminho_arquivo)
+    partes = []
+    if fonte.endswith(EXTENSAO_COLUNAR):
+        import pyarrow.parquet as pq
+        arquivo = pq.ParquetFile(fonte)
+        tamanhos = [arquivo.metadata.row_group(i).num_rows for i in range(arquivo.num_row_groups)]
+        inicios = np.cumsum([0] + tamanhos)
+        for grupo in np.unique(np.searchsorted(inicios, linhas, side="right") - 1):
+            textos = arquivo.read_row_group(int(grupo), columns=["texto"]).column("texto").to_pandas()
+            textos.index += int(inicios[grupo])
+            partes.append(textos[textos.index.isin(linhas)])
+    else:
+        with pd.read_csv(fonte, usecols=["texto"], dtype={"texto": TIPOS_COLUNAS["texto"]},
+                         chunksize=tamanho_bloco) as leitor:
+            for bloco in leitor:
+                partes.append(bloco["texto"][bloco.index.isin(linhas)])
+                if bloco.index[-1] >= linhas[-1]:
+                    break
+    return pd.concat(partes).astype(TIPOS_COLUNAS["texto"]).rename("texto")
+
+
+def calcular_colunas_derivadas(dados):
+    # Todas as colunas derivadas são calculadas de forma vetorizada, sem colunas
+    # de texto por linha (a tabela exibe a própria hora_postagem)
+    dados["hora_postagem"] = pd.to_datetime(dados["hora_postagem"], errors="coerce")
+    dados["engajamento"] = (dados["upvotes"] + dados["comentarios"]).astype("int32")
+    dados["eh_discurso_odio"] = pd.Categorical(
+        np.where(dados["resultado_analise"] != NAO_E_DISCURSO_ODIO, ROTULOS_ODIO[0], ROTULOS_ODIO[1]),
+        categories=ROTULOS_ODIO,
+    )
+    return dados
+
+
+def converter_para_colunar(caminho_csv, caminho_saida=None, compressao="zstd"):
+    # Converte o CSV para Parquet comprimido, mantendo os tipos explícitos e a
+    # data já convertida, para que a leitura não precise interpretar texto
+    caminho_saida = caminho_saida or caminho_colunar(caminho_csv)
+    colunas = list(pd.read_csv(caminho_csv, nrows=0).columns)
+    tipos = {col: tipo for col, tipo in TIPOS_COLUNAS.items() if col in colunas}
+    dados = pd.read_csv(caminho_csv, dtype=tipos)
+    if "hora_postagem" in dados.columns:
+        dados["hora_postagem"] = pd.to_datetime(dados["hora_postagem"], errors="coerce")
+    dados.to_parquet(caminho_saida, engine="pyarrow", compression=compressao, index=False)
+    return caminho_saida
@@ -0,0 +1,372 @@
+# Detecção de publicações quase duplicadas (copiadas ou levemente editadas) pelo
+# texto. Cada texto vira o conjunto de sequências de 3 palavras (shingles), que é
+# resumido em uma assinatura MinHash de 128 valores: a fração de valores iguais
+# entre duas assinaturas estima a similaridade de Jaccard dos dois conjuntos.
+# As assinaturas são divididas em 16 faixas de 8 valores (LSH); só publicações que
+# coincidem em uma faixa inteira são comparadas, o que evita comparar todos os
+# pares. Pares com similaridade estimada acima do limiar ficam no mesmo grupo, e
+# o grupo é identificado pelo id da primeira publicação indexada dele.
+#
+# As assinaturas, as faixas e os grupos ficam em um arquivo SQLite; publicações
+# novas são comparadas apenas com as que caem nas mesmas faixas, sem reprocessar
+# o corpus. Com ANALISE_COLAPSAR_DUPLICATAS=1 o app mantém só a primeira
+# publicação de cada grupo nos gráficos e na tabela.
+#
+# Uso: python duplicatas.py publicacoes.csv [--limiar 0.8] [--saida grupos.csv]
+import argparse
+import logging
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from cache_classificacao import normalizar_texto
+from dados import ler_colunas
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_PADRAO = ".duplicatas.sqlite3"
+
+TAMANHO_SHINGLE = 3
+NUM_PERMUTACOES = 128
+# 16 faixas de 8 valores: pares com Jaccard acima de ~0,7 quase sempre coincidem
+# em alguma faixa, e pares abaixo de ~0,4 quase nunca
+FAIXAS = 16
+LIMIAR_PADRAO = 0.8
+TAMANHO_LOTE = 20000
+
+# Permutações h(x) = (a * x + b) mod PRIMO sobre o crc32 de cada shingle; com
+# x, a < 2**32 as contas cabem em uint64. A semente é fixa para que as assinaturas
+# gravadas continuem comparáveis com as de publicações novas
+PRIMO = 4294967291  # maior primo abaixo de 2**32
+SEMENTE = 20240817
+_gerador = np.random.default_rng(SEMENTE)
+COEFICIENTES_A = _gerador.integers(1, PRIMO, NUM_PERMUTACOES, dtype=np.uint64)
+COEFICIENTES_B = _gerador.integers(0, PRIMO, NUM_PERMUTACOES, dtype=np.uint64)
+# Assinatura de textos sem palavras; nunca produzida por um shingle
+VAZIA = np.iinfo(np.uint32).max
+
+PARAMETROS = {
+    "tamanho_shingle": TAMANHO_SHINGLE,
+    "num_permutacoes": NUM_PERMUTACOES,
+    "faixas": FAIXAS,
+    "semente": SEMENTE,
+}
+
+PADRAO_PALAVRA = re.compile(r"\w+")
+
+
+def shingles(texto, tamanho=TAMANHO_SHINGLE):
+    # Sequências de palavras do texto normalizado; pontuação e espaços não contam
+    palavras = PADRAO_PALAVRA.findall(normalizar_texto(texto))
+    if len(palavras) <= tamanho:
+        return {" ".join(palavras)} if palavras else set()
+    return {" ".join(palavras[i:i + tamanho]) for i in range(len(palavras) - tamanho + 1)}
+
+
+def hashes_shingles(texto):
+    conjunto = shingles(texto)
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in conjunto), dtype=np.uint64, count=len(conjunto))
+
+
+def assinaturas(textos, lote=256):
+    # Matriz (len(textos), NUM_PERMUTACOES) de uint32; os textos são processados em
+    # lotes, com o mínimo de cada permutação tirado por texto com reduceat
+    resultado = np.full((len(textos), NUM_PERMUTACOES), VAZIA, dtype=np.uint32)
+    for inicio in range(0, len(textos), lote):
+        partes = [hashes_shingles(texto) for texto in textos[inicio:inicio + lote]]
+        tamanhos = np.array([len(parte) for parte in partes])
+        cheios = np.flatnonzero(tamanhos)
+        if not len(cheios):
+            continue
+        valores = np.concatenate([partes[i] for i in cheios])
+        permutados = (valores[:, None] * COEFICIENTES_A + COEFICIENTES_B) % PRIMO
+        limites = np.concatenate([[0], np.cumsum(tamanhos[cheios])[:-1]])
+        resultado[inicio + cheios] = np.minimum.reduceat(permutados, limites, axis=0)
+    return resultado
+
+
+def chaves_faixas(assinaturas):
+    # Uma chave de 64 bits por faixa (multiplicação com estouro proposital), com
+    # sinal para caber em um INTEGER do SQLite
+    faixas = assinaturas.reshape(len(assinaturas), FAIXAS, -1).astype(np.uint64)
+    chaves = np.zeros((len(assinaturas), FAIXAS), dtype=np.uint64)
+    for j in range(faixas.shape[2]):
+        chaves = chaves * np.uint64(1000003) + faixas[:, :, j]
+    return chaves.view(np.int64)
+
+
+def similaridade(assinatura_a, assinatura_b):
+    return float(np.mean(assinatura_a == assinatura_b))
+
+
+def blocos(valores, tamanho=500):
+    # O SQLite limita a quantidade de parâmetros por consulta
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+
+class IndiceDuplicatas:
+    def __init__(self, caminho=CAMINHO_PADRAO, limiar=LIMIAR_PADRAO):
+        self.caminho = caminho
+        self.limiar = limiar
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.trava = threading.Lock()
+        with self.conexao:
+            # ordem: posição de chegada da publicação; grupo: ordem da primeira
+            # publicação do grupo
+            self.conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS assinaturas (
+                    ordem INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    grupo INTEGER NOT NULL,
+                    assinatura BLOB NOT NULL
+                )
+                """
+            )
+            self.conexao.execute("CREATE INDEX IF NOT EXISTS assinaturas_grupo ON assinaturas (grupo)")
+            self.conexao.execute(
+                "CREATE TABLE IF NOT EXISTS faixas (faixa INTEGER NOT NULL, balde INTEGER NOT NULL, "
+                "ordem INTEGER NOT NULL)"
+            )
+            self.conexao.execute("CREATE INDEX IF NOT EXISTS faixas_balde ON faixas (faixa, balde)")
+            # Registro das uniões de grupos, para quem guarda grupos já lidos
+            self.conexao.execute(
+                "CREATE TABLE IF NOT EXISTS unioes (sequencia INTEGER PRIMARY KEY, anterior TEXT NOT NULL, "
+                "grupo TEXT NOT NULL)"
+            )
+            self.conexao.execute("CREATE TABLE IF NOT EXISTS parametros (chave TEXT PRIMARY KEY, valor TEXT)")
+            gravados = dict(self.conexao.execute("SELECT chave, valor FROM parametros"))
+            if not gravados:
+                self.conexao.executemany("INSERT INTO parametros VALUES (?, ?)",
+                                         [(chave, str(valor)) for chave, valor in PARAMETROS.items()])
+            elif gravados != {chave: str(valor) for chave, valor in PARAMETROS.items()}:
+                raise ValueError(f"O índice {caminho} foi criado com outros parâmetros de MinHash: {gravados}. "
+                                 "Apague o arquivo para recriá-lo.")
+
+    def indexados(self, ids):
+        encontrados = set()
+        for bloco in blocos(ids):
+            marcadores = ", ".join("?" * len(bloco))
+            linhas = self.conexao.execute(f"SELECT id FROM assinaturas WHERE id IN ({marcadores})", bloco)
+            encontrados.update(id_ for id_, in linhas)
+        return encontrados
+
+    def membros_faixas(self, chaves):
+        # Publicações já indexadas que caem em alguma das faixas (faixa, balde)
+        membros = []
+        for faixa in range(FAIXAS):
+            for bloco in blocos(np.unique(chaves[:, faixa]).tolist()):
+                marcadores = ", ".join("?" * len(bloco))
+                membros.extend(self.conexao.execute(
+                    f"SELECT faixa, balde, ordem FROM faixas WHERE faixa = ? AND balde IN ({marcadores})",
+                    [faixa, *bloco],
+                ))
+        return pd.DataFrame(membros, columns=["faixa", "balde", "ordem"], dtype="int64")
+
+    def carregar(self, ordens):
+        # Assinatura e grupo das publicações indexadas
+        carregados = {}
+        for bloco in blocos(ordens):
+            marcadores = ", ".join("?" * len(bloco))
+            linhas = self.conexao.execute(
+                f"SELECT ordem, grupo, assinatura FROM assinaturas WHERE ordem IN ({marcadores})", bloco
+            )
+            for ordem, grupo, assinatura in linhas:
+                carregados[ordem] = (grupo, np.frombuffer(assinatura, dtype=np.uint32))
+        return carregados
+
+    def adicionar(self, ids, textos):
+        # Indexa as publicações cujo id ainda não está no índice e as agrupa com as
+        # quase duplicatas já indexadas ou do mesmo lote. Devolve quantas entraram
+        ids = [str(id_) for id_ in ids]
+        textos = list(textos)
+        with self.trava:
+            ja_indexados = self.indexados(ids)
+            vistos = set()
+            novos = []
+            for posicao, id_ in enumerate(ids):
+                if id_ not in ja_indexados and id_ not in vistos:
+                    vistos.add(id_)
+                    novos.append(posicao)
+            if not novos:
+                return 0
+
+            matriz = assinaturas([textos[posicao] for posicao in novos])
+            chaves = chaves_faixas(matriz)
+            proxima, = self.conexao.execute("SELECT COALESCE(MAX(ordem), -1) + 1 FROM assinaturas").fetchone()
+            ordens = np.arange(proxima, proxima + len(novos), dtype=np.int64)
+            # Textos sem palavras não entram nas faixas e formam grupos próprios
+            com_texto = ~(matriz == VAZIA).all(axis=1)
+
+            existentes = self.membros_faixas(chaves[com_texto])
+            carregados = self.carregar(existentes["ordem"].unique().tolist())
+            assinatura = {ordem: valores for ordem, (grupo, valores) in carregados.items()}
+            assinatura.update(zip(ordens.tolist(), matriz))
+
+            # Conjuntos disjuntos cuja raiz é sempre a menor ordem (a publicação
+            # mais antiga); as já indexadas começam no grupo gravado
+            pais = {}
+            for ordem, (grupo, valores) in carregados.items():
+                pais[ordem] = grupo
+                pais.setdefault(grupo, grupo)
+            grupos_anteriores = {grupo for grupo, valores in carregados.values()}
+
+            def raiz(ordem):
+                caminho = []
+                while pais.get(ordem, ordem) != ordem:
+                    caminho.append(ordem)
+                    ordem = pais[ordem]
+                for passo in caminho:
+                    pais[passo] = ordem
+                return ordem
+
+            # Os candidatos de uma publicação nova são todos os membros anteriores
+            # dos baldes em que ela cai; membros que já estão no grupo dela não
+            # são comparados, e cada par é comparado uma vez, mesmo que coincida
+            # em várias faixas. Baldes com um único membro (a maioria) são
+            # descartados antes do laço
+            novos_membros = pd.DataFrame({
+                "faixa": np.tile(np.arange(FAIXAS), int(com_texto.sum())),
+                "balde": chaves[com_texto].ravel(),
+                "ordem": np.repeat(ordens[com_texto], FAIXAS),
+            })
+            membros = pd.concat([existentes, novos_membros], ignore_index=True)
+            membros = membros.sort_values(["faixa", "balde", "ordem"], kind="stable")
+            membros = membros[membros.groupby(["faixa", "balde"])["ordem"].transform("size") > 1]
+            faixa_balde = membros[["faixa", "balde"]].to_numpy()
+            inicios = np.flatnonzero((faixa_balde[1:] != faixa_balde[:-1]).any(axis=1)) + 1
+            comparados = set()
+            for balde in np.split(membros["ordem"].to_numpy(), inicios):
+                # As novas têm as maiores ordens e ficam no fim do balde
+                if balde[-1] < proxima:
+                    continue
+                balde = balde.tolist()
+                for posicao in range(1, len(balde)):
+                    ordem = balde[posicao]
+                    if ordem < proxima:
+                        continue
+                    for outra in balde[:posicao]:
+                        if (outra, ordem) in comparados or raiz(outra) == raiz(ordem):
+                            continue
+                        comparados.add((outra, ordem))
+                        if similaridade(assinatura[outra], assinatura[ordem]) >= self.limiar:
+                            raiz_a, raiz_b = raiz(outra), raiz(ordem)
+                            pais[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+            with self.conexao:
+                # Uma publicação nova que liga dois grupos antigos os une no mais antigo
+                for grupo in grupos_anteriores:
+                    if raiz(grupo) != grupo:
+                        self.conexao.execute("UPDATE assinaturas SET grupo = ? WHERE grupo = ?", (raiz(grupo), grupo))
+                        self.conexao.execute(
+                            "INSERT INTO unioes (anterior, grupo) SELECT a.id, r.id FROM assinaturas a, assinaturas r "
+                            "WHERE a.ordem = ? AND r.ordem = ?",
+                            (grupo, raiz(grupo)),
+                        )
+                self.conexao.executemany(
+                    "INSERT INTO assinaturas VALUES (?, ?, ?, ?)",
+                    [(ordem, ids[posicao], raiz(ordem), valores.tobytes())
+                     for ordem, posicao, valores in zip(ordens.tolist(), novos, matriz)],
+                )
+                self.conexao.executemany(
+                    "INSERT INTO faixas VALUES (?, ?, ?)",
+                    novos_membros[["faixa", "balde", "ordem"]].itertuples(index=False, name=None),
+                )
+            return len(novos)
+
+    def grupos(self, ids):
+        # Série id -> id da primeira publicação do grupo; ids fora do índice ficam
+        # com <NA>
+        ids = pd.Index(pd.Series(ids, dtype="string"))
+        encontrados = {}
+        with self.trava:
+            for bloco in blocos(ids.dropna().unique()):
+                marcadores = ", ".join("?" * len(bloco))
+                encontrados.update(self.conexao.execute(
+                    "SELECT a.id, r.id FROM assinaturas a JOIN assinaturas r ON r.ordem = a.grupo "
+                    f"WHERE a.id IN ({marcadores})",
+                    bloco,
+                ))
+        return pd.Series(ids.map(encontrados), index=ids, dtype="string")
+
+    def unioes_desde(self, sequencia):
+        # Uniões (sequencia, grupo anterior, grupo atual) posteriores a sequencia
+        with self.trava:
+            return self.conexao.execute(
+                "SELECT sequencia, anterior, grupo FROM unioes WHERE sequencia > ? ORDER BY sequencia", (sequencia,)
+            ).fetchall()
+
+    def ultima_uniao(self):
+        with self.trava:
+            return self.conexao.execute("SELECT COALESCE(MAX(sequencia), 0) FROM unioes").fetchone()[0]
+
+    def todos_grupos(self):
+        with self.trava:
+            linhas = self.conexao.execute(
+                "SELECT a.id, r.id FROM assinaturas a JOIN assinaturas r ON r.ordem = a.grupo ORDER BY a.ordem"
+            ).fetchall()
+        return pd.DataFrame(linhas, columns=["id", "grupo_duplicata"], dtype="string")
+
+    def estatisticas(self):
+        with self.trava:
+            total, grupos = self.conexao.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT grupo) FROM assinaturas"
+            ).fetchone()
+            repetidos, = self.conexao.execute(
+                "SELECT COUNT(*) FROM (SELECT grupo FROM assinaturas GROUP BY grupo HAVING COUNT(*) > 1)"
+            ).fetchone()
+        return {
+            "publicacoes": total,
+            "grupos": grupos,
+            "grupos_com_duplicatas": repetidos,
+            "duplicatas": total - grupos,
+        }
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def indexar_arquivo(caminho_arquivo, indice, tamanho_lote=TAMANHO_LOTE):
+    # Indexa as publicações do arquivo que ainda não estão no índice, em lotes
+    # para limitar a memória das assinaturas
+    publicacoes = ler_colunas(caminho_arquivo, ["id", "texto"])
+    if "id" not in publicacoes.columns:
+        raise ValueError("A detecção de duplicatas precisa da coluna id. Verifique o arquivo CSV.")
+    publicacoes = publicacoes[publicacoes["id"].notna()]
+    total = 0
+    for inicio in range(0, len(publicacoes), tamanho_lote):
+        lote = publicacoes.iloc[inicio:inicio + tamanho_lote]
+        total += indice.adicionar(lote["id"], lote["texto"].fillna(""))
+        logger.info("%d de %d publicações processadas", min(inicio + tamanho_lote, len(publicacoes)),
+                    len(publicacoes))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrupa publicações quase duplicadas (MinHash + LSH sobre o texto).")
+    parser.add_argument("csv", help="CSV (ou Parquet) de publicações com as colunas id e texto")
+    parser.add_argument("--indice", default=CAMINHO_PADRAO, help="Arquivo SQLite com as assinaturas e os grupos")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_PADRAO,
+                        help="Similaridade de Jaccard estimada a partir da qual duas publicações são duplicatas")
+    parser.add_argument("--saida", help="CSV a ser gravado com as colunas id e grupo_duplicata")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    indice = IndiceDuplicatas(args.indice, args.limiar)
+    novas = indexar_arquivo(args.csv, indice)
+    estatisticas = indice.estatisticas()
+    print(f"{novas} publicações indexadas; {estatisticas['duplicatas']} duplicatas em "
+          f"{estatisticas['grupos_com_duplicatas']} grupos ({estatisticas['publicacoes']} publicações no índice)")
+    if args.saida:
+        indice.todos_grupos().to_csv(args.saida, index=False)
+        print(f"Grupos gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
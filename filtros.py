@@ -0,0 +1,74 @@
+# Índice de filtros construído uma vez por versão do conjunto de dados.
+# Os dados chegam ordenados por hora_postagem (ver dados.ler_publicacoes), então o
+# intervalo de datas vira uma fatia obtida por busca binária, e cada categoria de
+# resultado_analise/emocao guarda a lista ordenada das linhas em que aparece.
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+
+def instantes_em_ns(serie):
+    # Valores int64 em nanossegundos; NaT vira o menor int64 e fica no início
+    return serie.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def linhas_por_categoria(serie):
+    categorica = serie.astype("category")
+    codigos = categorica.cat.codes.to_numpy()
+    # argsort estável agrupa as linhas por código mantendo a ordem cronológica
+    ordem = np.argsort(codigos, kind="stable")
+    limites = np.searchsorted(codigos[ordem], np.arange(len(categorica.cat.categories) + 1))
+    return {
+        categoria: ordem[limites[i]:limites[i + 1]]
+        for i, categoria in enumerate(categorica.cat.categories)
+    }
+
+
+class IndiceFiltros:
+    def __init__(self, dados):
+        self.total = len(dados)
+        self.instantes = instantes_em_ns(dados["hora_postagem"])
+        if np.any(self.instantes[1:] < self.instantes[:-1]):
+            raise ValueError("Os dados precisam estar ordenados por 'hora_postagem'.")
+        self.linhas_discurso = linhas_por_categoria(dados["resultado_analise"])
+        self.linhas_emocao = linhas_por_categoria(dados["emocao"])
+        # Sem valores nulos, selecionar todas as categorias equivale a não filtrar
+        self.discurso_completo = sum(map(len, self.linhas_discurso.values())) == self.total
+        self.emocao_completa = sum(map(len, self.linhas_emocao.values())) == self.total
+
+    def intervalo(self, data_inicio, data_fim):
+        # Posições [inicio, fim) das publicações entre as duas datas (inclusive)
+        limite_inicio = pd.Timestamp(data_inicio).value
+        limite_fim = pd.Timestamp(data_fim + dt.timedelta(days=1)).value
+        inicio = np.searchsorted(self.instantes, limite_inicio, side="left")
+        fim = np.searchsorted(self.instantes, limite_fim, side="left")
+        return inicio, max(inicio, fim)
+
+    def linhas_categorias(self, linhas_por_valor, completo, valores, inicio, fim):
+        selecionados = [linhas_por_valor[v] for v in dict.fromkeys(valores) if v in linhas_por_valor]
+        if completo and len(selecionados) == len(linhas_por_valor):
+            # Todas as categorias selecionadas: nenhuma restrição além da data
+            return None
+        partes = []
+        for linhas in selecionados:
+            # Cada lista é ordenada, então o recorte por data também é uma busca binária
+            a, b = np.searchsorted(linhas, [inicio, fim])
+            partes.append(linhas[a:b])
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(partes))
+
+    def filtrar(self, data_inicio, data_fim, discursos, emocoes):
+        # Posições (iloc), em ordem cronológica, das linhas que atendem aos filtros
+        inicio, fim = self.intervalo(data_inicio, data_fim)
+        por_discurso = self.linhas_categorias(self.linhas_discurso, self.discurso_completo, discursos, inicio, fim)
+        por_emocao = self.linhas_categorias(self.linhas_emocao, self.emocao_completa, emocoes, inicio, fim)
+
+        if por_discurso is None and por_emocao is None:
+            return np.arange(inicio, fim, dtype=np.int64)
+        if por_discurso is None:
+            return por_emocao
+        if por_emocao is None:
+            return por_discurso
+        return np.intersect1d(por_discurso, por_emocao, assume_unique=True)
@@ -0,0 +1,202 @@
+# Construção das figuras do painel a partir das tabelas já agregadas.
+# As funções não dependem do Streamlit, para que possam ser reutilizadas fora do app.
+import matplotlib.pyplot as plt
+import plotly.express as px
+from wordcloud import WordCloud
+
+
+def aplicar_estilo(fig):
+    fig.update_layout(
+        plot_bgcolor="black",
+        paper_bgcolor="black",
+        font=dict(color="white"),
+        title_font=dict(size=18, family="Arial, sans-serif", color="white"),
+        margin=dict(t=40, b=40, l=40, r=40)
+    )
+    return fig
+
+
+def figura_discurso_odio(contagem_odio):
+    # contagem_odio: quantidade de publicações por rótulo (ódio / não ódio)
+    tabela = contagem_odio.rename_axis("eh_discurso_odio").reset_index(name="count")
+
+    # Criando o gráfico de pizza com modificações para um gráfico redondo e fundo preto
+    fig1 = px.pie(
+        tabela,
+        names="eh_discurso_odio",
+        values="count",
+        title="Discurso de Ódio vs Não é Discurso de Ódio",
+        hole=0,  # Retira o buraco central para um gráfico totalmente redondo
+        color_discrete_sequence=["#ff6666", "#4C99FF"],  # Cores mais sóbrias
+    )
+
+    # Ajustes estéticos
+    fig1.update_traces(
+        hoverinfo="label+percent",  # Informação ao passar o mouse
+        textinfo="value+percent",  # Exibe valor absoluto e percentagem
+        textfont=dict(size=14, family="Arial, sans-serif"),  # Tamanho da fonte
+    )
+
+    # Ajustar layout
+    fig1.update_layout(
+        showlegend=True,
+        title_font=dict(size=18, family="Arial, sans-serif", color="white"),  # Fonte do título
+        plot_bgcolor="black",  # Cor de fundo do gráfico
+        paper_bgcolor="black",  # Cor de fundo da área externa do gráfico
+        margin=dict(t=40, b=40, l=40, r=40),  # Ajuste de margens para deixar o gráfico mais próximo da borda
+        font=dict(color="white")  # Cor da fonte do título e do texto
+    )
+
+    return aplicar_estilo(fig1)
+
+
+def figura_tipos_discurso(discurso_tipo):
+    # discurso_tipo: colunas "Tipo de Discurso" e "Quantidade"
+    fig8 = px.bar(
+        discurso_tipo,
+        x="Tipo de Discurso",
+        y="Quantidade",
+        title="Distribuição dos Tipos de Discurso de Ódio",
+        labels={"Tipo de Discurso": "Tipo de Discurso de Ódio", "Quantidade": "Quantidade"},
+        color="Tipo de Discurso",  # Diferencia as barras por tipo de discurso de ódio
+        color_discrete_sequence=px.colors.qualitative.Set1  # Paleta de cores definida
+    )
+    return aplicar_estilo(fig8)
+
+
+def figura_emocoes(emocao_contagem):
+    # emocao_contagem: colunas "resultado_analise", "emocao" e "count"
+    fig2 = px.bar(
+        emocao_contagem,
+        x="emocao",
+        y="count",
+        color="resultado_analise",
+        barmode="group",
+        title="Distribuição de Emoções por Tipo de Discurso de Ódio",
+        labels={"emocao": "Emoção", "count": "Quantidade", "resultado_analise": "Tipo de Discurso de Ódio"},
+    )
+    return aplicar_estilo(fig2)
+
+
+def figura_frequencia_tipo(odio_por_tipo_tempo):
+    # odio_por_tipo_tempo: colunas "periodo", início do período (coluna "Dia",
+    # "Semana", "Mês" ou "Trimestre", conforme a granularidade), "resultado_analise" e "count"
+    eixo = odio_por_tipo_tempo.columns[1]
+    fig3 = px.line(
+        odio_por_tipo_tempo,
+        x=eixo,
+        y="count",
+        color="resultado_analise",
+        title="Tipos de Discurso de Ódio ao Longo do Tempo",
+        labels={"count": "Quantidade", "resultado_analise": "Tipo de Discurso de Ódio"},
+        markers=True  # Marca os pontos de cada linha
+    )
+    return aplicar_estilo(fig3)
+
+
+def figura_media_likes(media_upvotes):
+    # media_upvotes: colunas "Tipo de Discurso" e "Média de Likes"
+    fig5 = px.bar(
+        media_upvotes,
+        x="Tipo de Discurso",
+        y="Média de Likes",  # Usar "Média de Upvotes" na exibição
+        title="Média de Likes por Tipo de Discurso de Ódio",
+        color="Tipo de Discurso",
+        text_auto=True
+    )
+    return aplicar_estilo(fig5)
+
+
+def figura_visualizacoes(visualizacoes_por_tipo):
+    # visualizacoes_por_tipo: colunas "resultado_analise" e "visualizacoes"
+    fig_visualizacoes_tipo = px.bar(
+        visualizacoes_por_tipo,
+        x="resultado_analise",
+        y="visualizacoes",
+        title="Visualizações por Tipo de Discurso",
+        labels={"resultado_analise": "Resultado da Análise", "visualizacoes": "Total de Visualizações"},
+        color=None,  # Remover a diferenciação por cor
+        color_discrete_sequence=["#1f77b4"]  # Aplicar uma cor única
+    )
+
+    # Ajustes de estilo e layout
+    fig_visualizacoes_tipo.update_layout(
+        plot_bgcolor="black",
+        paper_bgcolor="black",
+        font=dict(color="white"),
+        xaxis=dict(title="Tipos de Discurso", showgrid=False),
+        yaxis=dict(title="Visualizações", showgrid=True, gridcolor="gray"),
+        title=dict(font=dict(size=20)),
+        showlegend=False  # Remover a legenda
+    )
+    return aplicar_estilo(fig_visualizacoes_tipo)
+
+
+def figura_frequencia_usuario(frequencia_postagens):
+    # frequencia_postagens: colunas "usuario", "quantidade_postagens" e
+    # "participacao_engajamento" (fração do engajamento das publicações de ódio)
+    fig_frequencia = px.bar(
+        frequencia_postagens,
+        x="usuario",
+        y="quantidade_postagens",
+        title=f"Top {len(frequencia_postagens)} Usuários que Mais Publicaram Discursos de Ódio",
+        labels={"usuario": "Usuário", "quantidade_postagens": "Quantidade de Postagens",
+                "participacao_engajamento": "Participação no Engajamento"},
+        hover_data={"participacao_engajamento": ":.1%"},
+        text_auto=True,
+    )
+
+    # Estilo do gráfico
+    fig_frequencia.update_traces(marker_color="pink")
+    fig_frequencia.update_layout(
+        plot_bgcolor="black",
+        paper_bgcolor="black",
+        font=dict(color="white"),
+        xaxis=dict(title="Usuários", showgrid=False),
+        yaxis=dict(title="Frequência de Postagens", showgrid=True, gridcolor="gray"),
+        title=dict(font=dict(size=20)),
+    )
+    return aplicar_estilo(fig_frequencia)
+
+
+def figura_comentarios(respostas_por_tipo):
+    # respostas_por_tipo: colunas "resultado_analise" e "comentarios"
+    fig_respostas_tipo = px.bar(
+        respostas_por_tipo,
+        x="resultado_analise",
+        y="comentarios",
+        title="Quantidade de Comentários por Tipo de Discurso de Ódio",
+        labels={"resultado_analise": "Tipo de Discurso de Ódio", "comentarios": "Total de Comentários"}
+    )
+    return aplicar_estilo(fig_respostas_tipo)
+
+
+def figura_nuvem_palavras(frequencias):
+    # frequencias: contagem de cada palavra (já sem stopwords)
+    wordcloud = WordCloud(
+        background_color="black",
+        colormap="coolwarm",
+        width=800,
+        height=400
+    ).generate_from_frequencies(frequencias)
+
+    # Criar o gráfico
+    fig6, ax = plt.subplots(figsize=(10, 5))
+
+    # Configurar fundo e nuvem de palavras
+    fig6.patch.set_facecolor("black")
+    ax.imshow(wordcloud, interpolation="bilinear")
+    ax.axis("off")
+
+    # Configurar o título
+    ax.set_title(
+        "Palavras Mais Comuns em Discurso de Ódio",
+        fontsize=18,
+        color="white",
+        fontfamily="Arial",
+        loc="left"
+    )
+
+    # Ajustar margens para alinhamento
+    fig6.subplots_adjust(top=0.85)
+    return fig6
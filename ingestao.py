@@ -0,0 +1,368 @@
+# Ingestão incremental de publicações novas. As publicações recebidas são
+# deduplicadas pelo id (entre si e contra as já gravadas), ganham o engajamento
+# (e a frequencia_postagens_usuario, quando não vem da coleta) e são
+# acrescentadas ao final do CSV, sem regravar as linhas existentes. Cada acréscimo
+# é registrado no diário "<arquivo>.ingestoes.jsonl" com o tamanho do arquivo
+# antes e depois, para que quem já leu o arquivo leia apenas o trecho novo.
+#
+# ConjuntoIncremental guarda, para o app, as publicações carregadas e as
+# estruturas derivadas delas (cubo, textos, índice de palavras e de busca). Quando a versão
+# do arquivo muda por uma ingestão, só o trecho novo é lido e somado a elas; em
+# qualquer outra alteração do arquivo o conjunto é recarregado por inteiro.
+#
+# Com um índice de duplicatas (duplicatas.py), as publicações novas são
+# indexadas antes de chegarem ao CSV, e o conjunto pode manter só a primeira
+# publicação de cada grupo de quase duplicatas.
+#
+# Uso: python ingestao.py publicacoes.csv novas_publicacoes.csv [outras.csv ...] [--duplicatas]
+import argparse
+import datetime as dt
+import io
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+from cubo import CuboAgregado
+from dados import (
+    COLUNAS_DERIVACAO,
+    COLUNAS_NECESSARIAS,
+    EXTENSAO_COLUNAR,
+    TIPOS_COLUNAS,
+    calcular_colunas_derivadas,
+    colapsar_duplicatas,
+    concatenar_publicacoes,
+    ler_colunas,
+    ler_publicacoes,
+    ler_textos,
+    ler_textos_linhas,
+    resolver_fonte,
+    versao_arquivo,
+)
+from duplicatas import CAMINHO_PADRAO as CAMINHO_DUPLICATAS, IndiceDuplicatas
+from busca import IndiceBusca
+from palavras import IndicePalavras
+
+logger = logging.getLogger(__name__)
+
+SUFIXO_DIARIO = ".ingestoes.jsonl"
+
+
+def caminho_diario(caminho_arquivo):
+    return caminho_arquivo + SUFIXO_DIARIO
+
+
+def ler_diario(caminho_arquivo):
+    try:
+        with open(caminho_diario(caminho_arquivo), encoding="utf-8") as diario:
+            return [json.loads(linha) for linha in diario if linha.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def cabecalho_csv(caminho_arquivo):
+    return list(pd.read_csv(caminho_arquivo, nrows=0).columns)
+
+
+def ingerir(caminho_arquivo, novas, duplicatas=None):
+    # Acrescenta ao CSV as publicações de novas (DataFrame) cujo id ainda não está
+    # gravado e, com um IndiceDuplicatas, as indexa antes de gravá-las. Devolve a
+    # quantidade recebida, de duplicadas e de acrescentadas
+    if caminho_arquivo.endswith(EXTENSAO_COLUNAR):
+        raise ValueError("A ingestão acrescenta publicações ao CSV; informe o CSV em vez do Parquet.")
+    faltando = [col for col in ["id"] + COLUNAS_NECESSARIAS if col not in novas.columns]
+    if faltando:
+        raise ValueError(f"As colunas ausentes são: {faltando}. Verifique as publicações recebidas.")
+
+    cabecalho = cabecalho_csv(caminho_arquivo)
+    gravadas = pd.read_csv(caminho_arquivo, dtype="string", usecols=[
+        c for c in ["id", "usuario", "frequencia_postagens_usuario"] if c in cabecalho
+    ])
+    recebidas = len(novas)
+    novas = novas[novas["id"].notna()].drop_duplicates("id")
+    novas = novas[~novas["id"].astype("string").isin(gravadas["id"])].copy()
+    resumo = {"recebidas": recebidas, "duplicadas": recebidas - len(novas), "acrescentadas": len(novas)}
+    if novas.empty:
+        return resumo
+
+    if "engajamento" in cabecalho:
+        novas["engajamento"] = novas["upvotes"].astype("int64") + novas["comentarios"].astype("int64")
+    if "frequencia_postagens_usuario" in cabecalho and "usuario" in gravadas.columns:
+        # A frequência vem da coleta (postagens do usuário no Reddit) e é mantida;
+        # só quando falta usa-se o último valor gravado para o usuário e, sem ele,
+        # as postagens do usuário no próprio arquivo
+        if "frequencia_postagens_usuario" not in novas.columns:
+            novas["frequencia_postagens_usuario"] = pd.NA
+        faltando = novas["frequencia_postagens_usuario"].isna()
+        if faltando.any():
+            usuarios = novas.loc[faltando, "usuario"].astype("string")
+            postagens = gravadas["usuario"].value_counts().add(
+                novas["usuario"].astype("string").value_counts(), fill_value=0
+            )
+            estimativa = usuarios.map(postagens)
+            if "frequencia_postagens_usuario" in gravadas.columns:
+                ultimas = gravadas.dropna(subset=["usuario", "frequencia_postagens_usuario"])
+                ultimas = ultimas.drop_duplicates("usuario", keep="last").set_index("usuario")
+                gravada = usuarios.map(pd.to_numeric(ultimas["frequencia_postagens_usuario"]))
+                estimativa = gravada.fillna(estimativa)
+            novas.loc[faltando, "frequencia_postagens_usuario"] = estimativa.fillna(0).astype("int64").to_numpy()
+
+    if duplicatas is not None:
+        # Indexadas antes do acréscimo, para que quem ler o trecho novo já encontre os grupos
+        duplicatas.adicionar(novas["id"], novas["texto"].fillna(""))
+
+    inicio = os.path.getsize(caminho_arquivo)
+    with open(caminho_arquivo, "rb+") as arquivo:
+        # Garante que a primeira linha nova não seja colada na última gravada
+        if inicio > 0:
+            arquivo.seek(-1, os.SEEK_END)
+            if arquivo.read(1) != b"\n":
+                arquivo.write(b"\n")
+        arquivo.seek(0, os.SEEK_END)
+        novas.reindex(columns=cabecalho).to_csv(arquivo, header=False, index=False, lineterminator="\n")
+    fim = os.path.getsize(caminho_arquivo)
+
+    with open(caminho_diario(caminho_arquivo), "a", encoding="utf-8") as diario:
+        diario.write(json.dumps({
+            "inicio": inicio,
+            "fim": fim,
+            # Linha do arquivo (índice de ler_publicacoes) da primeira publicação nova
+            "linha_inicial": len(gravadas),
+            "linhas": len(novas),
+            "em": dt.datetime.now().isoformat(timespec="seconds"),
+        }) + "\n")
+    logger.info("%d publicações acrescentadas a %s (%d duplicadas ignoradas)",
+                resumo["acrescentadas"], caminho_arquivo, resumo["duplicadas"])
+    return resumo
+
+
+def trechos_desde(caminho_arquivo, tamanho):
+    # Acréscimos do diário que levam o arquivo de `tamanho` bytes ao tamanho atual,
+    # ou None quando o arquivo mudou de outra forma (e precisa ser relido inteiro)
+    atual = os.path.getsize(caminho_arquivo)
+    trechos = []
+    for entrada in ler_diario(caminho_arquivo):
+        if entrada["inicio"] == tamanho and entrada["fim"] <= atual:
+            trechos.append(entrada)
+            tamanho = entrada["fim"]
+    return trechos if tamanho == atual else None
+
+
+def ler_trecho(caminho_arquivo, trecho, colunas):
+    # Publicações de um acréscimo, tipadas como em ler_colunas e indexadas pela
+    # linha do arquivo
+    cabecalho = cabecalho_csv(caminho_arquivo)
+    colunas = [col for col in cabecalho if col in colunas]
+    with open(caminho_arquivo, "rb") as arquivo:
+        arquivo.seek(trecho["inicio"])
+        conteudo = arquivo.read(trecho["fim"] - trecho["inicio"])
+    tipos = {col: tipo for col, tipo in TIPOS_COLUNAS.items() if col in colunas}
+    novos = pd.read_csv(io.BytesIO(conteudo), header=None, names=cabecalho, usecols=colunas, dtype=tipos)
+    novos.index = pd.RangeIndex(trecho["linha_inicial"], trecho["linha_inicial"] + len(novos))
+    return novos
+
+
+# Estado do conjunto em uma versão do arquivo; as sessões usam sempre um estado
+# inteiro, nunca partes de versões diferentes. O estado é compartilhado por todas
+# as sessões do app e tratado como somente leitura: cada acréscimo monta um estado
+# novo em vez de alterar o anterior
+EstadoConjunto = namedtuple("EstadoConjunto", ["versao", "dados", "cubo"])
+
+
+class ConjuntoIncremental:
+    def __init__(self, caminho_arquivo, colunas, duplicatas=None):
+        self.caminho_arquivo = caminho_arquivo
+        self.colunas = list(dict.fromkeys(list(colunas) + COLUNAS_DERIVACAO))
+        # Com um IndiceDuplicatas, só a primeira publicação de cada grupo é mantida
+        self.duplicatas = duplicatas
+        self.grupos_mantidos = set()
+        self.uniao_vista = 0
+        self.trava = threading.RLock()
+        # Só uma montagem de textos e índices por vez; atualizar() não a espera
+        self.trava_montagem = threading.RLock()
+        self.textos_carregados = None
+        self.indice = None
+        self.busca = None
+        self.recarregar()
+
+    def recarregar(self):
+        versao = versao_arquivo(self.caminho_arquivo)
+        self.grupos_mantidos = set()
+        if self.duplicatas is not None:
+            self.uniao_vista = self.duplicatas.ultima_uniao()
+        dados = self.colapsar(ler_publicacoes(self.caminho_arquivo, self.colunas_leitura()))
+        # Só o CSV recebe acréscimos; lido do Parquet, qualquer mudança recarrega tudo
+        fonte = resolver_fonte(self.caminho_arquivo)
+        self.tamanho = None if fonte.endswith(EXTENSAO_COLUNAR) else versao[2]
+        self.textos_carregados = None
+        self.indice = None
+        self.busca = None
+        self.estado = EstadoConjunto(versao, dados, CuboAgregado(dados))
+
+    def colunas_leitura(self):
+        # O id só é lido para consultar os grupos de duplicatas e não fica no conjunto
+        return self.colunas + (["id"] if self.duplicatas is not None else [])
+
+    def colapsar(self, dados):
+        if self.duplicatas is None or "id" not in dados.columns:
+            return dados
+        grupos = self.duplicatas.grupos(dados.pop("id")).set_axis(dados.index)
+        dados = colapsar_duplicatas(dados, grupos, self.grupos_mantidos)
+        self.grupos_mantidos.update(grupos.loc[dados.index].dropna())
+        return dados
+
+    def aplicar_unioes(self):
+        # Acompanha as uniões de grupos feitas no índice de duplicatas desde a
+        # última leitura. Devolve False quando duas publicações mantidas passaram
+        # a ser do mesmo grupo: uma delas precisa sair e o conjunto é recarregado
+        if self.duplicatas is None:
+            return True
+        for sequencia, anterior, grupo in self.duplicatas.unioes_desde(self.uniao_vista):
+            self.uniao_vista = sequencia
+            if anterior in self.grupos_mantidos:
+                if grupo in self.grupos_mantidos:
+                    return False
+                self.grupos_mantidos.discard(anterior)
+                self.grupos_mantidos.add(grupo)
+        return True
+
+    def atualizar(self):
+        # Estado da versão atual do arquivo, lendo apenas os acréscimos quando possível
+        with self.trava:
+            versao = versao_arquivo(self.caminho_arquivo)
+            if versao == self.estado.versao:
+                return self.estado
+            trechos = None
+            if self.tamanho is not None and versao[0] == self.estado.versao[0]:
+                trechos = trechos_desde(self.caminho_arquivo, self.tamanho)
+            if trechos is None:
+                logger.info("Arquivo %s alterado fora da ingestão; recarregando.", self.caminho_arquivo)
+                self.recarregar()
+                return self.estado
+            if not self.aplicar_unioes():
+                logger.info("Grupos de duplicatas já carregados foram unidos; recarregando %s.", self.caminho_arquivo)
+                self.recarregar()
+                return self.estado
+            for trecho in trechos:
+                self.acrescentar(trecho)
+            self.tamanho = versao[2]
+            self.estado = self.estado._replace(versao=versao)
+            return self.estado
+
+    def acrescentar(self, trecho):
+        colunas = self.colunas_leitura() + (["texto"] if self.textos_carregados is not None else [])
+        novos = ler_trecho(self.caminho_arquivo, trecho, colunas)
+        # Linhas que já tinham sido lidas (arquivo alterado durante a leitura) são ignoradas
+        novos = novos[~novos.index.isin(self.estado.dados.index)]
+        textos = novos.pop("texto") if "texto" in novos.columns else None
+        # Duplicatas de publicações já carregadas (ou do próprio trecho) ficam de fora
+        novos = self.colapsar(novos.copy())
+        if novos.empty:
+            return
+        if textos is not None:
+            textos = textos.loc[novos.index]
+        novos = calcular_colunas_derivadas(novos)
+        dados = concatenar_publicacoes(self.estado.dados, novos)
+        # As categorias de novos passam a ser as do conjunto completo
+        novos = dados.loc[novos.index]
+        self.estado = EstadoConjunto(self.estado.versao, dados, self.estado.cubo.acrescentar(novos))
+        if textos is not None:
+            # Os índices em uso por outras sessões não são alterados: os novos
+            # combinam os anteriores com o índice só das publicações novas e
+            # substituem a referência
+            self.textos_carregados = pd.concat([self.textos_carregados, textos])
+            if self.indice is not None:
+                self.indice = self.indice.combinado(IndicePalavras.construir(novos, textos))
+            if self.busca is not None:
+                self.busca = self.busca.combinado(IndiceBusca.construir(textos))
+        logger.info("%d publicações novas incorporadas sem recarregar %s", len(novos), self.caminho_arquivo)
+
+    def memoria_mb(self):
+        # Memória do estado compartilhado entre as sessões: publicações, cubo, textos
+        # e índice de busca
+        estado = self.estado
+        cubo = estado.cubo
+        arrays = [cubo.dia, cubo.contagem, *cubo.codigos.values(), *cubo.somas.values(), *cubo.periodos.values()]
+        total = estado.dados.memory_usage(deep=True).sum() + sum(array.nbytes for array in arrays)
+        if self.textos_carregados is not None:
+            total += self.textos_carregados.memory_usage(deep=True)
+        if self.busca is not None:
+            total += self.busca.memoria_bytes()
+        return total / 2**20
+
+    def textos(self):
+        # Textos de todas as publicações, lidos na primeira vez que forem pedidos
+        def ler(estado):
+            textos = ler_textos(self.caminho_arquivo)
+            return textos[textos.index.isin(estado.dados.index)]
+        return self.montar("textos_carregados", ler)
+
+    def textos_linhas(self, linhas):
+        # Textos só das linhas pedidas: reaproveita os textos já carregados (nuvem
+        # de palavras ou busca) e, se ainda não foram carregados, lê apenas essas
+        # linhas do arquivo
+        with self.trava:
+            textos = self.textos_carregados
+        if textos is not None:
+            return textos.reindex(linhas)
+        return ler_textos_linhas(self.caminho_arquivo, linhas).reindex(linhas)
+
+    def indice_palavras(self, motor=None):
+        # Índice de palavras montado uma vez e atualizado a cada acréscimo
+        return self.montar("indice", lambda estado: IndicePalavras.construir(estado.dados, self.textos(), motor))
+
+    def indice_busca(self, motor=None):
+        # Índice invertido dos textos para a busca, montado uma vez e atualizado a
+        # cada acréscimo
+        return self.montar("busca", lambda estado: IndiceBusca.construir(self.textos(), motor))
+
+    def montar(self, atributo, construir):
+        # Estrutura guardada em `atributo`, montada com construir(estado) na
+        # primeira vez. A leitura e a montagem acontecem fora de self.trava, para
+        # que atualizar() (chamado a cada execução do script, em todas as sessões)
+        # não espere por elas; o resultado só é guardado se as publicações não
+        # mudaram enquanto isso, e senão é montado de novo
+        with self.trava_montagem:
+            while True:
+                with self.trava:
+                    atual = getattr(self, atributo)
+                    if atual is not None:
+                        return atual
+                    estado = self.estado
+                valor = construir(estado)
+                with self.trava:
+                    if self.estado.dados is estado.dados:
+                        setattr(self, atributo, valor)
+                        return valor
+
+    def buscar(self, consulta, motor=None):
+        # Linhas do arquivo das publicações que atendem à consulta (busca.py)
+        while True:
+            self.indice_busca(motor)
+            with self.trava:
+                # None só se o conjunto foi recarregado depois da montagem
+                if self.busca is not None:
+                    return self.busca.buscar(consulta, self.textos_carregados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acrescenta publicações novas ao CSV, ignorando ids repetidos.")
+    parser.add_argument("csv", help="CSV de publicações analisadas que recebe as novas publicações")
+    parser.add_argument("novas", nargs="+", help="CSVs (ou Parquet) com as publicações novas")
+    parser.add_argument("--duplicatas", nargs="?", const=CAMINHO_DUPLICATAS,
+                        help="Indexa as publicações novas no índice de duplicatas (duplicatas.py)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    duplicatas = IndiceDuplicatas(args.duplicatas) if args.duplicatas else None
+    for caminho_novas in args.novas:
+        resumo = ingerir(args.csv, ler_colunas(caminho_novas), duplicatas)
+        print(f"{caminho_novas}: {resumo['acrescentadas']} acrescentadas, {resumo['duplicadas']} duplicadas "
+              f"de {resumo['recebidas']} recebidas")
+
+
+if __name__ == "__main__":
+    main()
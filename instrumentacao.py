@@ -0,0 +1,130 @@
+# Instrumentação das etapas de uma renderização do painel. Cada etapa registra a
+# duração, a quantidade de linhas envolvida (quando informada) e a memória: a
+# memória residente atual do processo ao final da etapa e quanto ela variou
+# durante a etapa (o pico do processo, ru_maxrss, só cresce e não mostra o custo
+# de cada etapa depois do aquecimento). Só são usados perf_counter e a leitura de
+# /proc/self/statm, baratos o suficiente para ficarem ligados em produção. A
+# memória é do processo inteiro: com várias sessões ao mesmo tempo, a variação
+# inclui o que as outras alocaram durante a etapa.
+#
+# Ao final da renderização cada etapa vira uma linha de log em JSON no logger
+# "instrumentacao", com os filtros ativos, para investigar combinações lentas.
+# configurar_log() direciona o logger para a saída de erro no nível de
+# ANALISE_LOG_NIVEL (padrão: INFO), já que o Streamlit só configura os próprios
+# loggers. Renderizações acima de ANALISE_LIMITE_LENTO_MS (padrão: 2000) geram um
+# aviso.
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger("instrumentacao")
+
+LIMITE_LENTO_MS = float(os.environ.get("ANALISE_LIMITE_LENTO_MS", 2000))
+
+TAMANHO_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def configurar_log(nivel=None):
+    # Idempotente: o script do app roda a cada interação
+    if not logger.handlers:
+        saida = logging.StreamHandler(sys.stderr)
+        saida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logger.addHandler(saida)
+        # As linhas já vão para a saída acima; sem propagar, não saem duplicadas
+        logger.propagate = False
+    logger.setLevel(nivel or os.environ.get("ANALISE_LOG_NIVEL", "INFO").upper())
+
+
+def memoria_atual_mb():
+    # Memória residente atual do processo; None onde /proc não existe
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * TAMANHO_PAGINA / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Etapa:
+    def __init__(self, nome, atributos):
+        self.nome = nome
+        self.atributos = atributos
+        self.linhas = None
+        self.duracao_ms = None
+        self.memoria_mb = None
+        self.memoria_delta_mb = None
+
+    def para_dict(self):
+        registro = {"etapa": self.nome, "duracao_ms": round(self.duracao_ms, 3)}
+        if self.linhas is not None:
+            registro["linhas"] = int(self.linhas)
+        if self.memoria_mb is not None:
+            registro["memoria_mb"] = round(self.memoria_mb, 1)
+            registro["memoria_delta_mb"] = round(self.memoria_delta_mb, 1)
+        registro.update(self.atributos)
+        return registro
+
+
+class Rastreador:
+    # Uma instância por renderização (execução do script do app)
+    def __init__(self, **contexto):
+        self.id = uuid.uuid4().hex[:12]
+        self.contexto = contexto
+        self.etapas = []
+        self.inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome, **atributos):
+        # Uso: with rastreador.etapa("filtro") as etapa: ...; etapa.linhas = n
+        registro = Etapa(nome, atributos)
+        memoria_inicial = memoria_atual_mb()
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro.duracao_ms = (time.perf_counter() - inicio) * 1000
+            if memoria_inicial is not None:
+                registro.memoria_mb = memoria_atual_mb()
+                registro.memoria_delta_mb = registro.memoria_mb - memoria_inicial
+            self.etapas.append(registro)
+
+    def registrar(self, nome, duracao_ms, **atributos):
+        # Etapa medida fora de um bloco with (por exemplo, uma tarefa em segundo plano)
+        registro = Etapa(nome, atributos)
+        registro.duracao_ms = duracao_ms
+        self.etapas.append(registro)
+        return registro
+
+    @property
+    def duracao_total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def tabela(self):
+        return [etapa.para_dict() for etapa in self.etapas]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        # A renderização pode terminar antes do fim do script (st.stop, um erro ou
+        # uma nova execução pedida pelo Streamlit); o log é gravado do mesmo jeito,
+        # com o motivo da interrupção no resumo
+        if tipo is not None:
+            self.contexto["interrompida"] = tipo.__name__
+        self.registrar_log()
+        return False
+
+    def registrar_log(self):
+        # Uma linha JSON por etapa e uma linha de resumo da renderização
+        for registro in self.tabela():
+            logger.info(json.dumps({"renderizacao": self.id, **registro}, ensure_ascii=False, default=str))
+        total = self.duracao_total_ms
+        resumo = {"renderizacao": self.id, "etapa": "total", "duracao_ms": round(total, 3), **self.contexto}
+        memoria = memoria_atual_mb()
+        if memoria is not None:
+            resumo["memoria_mb"] = round(memoria, 1)
+        nivel = logging.WARNING if total > LIMITE_LENTO_MS else logging.INFO
+        logger.log(nivel, json.dumps(resumo, ensure_ascii=False, default=str))
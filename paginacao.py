@@ -0,0 +1,74 @@
+# Paginação da tabela de publicações filtradas. As ordens de classificação são
+# calculadas uma vez por versão dos dados (posição de cada linha na ordem global),
+# e cada consulta guarda apenas a lista ordenada de linhas do resultado filtrado;
+# uma página é uma fatia dessa lista, com custo constante.
+import numpy as np
+
+# Rótulo exibido -> (coluna, decrescente)
+ORDENACOES = {
+    "Mais antigas": ("hora_postagem", False),
+    "Mais recentes": ("hora_postagem", True),
+    "Maior engajamento": ("engajamento", True),
+    "Mais likes": ("upvotes", True),
+}
+
+COLUNAS_ORDENACAO = ["hora_postagem", "engajamento", "upvotes"]
+
+
+class OrdensTabela:
+    def __init__(self, dados):
+        self.posicoes = {}
+        for coluna in COLUNAS_ORDENACAO:
+            valores = dados[coluna].to_numpy()
+            if coluna == "hora_postagem":
+                valores = valores.astype("datetime64[ns]").view("int64")
+            ordem = np.argsort(valores, kind="stable")
+            # posicao[linha] = lugar da linha na ordem crescente da coluna
+            posicao = np.empty(len(ordem), dtype=np.int64)
+            posicao[ordem] = np.arange(len(ordem))
+            self.posicoes[coluna] = posicao
+
+    def ordenar(self, linhas, coluna, decrescente=False):
+        chaves = self.posicoes[coluna][linhas]
+        if decrescente:
+            chaves = -chaves
+        return linhas[np.argsort(chaves)]
+
+
+class ConsultaPaginada:
+    def __init__(self, linhas, itens_por_pagina=10):
+        self.linhas = linhas
+        self.itens_por_pagina = itens_por_pagina
+
+    @property
+    def total(self):
+        return len(self.linhas)
+
+    @property
+    def total_paginas(self):
+        return max(1, -(-self.total // self.itens_por_pagina))
+
+    def ajustar_cursor(self, cursor):
+        # O cursor é a posição da primeira linha da página na lista ordenada
+        ultima_pagina = (self.total_paginas - 1) * self.itens_por_pagina
+        cursor = min(max(0, cursor), ultima_pagina)
+        return cursor - cursor % self.itens_por_pagina
+
+    def pagina(self, cursor):
+        cursor = self.ajustar_cursor(cursor)
+        return self.linhas[cursor:cursor + self.itens_por_pagina]
+
+    def numero_pagina(self, cursor):
+        return self.ajustar_cursor(cursor) // self.itens_por_pagina + 1
+
+    def proximo(self, cursor):
+        return self.ajustar_cursor(cursor + self.itens_por_pagina)
+
+    def anterior(self, cursor):
+        return self.ajustar_cursor(cursor - self.itens_por_pagina)
+
+    def tem_proximo(self, cursor):
+        return self.ajustar_cursor(cursor) + self.itens_por_pagina < self.total
+
+    def tem_anterior(self, cursor):
+        return self.ajustar_cursor(cursor) > 0
@@ -0,0 +1,136 @@
+# Índice de frequência de palavras para a nuvem "Palavras Mais Comuns".
+# Os textos são tokenizados uma única vez, já sem as stopwords, e as contagens
+# ficam agrupadas por (dia, resultado_analise, emocao). A nuvem de cada filtro é
+# gerada a partir da soma das contagens dos grupos selecionados.
+import bisect
+import re
+from collections import Counter
+
+import numpy as np
+from wordcloud import STOPWORDS
+
+from cubo import EPOCA, dia_ordinal
+
+# Stopwords do WordCloud acrescidas das palavras em português sem valor para a análise
+STOPWORDS_PT = frozenset(STOPWORDS) | frozenset([
+    "de", "como", "por", "mais", "quando", "se", "ele", "pra", "isso", "da",
+    "para", "com", "que", "em", "é", "e", "o", "a", "os", "como", "um", "uma",
+    "na", "no", "não", "mas", "ela", "eu", "você", "vocês", "nós", "eles", "elas",
+    "meu", "minha", "meus", "minhas", "teu", "tua", "teus", "tuas", "dele", "dela",
+    "deles", "delas", "esse", "essa", "esses", "essas", "este", "esta", "estes",
+    "estas", "aquele", "aquela", "aqueles", "aquelas", "lhe", "lhes", "do", "dos",
+    "das", "num", "numa", "neste", "nesta", "nisto", "naquele", "naquela", "nisso",
+    "daquilo", "e", "ou", "onde", "porque", "porquê", "lá", "aqui", "ali", "assim",
+    "tão", "já", "então", "também", "muito", "pouco", "sempre", "tudo", "nada",
+    "cada", "todos", "todas", "algum", "alguma", "nenhum", "nenhuma", "outro",
+    "outra", "outros", "outras", "seu", "sua", "seus", "suas", "me", "te", "nos",
+    "vos", "depois", "antes", "até", "ainda", "hoje", "ontem", "amanhã", "agora",
+    "lá", "cá", "sim", "não", "pois", "porém", "como", "sobre", "entre", "contra",
+    "sem", "baixo", "apenas", "mesmo", "era", "só", "coisa", "ser", "pessoa", "pai",
+    "cara", "tem", "bem", "foi", "pessoas", "ser", "sou", "ano", "vc", "queria",
+    "gente", "ao", "disse", "nunca", "sempre", "casa", "tempo", "nem", "mim", "q",
+    "que", "pq", "mãe", "mulher", "sala", "dia", "estava", "tenho", "vai", "começou",
+    "fazer", "são", "amigo", "namorada", "anos", "ter", "enquanto", "homem", "aí",
+    "tinha", "vida", "estou", "grupo", "coisas", "fui"
+])
+
+# Mesmo padrão de palavra usado pelo WordCloud.process_text
+PADRAO_PALAVRA = re.compile(r"\w[\w']*")
+
+
+def tokenizar(texto):
+    # Palavras em minúsculas, sem stopwords e sem números
+    palavras = []
+    for palavra in PADRAO_PALAVRA.findall(texto.lower()):
+        if palavra.endswith("'s"):
+            palavra = palavra[:-2]
+        if palavra and palavra not in STOPWORDS_PT and not palavra.isdigit():
+            palavras.append(palavra)
+    return palavras
+
+
+class IndicePalavras:
+    def __init__(self):
+        # dia -> {(resultado_analise, emocao): Counter}
+        self.grupos = {}
+        # Dias presentes, em ordem, para recortar o intervalo por busca binária
+        self.dias = []
+
+    @classmethod
+    def construir(cls, dados, textos, motor=None):
+        indice = cls()
+        indice.adicionar(dados, textos, motor)
+        return indice
+
+    def adicionar(self, dados, textos, motor=None):
+        # Acrescenta publicações ao índice, alterando-o (a ingestão usa combinado,
+        # que não altera o índice em uso). textos deve estar indexado pelo mesmo
+        # índice de dados. Com um motor de agregação (paralelo.py), a tokenização
+        # é dividida entre os trabalhadores
+        if motor is not None and motor.deve_paralelizar(dados):
+            colunas = ["hora_postagem", "resultado_analise", "emocao"]
+            particoes = [
+                particao.assign(texto=textos.reindex(particao.index))
+                for particao in motor.particionar(dados[colunas])
+            ]
+            for parcial in motor.mapear(indexar_particao, particoes):
+                self.combinar(parcial)
+            return
+
+        validos = dados[dados["hora_postagem"].notna()]
+        dias = (validos["hora_postagem"].to_numpy(dtype="datetime64[D]") - EPOCA).astype(np.int64)
+        discursos = validos["resultado_analise"].astype(object).to_numpy()
+        emocoes = validos["emocao"].astype(object).to_numpy()
+        textos = textos.reindex(validos.index).fillna("").to_numpy()
+
+        for dia, discurso, emocao, texto in zip(dias.tolist(), discursos, emocoes, textos):
+            if dia not in self.grupos:
+                self.grupos[dia] = {}
+                bisect.insort(self.dias, dia)
+            contagem = self.grupos[dia].setdefault((discurso, emocao), Counter())
+            contagem.update(tokenizar(texto))
+
+    def combinado(self, outro):
+        # Novo índice com as contagens deste e de outro, sem alterar este, que pode
+        # estar sendo lido por outras sessões. Só os dias e grupos que outro
+        # altera são copiados; os demais são compartilhados com este índice
+        novo = IndicePalavras()
+        novo.grupos = dict(self.grupos)
+        novo.dias = list(self.dias)
+        for dia, grupos in outro.grupos.items():
+            if dia not in novo.grupos:
+                bisect.insort(novo.dias, dia)
+            atuais = dict(novo.grupos.get(dia, {}))
+            for chave, contagem in grupos.items():
+                atuais[chave] = atuais[chave] + contagem if chave in atuais else contagem
+            novo.grupos[dia] = atuais
+        return novo
+
+    def combinar(self, outro):
+        # Soma as contagens de outro índice (por exemplo, de uma partição) a este,
+        # alterando-o; só para índices que ainda estão sendo montados
+        for dia, grupos in outro.grupos.items():
+            if dia not in self.grupos:
+                self.grupos[dia] = {}
+                bisect.insort(self.dias, dia)
+            for chave, contagem in grupos.items():
+                self.grupos[dia].setdefault(chave, Counter()).update(contagem)
+        return self
+
+    def frequencias(self, data_inicio, data_fim, discursos, emocoes):
+        discursos = set(discursos)
+        emocoes = set(emocoes)
+        inicio = bisect.bisect_left(self.dias, dia_ordinal(data_inicio))
+        fim = bisect.bisect_right(self.dias, dia_ordinal(data_fim))
+
+        total = Counter()
+        for dia in self.dias[inicio:fim]:
+            for (discurso, emocao), contagem in self.grupos[dia].items():
+                if discurso in discursos and emocao in emocoes:
+                    total.update(contagem)
+        return total
+
+
+def indexar_particao(particao):
+    # Executada nos trabalhadores: índice parcial de uma partição com a coluna texto
+    return IndicePalavras.construir(particao, particao["texto"])
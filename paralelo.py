@@ -0,0 +1,127 @@
+# Motor de agregação paralela. O conjunto de dados é dividido em partições, cada
+# partição gera um agregado parcial em um pool de processos (ou threads) e os
+# parciais são combinados no final. Com um único trabalhador, ou poucas linhas,
+# tudo roda em série no processo atual. A tokenização é Python puro e não libera
+# o GIL, então só processos usam vários núcleos. Os processos são criados com
+# forkserver (ou spawn), e não com fork, porque o servidor do Streamlit já tem
+# várias threads quando o pool é criado.
+#
+# Configuração por variáveis de ambiente:
+#   ANALISE_TRABALHADORES  número de trabalhadores (padrão: número de núcleos)
+#   ANALISE_EXECUTOR       "processos" (padrão) ou "threads"
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from agregados import SEM_FILTROS, ResumoPainel
+
+logger = logging.getLogger(__name__)
+
+# Abaixo disso o custo de enviar as partições aos trabalhadores supera o ganho
+LINHAS_MINIMAS_PARALELO = 20_000
+
+
+def trabalhadores_padrao():
+    valor = os.environ.get("ANALISE_TRABALHADORES")
+    if valor:
+        return max(1, int(valor))
+    return os.cpu_count() or 1
+
+
+def contexto_processos():
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+
+def resumir_particao(bloco, filtros, incluir_palavras):
+    return ResumoPainel.de_bloco(bloco, filtros, incluir_palavras)
+
+
+class MotorAgregacao:
+    def __init__(self, trabalhadores=None, executor=None, linhas_minimas=LINHAS_MINIMAS_PARALELO):
+        self.trabalhadores = trabalhadores or trabalhadores_padrao()
+        self.tipo_executor = executor or os.environ.get("ANALISE_EXECUTOR", "processos")
+        self.linhas_minimas = linhas_minimas
+        self.executor = None
+        self.trava = threading.Lock()
+
+    @property
+    def serial(self):
+        return self.trabalhadores <= 1
+
+    def obter_executor(self):
+        # O pool é criado na primeira utilização e reaproveitado nas seguintes
+        with self.trava:
+            if self.executor is None:
+                if self.tipo_executor == "threads":
+                    self.executor = ThreadPoolExecutor(self.trabalhadores)
+                else:
+                    self.executor = ProcessPoolExecutor(self.trabalhadores, mp_context=contexto_processos())
+            return self.executor
+
+    def descartar_executor(self, executor):
+        # Um pool quebrado (um trabalhador morreu) não aceita novas tarefas; o
+        # próximo uso cria outro
+        with self.trava:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def particionar(self, dados):
+        # Partições contíguas de tamanho parecido, uma por trabalhador
+        quantidade = min(self.trabalhadores, max(1, len(dados) // max(1, self.linhas_minimas // 4)))
+        tamanho = -(-len(dados) // quantidade) if len(dados) else 1
+        return [dados.iloc[i:i + tamanho] for i in range(0, len(dados), tamanho)]
+
+    def mapear(self, funcao, particoes, *argumentos):
+        # Aplica funcao(particao, *argumentos) a cada partição, preservando a ordem
+        if self.serial or len(particoes) <= 1:
+            return [funcao(particao, *argumentos) for particao in particoes]
+        try:
+            executor = self.obter_executor()
+        except OSError as erro:
+            # Ambientes sem suporte a processos filhos continuam funcionando em série
+            logger.warning("Execução paralela indisponível (%s); usando modo serial.", erro)
+            self.trabalhadores = 1
+            return [funcao(particao, *argumentos) for particao in particoes]
+        # Erros das tarefas chegam a quem chamou; só um pool quebrado faz esta
+        # chamada rodar em série
+        try:
+            futuros = [executor.submit(funcao, particao, *argumentos) for particao in particoes]
+            return [futuro.result() for futuro in futuros]
+        except BrokenProcessPool as erro:
+            logger.warning("Pool de processos interrompido (%s); repetindo em série.", erro)
+            self.descartar_executor(executor)
+            return [funcao(particao, *argumentos) for particao in particoes]
+
+    def deve_paralelizar(self, dados):
+        return not self.serial and len(dados) >= self.linhas_minimas
+
+    def resumir_blocos(self, blocos, filtros=SEM_FILTROS, incluir_palavras=True):
+        # Resume um iterador de blocos (ex.: agregados.ler_blocos) mantendo no máximo
+        # dois blocos por trabalhador em processamento, para limitar a memória
+        resumo = ResumoPainel()
+        if self.serial:
+            for bloco in blocos:
+                resumo.combinar(resumir_particao(bloco, filtros, incluir_palavras))
+            return resumo
+
+        executor = self.obter_executor()
+        pendentes = deque()
+        for bloco in blocos:
+            pendentes.append(executor.submit(resumir_particao, bloco, filtros, incluir_palavras))
+            if len(pendentes) >= 2 * self.trabalhadores:
+                resumo.combinar(pendentes.popleft().result())
+        while pendentes:
+            resumo.combinar(pendentes.popleft().result())
+        return resumo
+
+    def fechar(self):
+        with self.trava:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
@@ -0,0 +1,209 @@
+# Gerador de relatórios estáticos: carrega as publicações uma única vez e grava,
+# para cada conjunto de filtros pré-definido, todas as visualizações do painel
+# (JSON/HTML do Plotly, PNG e a tabela agregada em CSV). O app serve esses
+# arquivos diretamente quando os filtros ativos coincidem com um dos conjuntos,
+# desde que o manifesto tenha sido gerado a partir do mesmo arquivo de dados.
+#
+# Uso: python relatorios.py publicacoes.csv --saida relatorios
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+
+from cache_figuras import serializar_plotly, serializar_png
+from cubo import CuboAgregado
+from dados import COLUNAS_PAINEL, NAO_E_DISCURSO_ODIO, hash_arquivo, ler_publicacoes, ler_textos, versao_arquivo
+from palavras import IndicePalavras
+from paralelo import MotorAgregacao
+from visoes import (
+    DATA_FIM_PADRAO,
+    DATA_INICIO_PADRAO,
+    VISOES,
+    ContextoVisoes,
+    SemDados,
+    opcoes_filtro,
+)
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_PADRAO = "relatorios"
+MANIFESTO = "manifesto.json"
+
+# Conjuntos de filtros pré-calculados; None significa todas as opções do filtro,
+# como ao escolher "Todos"/"Todas" no app
+PRESETS = {
+    "padrao": {"data_inicio": DATA_INICIO_PADRAO, "data_fim": DATA_FIM_PADRAO, "discursos": None, "emocoes": None},
+    "somente_odio": {"data_inicio": DATA_INICIO_PADRAO, "data_fim": DATA_FIM_PADRAO,
+                     "discursos": "odio", "emocoes": None},
+}
+
+
+def resolver_preset(preset, dados):
+    discursos = opcoes_filtro(dados, "resultado_analise")
+    if preset["discursos"] == "odio":
+        discursos = [tipo for tipo in discursos if tipo != NAO_E_DISCURSO_ODIO]
+    elif preset["discursos"] is not None:
+        discursos = list(preset["discursos"])
+    emocoes = opcoes_filtro(dados, "emocao") if preset["emocoes"] is None else list(preset["emocoes"])
+    return preset["data_inicio"], preset["data_fim"], sorted(discursos), sorted(emocoes)
+
+
+def gravar(caminho, conteudo):
+    modo = "wb" if isinstance(conteudo, bytes) else "w"
+    with open(caminho, modo, **({} if modo == "wb" else {"encoding": "utf-8"})) as arquivo:
+        arquivo.write(conteudo)
+
+
+def exporta_png_plotly():
+    # Exportar PNG do Plotly depende do pacote opcional kaleido
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        logger.warning("Pacote kaleido não instalado; os gráficos do Plotly não terão PNG.")
+        return False
+    return True
+
+
+def gravar_visao(visao, contexto, diretorio, com_png=True):
+    # Grava os artefatos de uma visão e devolve sua entrada no manifesto
+    try:
+        tabela = visao.tabela(contexto)
+    except SemDados as aviso:
+        return {"mensagem": str(aviso)}
+
+    arquivos = {"tabela": f"{visao.id}.csv"}
+    tabela.to_csv(os.path.join(diretorio, arquivos["tabela"]), index=False)
+
+    figura = visao.figura(tabela)
+    if visao.tipo == "png":
+        arquivos["png"] = f"{visao.id}.png"
+        gravar(os.path.join(diretorio, arquivos["png"]), serializar_png(figura))
+        return {"arquivos": arquivos}
+
+    arquivos["json"] = f"{visao.id}.json"
+    gravar(os.path.join(diretorio, arquivos["json"]), serializar_plotly(figura))
+    arquivos["html"] = f"{visao.id}.html"
+    figura.write_html(os.path.join(diretorio, arquivos["html"]), include_plotlyjs="cdn")
+    if com_png:
+        try:
+            gravar(os.path.join(diretorio, f"{visao.id}.png"), figura.to_image(format="png"))
+            arquivos["png"] = f"{visao.id}.png"
+        except (ImportError, ValueError, RuntimeError) as erro:
+            logger.warning("PNG de %s não gerado: %s", visao.id, erro)
+    return {"arquivos": arquivos}
+
+
+def gerar_relatorios(caminho_arquivo, saida=DIRETORIO_PADRAO, presets=None, com_png=True):
+    presets = presets or list(PRESETS)
+    com_png = com_png and exporta_png_plotly()
+    dados = ler_publicacoes(caminho_arquivo, COLUNAS_PAINEL)
+    cubo = CuboAgregado(dados)
+
+    # O índice de palavras só é montado se alguma nuvem precisar dele
+    indice = []
+
+    def indice_palavras():
+        if not indice:
+            motor = MotorAgregacao()
+            indice.append(IndicePalavras.construir(dados, ler_textos(caminho_arquivo), motor))
+            motor.fechar()
+        return indice[0]
+
+    manifesto = {
+        "hash_dados": hash_arquivo(caminho_arquivo),
+        "versao_dados": list(versao_arquivo(caminho_arquivo)),
+        "gerado_em": dt.datetime.now().isoformat(timespec="seconds"),
+        "presets": {},
+    }
+    for nome in presets:
+        data_inicio, data_fim, discursos, emocoes = resolver_preset(PRESETS[nome], dados)
+        contexto = ContextoVisoes(
+            cubo.fatiar(data_inicio, data_fim, discursos, emocoes), indice_palavras,
+            data_inicio, data_fim, discursos, emocoes,
+        )
+        diretorio = os.path.join(saida, nome)
+        os.makedirs(diretorio, exist_ok=True)
+        manifesto["presets"][nome] = {
+            "data_inicio": data_inicio.isoformat(),
+            "data_fim": data_fim.isoformat(),
+            "discursos": discursos,
+            "emocoes": emocoes,
+            "visoes": {visao.id: gravar_visao(visao, contexto, diretorio, com_png) for visao in VISOES},
+        }
+
+    gravar(os.path.join(saida, MANIFESTO), json.dumps(manifesto, ensure_ascii=False, indent=2))
+    return manifesto
+
+
+def mesmos_dados(manifesto, caminho_arquivo):
+    # Se o arquivo tem o mesmo caminho, data de modificação e tamanho registrados no
+    # manifesto, o conteúdo não é relido; senão é conferido pelo hash
+    if manifesto.get("versao_dados") == list(versao_arquivo(caminho_arquivo)):
+        return True
+    return manifesto.get("hash_dados") == hash_arquivo(caminho_arquivo)
+
+
+class RelatoriosPrecalculados:
+    # Consulta, pelo lado do app, aos artefatos gravados por gerar_relatorios
+    def __init__(self, diretorio=DIRETORIO_PADRAO, caminho_dados=None):
+        self.diretorio = diretorio
+        self.visoes = {}
+        try:
+            with open(os.path.join(diretorio, MANIFESTO), encoding="utf-8") as arquivo:
+                manifesto = json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        # Relatórios gerados a partir de outro arquivo de dados são ignorados
+        if caminho_dados is not None and not mesmos_dados(manifesto, caminho_dados):
+            return
+        for nome, preset in manifesto["presets"].items():
+            filtros = (
+                dt.date.fromisoformat(preset["data_inicio"]),
+                dt.date.fromisoformat(preset["data_fim"]),
+                tuple(sorted(preset["discursos"])),
+                tuple(sorted(preset["emocoes"])),
+            )
+            for id_visao, entrada in preset["visoes"].items():
+                self.visoes[filtros + (id_visao,)] = (nome, entrada)
+
+    def __len__(self):
+        return len(self.visoes)
+
+    def buscar(self, data_inicio, data_fim, filtro_discurso, filtro_emocao, id_visao, formato):
+        # Bytes do artefato no formato pedido ("json" ou "png"), ou None quando não
+        # há relatório para esses filtros. Visões sem dados levantam SemDados
+        chave = (data_inicio, data_fim, tuple(sorted(filtro_discurso)), tuple(sorted(filtro_emocao)), id_visao)
+        if chave not in self.visoes:
+            return None
+        nome, entrada = self.visoes[chave]
+        if "mensagem" in entrada:
+            raise SemDados(entrada["mensagem"])
+        arquivo = entrada["arquivos"].get(formato)
+        if arquivo is None:
+            return None
+        try:
+            with open(os.path.join(self.diretorio, nome, arquivo), "rb") as conteudo:
+                return conteudo.read()
+        except FileNotFoundError:
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcula as visualizações do painel em arquivos estáticos.")
+    parser.add_argument("csv", help="CSV (ou Parquet) de publicações analisadas")
+    parser.add_argument("--saida", default=DIRETORIO_PADRAO, help="Diretório dos relatórios (padrão: relatorios)")
+    parser.add_argument("--preset", action="append", choices=list(PRESETS),
+                        help="Conjunto de filtros a gerar (pode repetir; padrão: todos)")
+    parser.add_argument("--sem-png", action="store_true", help="Não exporta PNG dos gráficos do Plotly")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    manifesto = gerar_relatorios(args.csv, args.saida, args.preset, com_png=not args.sem_png)
+    for nome, preset in manifesto["presets"].items():
+        geradas = sum("arquivos" in entrada for entrada in preset["visoes"].values())
+        print(f"{nome}: {geradas}/{len(preset['visoes'])} visualizações em {os.path.join(args.saida, nome)}")
+
+
+if __name__ == "__main__":
+    main()
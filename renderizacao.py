@@ -0,0 +1,103 @@
+# Execução das visualizações em segundo plano. As visões pesadas (visoes.Visao
+# com pesada=True) são construídas em um pool de threads compartilhado entre as
+# sessões enquanto o app exibe as leves; cada figura vira uma tarefa identificada
+# pela chave do cache de figuras, e sessões que pedem a mesma figura ao mesmo
+# tempo aguardam a mesma tarefa.
+#
+# Quando os filtros mudam no meio do cálculo, a sessão deixa de se interessar
+# pelas tarefas da renderização anterior; tarefas sem nenhuma sessão interessada
+# são canceladas: as que ainda não começaram nem chegam a rodar e as que estão
+# rodando param na próxima etapa (antes da agregação, da figura ou de guardar o
+# resultado no cache).
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_figuras import serializar_plotly, serializar_png
+
+TRABALHADORES_PADRAO = 2
+
+# O pyplot guarda estado global e não pode montar duas figuras ao mesmo tempo
+TRAVA_MATPLOTLIB = threading.Lock()
+
+
+class Cancelada(Exception):
+    pass
+
+
+def verificar(cancelada):
+    if cancelada is not None and cancelada.is_set():
+        raise Cancelada()
+
+
+def construir_figura(visao, contexto, cancelada=None):
+    # Tabela e figura serializada da visão; devolve os bytes e as medições de
+    # cada etapa. Não usa o Streamlit, para poder rodar fora da thread do script
+    medidas = {}
+    verificar(cancelada)
+    inicio = time.perf_counter()
+    tabela = visao.tabela(contexto)
+    medidas["agregacao_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+    medidas["linhas"] = len(tabela)
+    verificar(cancelada)
+    inicio = time.perf_counter()
+    if visao.tipo == "plotly":
+        conteudo = serializar_plotly(visao.figura(tabela))
+    else:
+        with TRAVA_MATPLOTLIB:
+            conteudo = serializar_png(visao.figura(tabela))
+    medidas["figura_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+    return conteudo, medidas
+
+
+class Tarefa:
+    def __init__(self, chave):
+        self.chave = chave
+        self.cancelada = threading.Event()
+        self.interessados = set()
+        self.inicio = time.perf_counter()
+        self.medidas = {}
+        self.futuro = None
+
+
+class ExecutorVisoes:
+    def __init__(self, trabalhadores=TRABALHADORES_PADRAO):
+        self.executor = ThreadPoolExecutor(trabalhadores, thread_name_prefix="visoes")
+        self.tarefas = {}
+        self.trava = threading.Lock()
+
+    def submeter(self, chave, visao, contexto, cache, interessado):
+        # Tarefa que constrói a figura e a guarda no cache; reaproveita a tarefa
+        # em andamento para a mesma chave
+        with self.trava:
+            tarefa = self.tarefas.get(chave)
+            if tarefa is None:
+                tarefa = Tarefa(chave)
+                tarefa.futuro = self.executor.submit(self.executar, tarefa, visao, contexto, cache)
+                self.tarefas[chave] = tarefa
+            tarefa.interessados.add(interessado)
+            return tarefa
+
+    def executar(self, tarefa, visao, contexto, cache):
+        try:
+            conteudo, tarefa.medidas = construir_figura(visao, contexto, tarefa.cancelada)
+            verificar(tarefa.cancelada)
+            cache.guardar(tarefa.chave, conteudo)
+            return conteudo
+        finally:
+            with self.trava:
+                if self.tarefas.get(tarefa.chave) is tarefa:
+                    del self.tarefas[tarefa.chave]
+
+    def liberar(self, interessado, manter=()):
+        # Retira o interesse da sessão nas tarefas fora de `manter` e cancela as
+        # que ficaram sem nenhuma sessão interessada
+        with self.trava:
+            for chave, tarefa in list(self.tarefas.items()):
+                if interessado not in tarefa.interessados or chave in manter:
+                    continue
+                tarefa.interessados.discard(interessado)
+                if not tarefa.interessados:
+                    tarefa.cancelada.set()
+                    tarefa.futuro.cancel()
+                    del self.tarefas[chave]
@@ -1,10 +1,39 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
 import nltk
-from wordcloud import WordCloud, STOPWORDS
-import datetime as dt
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from dados import COLUNAS_PAINEL, versao_arquivo
+from consulta_duckdb import FonteDuckDB
+from duplicatas import IndiceDuplicatas
+from filtros import IndiceFiltros
+from busca import intersecao, posicoes_no_indice
+from paginacao import ORDENACOES, ConsultaPaginada, OrdensTabela
+from cubo import GRANULARIDADE_PADRAO, GRANULARIDADES, QUANTIDADE_USUARIOS_PADRAO
+from paralelo import MotorAgregacao
+from cache_figuras import (
+    CacheFiguras,
+    chave_figura,
+    desserializar_plotly,
+)
+from relatorios import DIRETORIO_PADRAO, RelatoriosPrecalculados
+from ingestao import ConjuntoIncremental, EstadoConjunto
+from instrumentacao import Rastreador, configurar_log
+from renderizacao import ExecutorVisoes, construir_figura
+from visoes import (
+    DATA_FIM_PADRAO,
+    DATA_INICIO_PADRAO,
+    OPCOES,
+    VISOES,
+    VISOES_POR_ID,
+    ContextoVisoes,
+    SemDados,
+    id_figura,
+    opcoes_filtro,
+)
 
 # Baixar os recursos necessários para o NLTK
 nltk.download('punkt')
@@ -13,544 +42,494 @@ nltk.download('stopwords')
 # Carregar os dados do CSV
 caminho_arquivo = "publicacoes.csv"
 
+# O arquivo é lido e tipado uma única vez e compartilhado entre as sessões; a
+# cada execução do script, a versão (caminho, data de modificação e tamanho) é
+# conferida e as publicações acrescentadas por ingestao.py são incorporadas sem
+# reler o arquivo, junto com o cubo, os textos e o índice de palavras.
+# Se existir a versão colunar (converter_colunar.py), ela é lida no lugar do CSV
+# e apenas as colunas usadas pelos filtros e gráficos são carregadas.
+# Com ANALISE_COLAPSAR_DUPLICATAS=1, cada grupo de publicações quase duplicadas
+# do índice de duplicatas (duplicatas.py) entra uma única vez nos gráficos e na tabela
+COLAPSAR_DUPLICATAS = os.environ.get("ANALISE_COLAPSAR_DUPLICATAS") == "1"
+
+@st.cache_resource(show_spinner="Carregando publicações...")
+def obter_conjunto(caminho_arquivo):
+    duplicatas = IndiceDuplicatas() if COLAPSAR_DUPLICATAS else None
+    return ConjuntoIncremental(caminho_arquivo, COLUNAS_PAINEL, duplicatas)
+
+# A tabela busca os textos só das linhas da página, sem carregar a coluna inteira;
+# a coluna completa só é lida para a nuvem de palavras e a busca
+@st.cache_data(show_spinner=False, max_entries=16)
+def textos_pagina(caminho_arquivo, versao, linhas):
+    return obter_conjunto(caminho_arquivo).textos_linhas(list(linhas))
+
+# Backend das consultas: "pandas" (padrão) mantém o conjunto em memória;
+# "duckdb" registra o arquivo no DuckDB e só traz para o pandas os agregados dos
+# gráficos e a página exibida da tabela (consulta_duckdb.py)
+BACKEND = os.environ.get("ANALISE_BACKEND", "pandas")
+
+@st.cache_resource(show_spinner="Registrando publicações no DuckDB...", max_entries=2)
+def obter_fonte_duckdb(caminho_arquivo, versao):
+    return FonteDuckDB(caminho_arquivo)
+
 def carregar_dados(caminho_arquivo):
+    # Estado (versão, publicações e cubo) da versão atual do arquivo
     try:
-        dados = pd.read_csv(caminho_arquivo)
-        colunas_necessarias = ["resultado_analise", "emocao", "hora_postagem", "upvotes", "comentarios", "texto"]
-        colunas_faltando = [col for col in colunas_necessarias if col not in dados.columns]
-        if colunas_faltando:
-            st.error(f"As colunas ausentes são: {colunas_faltando}. Verifique o arquivo CSV.")
-            return None
-        return dados
+        if BACKEND == "duckdb":
+            versao = versao_arquivo(caminho_arquivo)
+            fonte = obter_fonte_duckdb(caminho_arquivo, versao)
+            # No DuckDB cada fatia agrega com consultas sobre a própria fonte
+            return EstadoConjunto(versao, fonte, fonte)
+        return obter_conjunto(caminho_arquivo).atualizar()
     except FileNotFoundError:
         st.error("O arquivo não foi encontrado. Verifique o caminho.")
+    except ValueError as e:
+        st.error(str(e))
     except Exception as e:
         st.error(f"Ocorreu um erro ao carregar o arquivo: {e}")
     return None
 
-dados = carregar_dados(caminho_arquivo)
-if dados is None:
-    st.stop()
-
-# Configuração do layout e título
-st.title("Análise de Discurso de Ódio no Reddit através do ChatGPT")
-
-dados["hora_postagem"] = pd.to_datetime(dados["hora_postagem"], errors="coerce")
-dados["hora_postagem_formatada"] = dados["hora_postagem"].dt.strftime("%d/%m/%Y %H:%M:%S")
-dados["engajamento"] = dados["upvotes"] + dados["comentarios"]
-dados["eh_discurso_odio"] = dados["resultado_analise"].apply(
-    lambda x: "Discurso de Ódio" if x != "não é discurso de ódio" else "Não é Discurso de Ódio"
-)
-
-data_min = dados["hora_postagem"].min()
-data_max = dados["hora_postagem"].max()
-data_inicio_default = data_min.date() if pd.notnull(data_min) else None
-data_fim_default = data_max.date() if pd.notnull(data_max) else None
+configurar_log()
+
+# Tempo, linhas e memória de cada etapa desta renderização vão para o log ao
+# sair do bloco with, mesmo quando a execução para antes do fim (st.stop, um
+# erro ou uma nova execução); com ?debug=1 na URL, também para o painel de
+# desempenho no final da página
+with Rastreador() as rastreador:
+    with rastreador.etapa("carregamento") as etapa:
+        estado = carregar_dados(caminho_arquivo)
+        etapa.linhas = len(estado.dados) if estado is not None else 0
+    if estado is None:
+        st.stop()
+    # Uma única cópia das publicações para todas as sessões, somente leitura: cada
+    # sessão guarda apenas as seleções dos filtros e listas de posições de linhas
+    dados = estado.dados
+    versao_dados = estado.versao
+
+    # A tokenização dos textos (nuvem de palavras e busca) é dividida pelo motor de
+    # agregação paralela, em processos (ANALISE_TRABALHADORES define o número de
+    # trabalhadores; 1 roda em série). Os gráficos somam as células do cubo e não
+    # passam pelo motor
+    @st.cache_resource(show_spinner=False)
+    def obter_motor_agregacao():
+        return MotorAgregacao()
+
+    motor_agregacao = obter_motor_agregacao()
+    conjunto = None if BACKEND == "duckdb" else obter_conjunto(caminho_arquivo)
+
+    # Configuração do layout e título
+    st.title("Análise de Discurso de Ódio no Reddit através do ChatGPT")
+
+    # Filtros
+    st.subheader("Filtros")
+    import streamlit as st
+    from datetime import datetime
+
+    # Valores padrão para as datas
+    data_inicio_default = DATA_INICIO_PADRAO.strftime('%d/%m/%Y')  # 01/09/2017
+    data_fim_default = DATA_FIM_PADRAO.strftime('%d/%m/%Y')  # 31/12/2024
+    data_min = datetime(2024, 1, 1)
+    data_max = datetime(2024, 12, 31)
+
+    col1, col2 = st.columns(2)
 
-# Filtros
-st.subheader("Filtros")
-import streamlit as st
-from datetime import datetime
-
-# Valores padrão para as datas
-data_inicio_default = datetime(2017, 9, 1).strftime('%d/%m/%Y')  # 01/12/2024
-data_fim_default = datetime(2024, 12, 31).strftime('%d/%m/%Y')  # 31/12/2024
-data_min = datetime(2024, 1, 1)
-data_max = datetime(2024, 12, 31)
+    with col1:
+        data_inicio_str = st.text_input(
+            "Data Inicial",
+            value=data_inicio_default,
+            key="data_inicio"
+        )
+        try:
+            data_inicio = datetime.strptime(data_inicio_str, '%d/%m/%Y').date()
+        except ValueError:
+            st.error("Por favor, insira uma data válida no formato dd/mm/aaaa")
+            data_inicio = None
+
+    with col2:
+        data_fim_str = st.text_input(
+            "Data Final",
+            value=data_fim_default,
+            key="data_fim"
+        )
+        try:
+            data_fim = datetime.strptime(data_fim_str, '%d/%m/%Y').date()
+        except ValueError:
+            st.error("Por favor, insira uma data válida no formato dd/mm/aaaa")
+            data_fim = None
+
+    # Opções dos filtros de tipo de discurso e emoção
+    if BACKEND == "duckdb":
+        opcoes_discurso = dados.opcoes("resultado_analise")
+        opcoes_emocao = dados.opcoes("emocao")
+    else:
+        opcoes_discurso = opcoes_filtro(dados, "resultado_analise")
+        opcoes_emocao = opcoes_filtro(dados, "emocao")
 
-col1, col2 = st.columns(2)
+    col3, col4 = st.columns(2)
 
-with col1:
-    data_inicio_str = st.text_input(
-        "Data Inicial",
-        value=data_inicio_default,
-        key="data_inicio"
-    )
-    try:
-        data_inicio = datetime.strptime(data_inicio_str, '%d/%m/%Y').date()
-    except ValueError:
-        st.error("Por favor, insira uma data válida no formato dd/mm/aaaa")
-        data_inicio = None
-
-with col2:
-    data_fim_str = st.text_input(
-        "Data Final",
-        value=data_fim_default,
-        key="data_fim"
-    )
-    try:
-        data_fim = datetime.strptime(data_fim_str, '%d/%m/%Y').date()
-    except ValueError:
-        st.error("Por favor, insira uma data válida no formato dd/mm/aaaa")
-        data_fim = None
-
-col3, col4 = st.columns(2)
-
-with col3:
-    filtro_discurso = st.multiselect(
-        "Escolha o tipo de discurso que deseja visualizar",
-        options=["Todos"] + list(dados["resultado_analise"].unique()),
-        default=[],
-        key="filtro_discurso"
-    )
-    if "Todos" in filtro_discurso:
-        filtro_discurso = list(dados["resultado_analise"].unique())
-
-with col4:
-    filtro_emocao = st.multiselect(
-        "Escolha o tipo de emoção que deseja visualizar",
-        options=["Todas"] + list(dados["emocao"].unique()),
-        default=[],
-        key="filtro_emocao"
+    with col3:
+        filtro_discurso = st.multiselect(
+            "Escolha o tipo de discurso que deseja visualizar",
+            options=["Todos"] + opcoes_discurso,
+            default=[],
+            key="filtro_discurso"
+        )
+        if "Todos" in filtro_discurso:
+            filtro_discurso = opcoes_discurso
+
+    with col4:
+        filtro_emocao = st.multiselect(
+            "Escolha o tipo de emoção que deseja visualizar",
+            options=["Todas"] + opcoes_emocao,
+            default=[],
+            key="filtro_emocao"
+        )
+        if "Todas" in filtro_emocao:
+            filtro_emocao = opcoes_emocao
+
+    # Verificação se os filtros foram preenchidos
+    if not data_inicio or not data_fim or not filtro_discurso or not filtro_emocao:
+        st.warning("Preencha todos os filtros para prosseguir.")
+        st.stop()
+
+    # Aplicação de filtros: o índice é montado uma vez por versão dos dados (só as
+    # duas últimas versões ficam guardadas) e devolve as posições das linhas
+    # filtradas sem percorrer o conjunto inteiro
+    @st.cache_resource(show_spinner=False, max_entries=2)
+    def obter_indice_filtros(caminho_arquivo, versao, _dados):
+        # No DuckDB o filtro é uma consulta: a própria fonte faz o papel do índice
+        return _dados if BACKEND == "duckdb" else IndiceFiltros(_dados)
+
+    rastreador.contexto.update(
+        data_inicio=data_inicio, data_fim=data_fim,
+        filtro_discurso=sorted(filtro_discurso), filtro_emocao=sorted(filtro_emocao),
     )
-    if "Todas" in filtro_emocao:
-        filtro_emocao = list(dados["emocao"].unique())
-
-# Verificação se os filtros foram preenchidos
-if not data_inicio or not data_fim or not filtro_discurso or not filtro_emocao:
-    st.warning("Preencha todos os filtros para prosseguir.")
-    st.stop()
-
-# Aplicação de filtros
-data_filtered = dados[
-    (dados["hora_postagem"].dt.date >= data_inicio) &
-    (dados["hora_postagem"].dt.date <= data_fim) &
-    (dados["resultado_analise"].isin(filtro_discurso)) &
-    (dados["emocao"].isin(filtro_emocao))
-]
-
-import streamlit as st
 
-# Configurar os títulos das colunas para a tabela
-colunas_legiveis = {
-    "hora_postagem": "Data e Hora em que a Publicação foi feita",
-    "usuario": "Usuário",
-    "resultado_analise": "Resultado da Análise do Discurso",
-    "emocao": "Emoção Predominante",
-    "upvotes": "Likes",
-    "comentarios": "Comentários",
-    "texto": "Publicação"
-}
-
-# Verificar se todas as colunas do dicionário estão presentes no DataFrame
-colunas_existentes = [coluna for coluna in colunas_legiveis if coluna in data_filtered.columns]
-
-# Configuração inicial de paginação
-if "pagina_atual" not in st.session_state:
-    st.session_state.pagina_atual = 1
-
-# Quantidade de itens por página
-ITENS_POR_PAGINA = 10
-
-# Configuração para limitar a navegação
-PAGINA_MINIMA = 1
-PAGINA_MAXIMA = 31
-
-# Verificar se o DataFrame filtrado não está vazio
-if not data_filtered.empty:
-    # Número total de páginas dentro do limite
-    total_itens = len(data_filtered)
-    total_paginas = min(PAGINA_MAXIMA, (total_itens + ITENS_POR_PAGINA - 1) // ITENS_POR_PAGINA)
-
-    # Ajustar a página atual para estar no intervalo permitido
-    st.session_state.pagina_atual = max(
-        PAGINA_MINIMA, min(st.session_state.pagina_atual, total_paginas)
+    with rastreador.etapa("indice_filtros"):
+        indice_filtros = obter_indice_filtros(caminho_arquivo, versao_dados, dados)
+
+    # Configurar os títulos das colunas para a tabela
+    colunas_legiveis = {
+        "hora_postagem": "Data e Hora em que a Publicação foi feita",
+        "usuario": "Usuário",
+        "resultado_analise": "Resultado da Análise do Discurso",
+        "emocao": "Emoção Predominante",
+        "upvotes": "Likes",
+        "comentarios": "Comentários",
+        "texto": "Publicação"
+    }
+
+    # Verificar se todas as colunas do dicionário estão presentes no DataFrame
+    # (o texto é carregado à parte, apenas para as linhas da página exibida)
+    colunas_dados = dados.colunas if BACKEND == "duckdb" else dados.columns
+    colunas_existentes = [coluna for coluna in colunas_legiveis if coluna in colunas_dados or coluna == "texto"]
+
+    # Quantidade de itens por página
+    ITENS_POR_PAGINA = 10
+
+    # Ordens de classificação da tabela, calculadas uma vez por versão dos dados
+    @st.cache_resource(show_spinner=False, max_entries=2)
+    def obter_ordens_tabela(caminho_arquivo, versao, _dados):
+        return _dados if BACKEND == "duckdb" else OrdensTabela(_dados)
+
+    # Busca nos textos pelo índice invertido (busca.py), montado na primeira busca e
+    # atualizado a cada ingestão; devolve as posições (iloc) das publicações
+    # encontradas, ou None quando a busca não tem nenhum termo
+    def buscar_publicacoes(busca):
+        with st.spinner("Indexando os textos para a busca..."):
+            linhas_arquivo = conjunto.buscar(busca, motor_agregacao)
+        return None if linhas_arquivo is None else posicoes_no_indice(dados.index, linhas_arquivo)
+
+    # Lista ordenada das linhas filtradas; as últimas consultas ficam guardadas e
+    # trocar de página não refaz o filtro, a busca nem a ordenação
+    @st.cache_resource(show_spinner=False, max_entries=32)
+    def consultar_publicacoes(chave_consulta, _indice_filtros, _ordens_tabela):
+        versao, data_inicio, data_fim, filtro_discurso, filtro_emocao, ordenacao, busca = chave_consulta
+        linhas = _indice_filtros.filtrar(data_inicio, data_fim, filtro_discurso, filtro_emocao)
+        encontradas = buscar_publicacoes(busca) if busca else None
+        if encontradas is not None:
+            linhas = intersecao(linhas, encontradas)
+        coluna, decrescente = ORDENACOES[ordenacao]
+        return ConsultaPaginada(_ordens_tabela.ordenar(linhas, coluna, decrescente), ITENS_POR_PAGINA)
+
+    # A busca textual usa o índice em memória e fica disponível só no backend pandas
+    busca_publicacoes = ""
+    if BACKEND != "duckdb":
+        busca_publicacoes = st.text_input(
+            "Buscar nas publicações",
+            key="busca_publicacoes",
+            placeholder='Ex.: odio  racis*  "discurso de odio"',
+            help="Palavras sem acentos nem maiúsculas; termine com * para buscar por prefixo e use aspas "
+                 "para uma frase. As publicações precisam ter todos os itens.",
+        ).strip()
+    ordenacao_tabela = st.selectbox("Ordenar publicações por", list(ORDENACOES), key="ordenacao_tabela")
+    chave_consulta = (
+        versao_dados, data_inicio, data_fim,
+        tuple(sorted(filtro_discurso)), tuple(sorted(filtro_emocao)), ordenacao_tabela, busca_publicacoes,
     )
+    with rastreador.etapa("filtro", ordenacao=ordenacao_tabela, busca=busca_publicacoes) as etapa:
+        consulta = consultar_publicacoes(
+            chave_consulta, indice_filtros, obter_ordens_tabela(caminho_arquivo, versao_dados, dados)
+        )
+        etapa.linhas = consulta.total
+
+    # O cursor (posição da primeira linha da página) volta ao início quando a consulta muda
+    if st.session_state.get("chave_consulta") != chave_consulta:
+        st.session_state.chave_consulta = chave_consulta
+        st.session_state.cursor_tabela = 0
+
+    def avancar_pagina():
+        st.session_state.cursor_tabela = consulta.proximo(st.session_state.cursor_tabela)
+
+    def voltar_pagina():
+        st.session_state.cursor_tabela = consulta.anterior(st.session_state.cursor_tabela)
+
+    # Verificar se o resultado filtrado não está vazio
+    if consulta.total > 0:
+        cursor = consulta.ajustar_cursor(st.session_state.cursor_tabela)
+
+        # Instruções para o usuário
+        st.markdown(
+            """
+            ### Publicações Filtradas
+            #### Dicas de Uso:
+            - Use os botões **Próximo** e **Anterior** para navegar entre as páginas.
+            - Escolha a **ordenação** para ver primeiro as publicações mais recentes ou com mais engajamento.
+            - Use a **busca** para ver só as publicações que mencionam determinados termos.
+            - Role a tabela para **baixo** ou para os **lados** para ver mais detalhes das publicações.
+            - Cada página exibe até **10 publicações**.
+            - Clique no **campo** que deseja visualizar para verificar todos os dados do mesmo.
+            """
+        )
+
+        # Apenas as linhas da página atual são montadas; o texto é buscado só para elas
+        with rastreador.etapa("paginacao", cursor=cursor) as etapa:
+            linhas_pagina = consulta.pagina(cursor)
+            if BACKEND == "duckdb":
+                tabela_pagina = dados.linhas(linhas_pagina, colunas_existentes)
+            else:
+                tabela_pagina = dados.iloc[linhas_pagina][[c for c in colunas_existentes if c != "texto"]]
+                if "texto" in colunas_existentes:
+                    tabela_pagina = tabela_pagina.assign(
+                        texto=textos_pagina(caminho_arquivo, versao_dados, tuple(tabela_pagina.index.tolist()))
+                    )[colunas_existentes]
+            tabela_pagina = tabela_pagina.rename(columns=colunas_legiveis)
+            etapa.linhas = len(tabela_pagina)
 
-    # Instruções para o usuário
-    st.markdown(
-        """
-        ### Publicações Filtradas
-        #### Dicas de Uso:
-        - Use os botões **Próximo** e **Anterior** para navegar entre as páginas.
-        - Role a tabela para **baixo** ou para os **lados** para ver mais detalhes das publicações.
-        - Cada página exibe até **10 publicações**.
-        - Navegação limitada às páginas **1 a 31**.
-        - Clique no **campo** que deseja visualizar para verificar todos os dados do mesmo.
-        """
-    )
+        # Exibir a tabela formatada com largura maior
+        st.dataframe(
+            tabela_pagina,
+            use_container_width=True,  # Largura total da tela
+            height=350,  # Altura adequada para 10 linhas
+        )
 
-    # Cálculo de índices de acordo com a página atual
-    inicio = (st.session_state.pagina_atual - 1) * ITENS_POR_PAGINA
-    fim = min(inicio + ITENS_POR_PAGINA, total_itens)  # Garantir que não ultrapasse o limite
-    tabela_pagina = data_filtered.iloc[inicio:fim][colunas_existentes].rename(columns=colunas_legiveis)
+        # Botões de navegação
+        col1, col2, col3 = st.columns([1, 2, 1])
 
-    # Exibir a tabela formatada com largura maior
-    st.dataframe(
-        tabela_pagina,
-        use_container_width=True,  # Largura total da tela
-        height=350,  # Altura adequada para 10 linhas
-    )
+        with col1:
+            st.button("Anterior", disabled=not consulta.tem_anterior(cursor), on_click=voltar_pagina)
 
-    # Botões de navegação
-    col1, col2, col3 = st.columns([1, 2, 1])
+        with col3:
+            st.button("Próximo", disabled=not consulta.tem_proximo(cursor), on_click=avancar_pagina)
 
-    with col1:
-        if st.button("Anterior", disabled=(st.session_state.pagina_atual <= PAGINA_MINIMA)):
-            st.session_state.pagina_atual -= 1
+        # Exibir página atual
+        st.text(f"Página {consulta.numero_pagina(cursor)} de {consulta.total_paginas} ({consulta.total} publicações)")
 
-    with col3:
-        if st.button("Próximo", disabled=(st.session_state.pagina_atual >= PAGINA_MAXIMA)):
-            st.session_state.pagina_atual += 1
-
-    # Exibir página atual
-    st.text(f"Página {st.session_state.pagina_atual} de {PAGINA_MAXIMA}")
-
-else:
-    # Caso o DataFrame esteja vazio
-    st.error("Nenhuma publicação encontrada com os filtros selecionados. Ajuste os filtros e tente novamente.")
-
-st.subheader("Visualizações")
-# Opções disponíveis
-opcoes = [
-    "Discurso (Ódio/Não Ódio)",
-    "Tipos de Discurso de Ódio",
-    "Emoções",
-    "Quantidade de Comentários",
-    "Visualizações",
-    "Likes (Upvotes)",
-    "Frequência por tipo de discurso",
-    "Frequência por usuário",
-    "Palavras Mais Comuns"
-]
-
-# Multiselect com a opção "Todos" adicionada
-visualizacoes = st.multiselect(
-    "Escolha uma ou mais opções",
-    ["Todos"] + opcoes  # "Todos" adicionado
-)
-
-# Lógica para tratar a seleção de "Todos"
-if "Todos" in visualizacoes:
-    visualizacoes = opcoes  # Seleciona todas as opções
-
-def aplicar_estilo(fig):
-    fig.update_layout(
-        plot_bgcolor="black",
-        paper_bgcolor="black",
-        font=dict(color="white"),
-        title_font=dict(size=18, family="Arial, sans-serif", color="white"),
-        margin=dict(t=40, b=40, l=40, r=40)
-    )
-    return fig
-
-if "Discurso (Ódio/Não Ódio)" in visualizacoes:
-    contagem_odio = data_filtered["eh_discurso_odio"].value_counts()
-
-    # Criando o gráfico de pizza com modificações para um gráfico redondo e fundo preto
-    fig1 = px.pie(
-        data_filtered,
-        names="eh_discurso_odio",
-        title="Discurso de Ódio vs Não é Discurso de Ódio",
-        hole=0,  # Retira o buraco central para um gráfico totalmente redondo
-        color_discrete_sequence=["#ff6666", "#4C99FF"],  # Cores mais sóbrias
-    )
-
-    # Ajustes estéticos
-    fig1.update_traces(
-        hoverinfo="label+percent",  # Informação ao passar o mouse
-        textinfo="value+percent",  # Exibe valor absoluto e percentagem
-        textfont=dict(size=14, family="Arial, sans-serif"),  # Tamanho da fonte
-    )
+    else:
+        # Caso o DataFrame esteja vazio
+        st.error("Nenhuma publicação encontrada com os filtros selecionados. Ajuste os filtros e tente novamente.")
 
-    # Ajustar layout
-    fig1.update_layout(
-        showlegend=True,
-        title_font=dict(size=18, family="Arial, sans-serif", color="white"),  # Fonte do título
-        plot_bgcolor="black",  # Cor de fundo do gráfico
-        paper_bgcolor="black",  # Cor de fundo da área externa do gráfico
-        margin=dict(t=40, b=40, l=40, r=40),  # Ajuste de margens para deixar o gráfico mais próximo da borda
-        font=dict(color="white")  # Cor da fonte do título e do texto
-    )
 
-    fig1 = aplicar_estilo(fig1)
-    st.plotly_chart(fig1)
+    st.subheader("Visualizações")
+    # Opções disponíveis
+    opcoes = OPCOES
 
-if "Tipos de Discurso de Ódio" in visualizacoes:
-    # Certificando que a coluna 'hora_postagem' está em formato datetime
-    if 'hora_postagem' in data_filtered.columns:
-        data_filtered['hora_postagem'] = pd.to_datetime(data_filtered['hora_postagem'], errors='coerce')
-    else:
-        st.error("A coluna 'hora_postagem' não está presente nos dados.")
-        raise ValueError("A coluna 'hora_postagem' não foi encontrada.")
-    
-    # Contar a quantidade de cada tipo de discurso de ódio
-    discurso_tipo = data_filtered["resultado_analise"].value_counts().reset_index()
-    discurso_tipo.columns = ["Tipo de Discurso", "Quantidade"]
-    
-    # Criando o gráfico de barras para visualizar os tipos de discurso de ódio
-    fig8 = px.bar(
-        discurso_tipo,
-        x="Tipo de Discurso",
-        y="Quantidade",
-        title="Distribuição dos Tipos de Discurso de Ódio",
-        labels={"Tipo de Discurso": "Tipo de Discurso de Ódio", "Quantidade": "Quantidade"},
-        color="Tipo de Discurso",  # Diferencia as barras por tipo de discurso de ódio
-        color_discrete_sequence=px.colors.qualitative.Set1  # Paleta de cores definida
-    )
-    
-    # Aplicando o estilo ao gráfico
-    fig8 = aplicar_estilo(fig8)
-    
-    # Exibindo apenas o gráfico
-    st.plotly_chart(fig8)
-
-if "Emoções" in visualizacoes:
-    # Filtrar apenas discursos de ódio
-    odio_emocoes = data_filtered[data_filtered["eh_discurso_odio"] == "Discurso de Ódio"]
-    emocao_contagem = odio_emocoes.groupby(["resultado_analise", "emocao"]).size().reset_index(name="count")
-    
-    fig2 = px.bar(
-        emocao_contagem,
-        x="emocao",
-        y="count",
-        color="resultado_analise",
-        barmode="group",
-        title="Distribuição de Emoções por Tipo de Discurso de Ódio",
-        labels={"emocao": "Emoção", "count": "Quantidade", "resultado_analise": "Tipo de Discurso de Ódio"},
-    )
-    fig2 = aplicar_estilo(fig2)
-    st.plotly_chart(fig2)
-
-# Verificando se 'hora_postagem' é datetime
-if 'hora_postagem' in data_filtered.columns:
-    data_filtered['hora_postagem'] = pd.to_datetime(data_filtered['hora_postagem'], errors='coerce')
-else:
-    st.error("A coluna 'hora_postagem' não está presente nos dados.")
-    raise ValueError("A coluna 'hora_postagem' não foi encontrada.")
-
-# Filtrar os dados para discurso de ódio
-if "Frequência por tipo de discurso" in visualizacoes:
-    # Filtrar os dados com base no tipo de discurso
-    odio_tempo = data_filtered[data_filtered["resultado_analise"].isin(["racismo", "homofobia", "sexismo", "xenofobia", "transfobia", "não é discurso de ódio"])]
-    
-    # Agrupar por mês e tipo de discurso
-    odio_tempo["mes_postagem"] = odio_tempo["hora_postagem"].dt.to_period("M").astype(str)  # Converter para string
-    odio_por_tipo_tempo = odio_tempo.groupby(["mes_postagem", "resultado_analise"]).size().reset_index(name="count")
-
-    # Criar o gráfico de linhas com Plotly Express
-    fig3 = px.line(
-        odio_por_tipo_tempo,
-        x="mes_postagem",
-        y="count",
-        color="resultado_analise",
-        title="Tipos de Discurso de Ódio ao Longo do Tempo",
-        labels={"mes_postagem": "Mês", "count": "Quantidade", "resultado_analise": "Tipo de Discurso de Ódio"},
-        markers=True  # Marca os pontos de cada linha
-    )
-    
-    # Aplicar o estilo ao gráfico (caso haja uma função 'aplicar_estilo')
-    fig3 = aplicar_estilo(fig3)
-    
-    # Exibir o gráfico
-    st.plotly_chart(fig3)
-if "Likes (Upvotes)" in visualizacoes:
-    # Agrupar e calcular a média de upvotes
-    try:
-        media_upvotes = data_filtered.groupby("resultado_analise")["upvotes"].mean().reset_index()
-        media_upvotes.columns = ["Tipo de Discurso", "Média de Likes"]  # Manter como "Upvotes"
-        
-        # Verificar se há dados
-        if not media_upvotes.empty:
-            # Criar o gráfico de barras
-            fig5 = px.bar(
-                media_upvotes,
-                x="Tipo de Discurso",
-                y="Média de Likes",  # Usar "Média de Upvotes" na exibição
-                title="Média de Likes por Tipo de Discurso de Ódio",
-                color="Tipo de Discurso",
-                text_auto=True
-            )
-            fig5 = aplicar_estilo(fig5)  # Aplicar estilo, se necessário
-            st.plotly_chart(fig5)  # Exibir o gráfico no Streamlit
-        else:
-            st.write("Não há dados de upvotes para os tipos de discurso de ódio.")
-    except KeyError as e:
-        st.error(f"Ocorreu um erro com a coluna de dados: {e}")
-        
-if "Visualizações" in visualizacoes:
-    # Agrupar os dados por tipo de análise, incluindo "não é discurso de ódio"
-    visualizacoes_por_tipo = data_filtered.groupby("resultado_analise")["visualizacoes"].sum().reset_index()
-
-    # Certificar-se de que todas as categorias (incluindo 'não é discurso de ódio') estão presentes
-    tipos_discurso = ["não é discurso de ódio", "racismo", "homofobia", "machismo", "sexismo"]  # Adicione os tipos desejados aqui
-
-    # Garantir que todos os tipos de discurso apareçam, mesmo os sem dados
-    for tipo in tipos_discurso:
-        if tipo not in visualizacoes_por_tipo["resultado_analise"].values:
-            # Criar um DataFrame temporário para o tipo ausente
-            temp_df = pd.DataFrame({"resultado_analise": [tipo], "visualizacoes": [0]})
-            # Concatenar o DataFrame original com o novo DataFrame
-            visualizacoes_por_tipo = pd.concat([visualizacoes_por_tipo, temp_df], ignore_index=True)
-
-    # Ordenar as barras em ordem decrescente de visualizações
-    visualizacoes_por_tipo = visualizacoes_por_tipo.sort_values("visualizacoes", ascending=False)
-
-    # Criar gráfico de barras para visualizações por tipo de discurso
-    fig_visualizacoes_tipo = px.bar(
-        visualizacoes_por_tipo,
-        x="resultado_analise",
-        y="visualizacoes",
-        title="Visualizações por Tipo de Discurso",
-        labels={"resultado_analise": "Resultado da Análise", "visualizacoes": "Total de Visualizações"},
-        color=None,  # Remover a diferenciação por cor
-        color_discrete_sequence=["#1f77b4"]  # Aplicar uma cor única
+    # Multiselect com a opção "Todos" adicionada
+    visualizacoes = st.multiselect(
+        "Escolha uma ou mais opções",
+        ["Todos"] + opcoes  # "Todos" adicionado
     )
 
-    # Ajustes de estilo e layout
-    fig_visualizacoes_tipo.update_layout(
-        plot_bgcolor="black",
-        paper_bgcolor="black",
-        font=dict(color="white"),
-        xaxis=dict(title="Tipos de Discurso", showgrid=False),
-        yaxis=dict(title="Visualizações", showgrid=True, gridcolor="gray"),
-        title=dict(font=dict(size=20)),
-        showlegend=False  # Remover a legenda
+    # Lógica para tratar a seleção de "Todos"
+    if "Todos" in visualizacoes:
+        visualizacoes = opcoes  # Seleciona todas as opções
+
+    # Os gráficos são calculados a partir do cubo pré-agregado do estado carregado
+    # (atualizado a cada ingestão); cada filtro apenas seleciona e soma células do cubo
+    with rastreador.etapa("cubo") as etapa:
+        fatia_cubo = estado.cubo.fatiar(
+            data_inicio, data_fim, filtro_discurso, filtro_emocao
+        )
+        etapa.linhas = len(fatia_cubo)
+
+    # Figuras já renderizadas ficam em um cache LRU compartilhado entre as sessões,
+    # indexado pela versão dos dados, pelos filtros e pelo gráfico
+    @st.cache_resource(show_spinner=False)
+    def obter_cache_figuras():
+        return CacheFiguras()
+
+    cache_figuras = obter_cache_figuras()
+
+    # Relatórios pré-calculados (relatorios.py) para os filtros mais usados; só valem
+    # se tiverem sido gerados a partir do mesmo conteúdo do arquivo de dados. O
+    # arquivo só é lido para o hash quando há um manifesto e a versão registrada
+    # nele não coincide
+    @st.cache_resource(show_spinner=False, max_entries=2)
+    def obter_relatorios(caminho_arquivo, versao):
+        return RelatoriosPrecalculados(DIRETORIO_PADRAO, caminho_arquivo)
+
+    # Os relatórios são gerados com todas as publicações e não valem com as duplicatas colapsadas
+    relatorios = None if COLAPSAR_DUPLICATAS else obter_relatorios(caminho_arquivo, versao_dados)
+
+    # A nuvem de palavras soma as contagens pré-calculadas dos grupos (dia, tipo,
+    # emoção) que atendem aos filtros, sem tokenizar os textos a cada interação
+    def obter_indice_palavras():
+        # Também chamada nas tarefas em segundo plano: não pode usar o Streamlit
+        if BACKEND == "duckdb":
+            return dados
+        return conjunto.indice_palavras(motor_agregacao)
+
+    # Período da série "Frequência por tipo de discurso", reagrupado a partir das contagens diárias
+    granularidade = GRANULARIDADE_PADRAO
+    if "Frequência por tipo de discurso" in visualizacoes:
+        rotulo_granularidade = st.selectbox(
+            "Agrupar a frequência por tipo de discurso por",
+            list(GRANULARIDADES),
+            index=list(GRANULARIDADES.values()).index(GRANULARIDADE_PADRAO),
+            key="granularidade",
+        )
+        granularidade = GRANULARIDADES[rotulo_granularidade]
+
+    # Tamanho do ranking de "Frequência por usuário"
+    quantidade_usuarios = QUANTIDADE_USUARIOS_PADRAO
+    if "Frequência por usuário" in visualizacoes:
+        quantidade_usuarios = int(st.number_input(
+            "Quantidade de usuários no ranking",
+            min_value=1,
+            max_value=100,
+            value=QUANTIDADE_USUARIOS_PADRAO,
+            key="quantidade_usuarios",
+        ))
+
+    contexto_visoes = ContextoVisoes(
+        fatia_cubo, obter_indice_palavras,
+        data_inicio, data_fim, filtro_discurso, filtro_emocao, granularidade, quantidade_usuarios,
     )
 
-    # Aplicar estilo customizado
-    aplicar_estilo(fig_visualizacoes_tipo)
-    st.plotly_chart(fig_visualizacoes_tipo)
+    # As visões pesadas (série temporal e nuvem de palavras) são construídas em
+    # segundo plano enquanto as leves são exibidas; cada uma aparece no seu lugar
+    # quando fica pronta. Se os filtros mudarem antes disso, as tarefas que nenhuma
+    # sessão espera mais são canceladas (renderizacao.py)
+    @st.cache_resource(show_spinner=False)
+    def obter_executor_visoes():
+        return ExecutorVisoes()
 
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud, STOPWORDS
-import streamlit as st
+    executor_visoes = obter_executor_visoes()
+    id_sessao = st.session_state.setdefault("id_sessao", uuid.uuid4().hex)
 
-if "Palavras Mais Comuns" in visualizacoes:
-    # Filtrar os dados para excluir os que não são discurso de ódio
-    if "resultado_analise" in data_filtered.columns and "texto" in data_filtered.columns:
-        data_odio = data_filtered[data_filtered["resultado_analise"] != "não é discurso de ódio"]
-
-        if not data_odio.empty:
-            # Definir as stopwords
-            stop_words = set(STOPWORDS)
-            stop_words.update([
-                "de", "como", "por", "mais", "quando", "se", "ele", "pra", "isso", "da", 
-                "para", "com", "que", "em", "é", "e", "o", "a", "os", "como", "um", "uma", 
-                "na", "no", "não", "mas", "ela", "eu", "você", "vocês", "nós", "eles", "elas", 
-                "meu", "minha", "meus", "minhas", "teu", "tua", "teus", "tuas", "dele", "dela", 
-                "deles", "delas", "esse", "essa", "esses", "essas", "este", "esta", "estes", 
-                "estas", "aquele", "aquela", "aqueles", "aquelas", "lhe", "lhes", "do", "dos", 
-                "das", "num", "numa", "neste", "nesta", "nisto", "naquele", "naquela", "nisso", 
-                "daquilo", "e", "ou", "onde", "porque", "porquê", "lá", "aqui", "ali", "assim", 
-                "tão", "já", "então", "também", "muito", "pouco", "sempre", "tudo", "nada", 
-                "cada", "todos", "todas", "algum", "alguma", "nenhum", "nenhuma", "outro", 
-                "outra", "outros", "outras", "seu", "sua", "seus", "suas", "me", "te", "nos", 
-                "vos", "depois", "antes", "até", "ainda", "hoje", "ontem", "amanhã", "agora", 
-                "lá", "cá", "sim", "não", "pois", "porém", "como", "sobre", "entre", "contra", 
-                "sem", "baixo", "apenas", "mesmo", "era", "só", "coisa", "ser", "pessoa", "pai", 
-                "cara", "tem", "bem", "foi", "pessoas", "ser", "sou", "ano", "vc", "queria", 
-                "gente", "ao", "disse", "nunca", "sempre", "casa", "tempo", "nem", "mim", "q", 
-                "que", "pq", "mãe", "mulher", "sala", "dia", "estava", "tenho", "vai", "começou", 
-                "fazer", "são", "amigo", "namorada", "anos", "ter", "enquanto", "homem", "aí", 
-                "tinha", "vida", "estou", "grupo", "coisas", "fui"
-            ])
-
-            # Combinar os textos para gerar a nuvem de palavras
-            textos = " ".join(data_odio["texto"])  # Supondo que 'texto' seja a coluna com as postagens
-
-            # Gerar a nuvem de palavras
-            if textos.strip():
-                wordcloud = WordCloud(
-                    background_color="black", 
-                    stopwords=stop_words,
-                    colormap="coolwarm",
-                    width=800,
-                    height=400
-                ).generate(textos)
-
-                # Criar o gráfico
-                fig6, ax = plt.subplots(figsize=(10, 5))
-
-                # Configurar fundo e nuvem de palavras
-                fig6.patch.set_facecolor("black")
-                ax.imshow(wordcloud, interpolation="bilinear")
-                ax.axis("off")
-
-                # Configurar o título
-                ax.set_title(
-                    "Palavras Mais Comuns em Discurso de Ódio", 
-                    fontsize=18, 
-                    color="white", 
-                    fontfamily="Arial", 
-                    loc="left"
-                )
-
-                # Ajustar margens para alinhamento
-                fig6.subplots_adjust(top=0.85)
-
-                # Exibir no Streamlit
-                st.pyplot(fig6, use_container_width=True)
-            else:
-                st.write("Nenhum texto disponível para gerar a nuvem de palavras.")
+    def exibir_figura(espaco, visao, conteudo):
+        if visao.tipo == "plotly":
+            espaco.plotly_chart(desserializar_plotly(conteudo))
         else:
-            st.write("Não há dados de discurso de ódio para gerar a nuvem de palavras.")
-    else:
-        st.write("A coluna 'resultado_analise' ou 'texto' não existe no DataFrame.")
-
-if "Frequência por usuário" in visualizacoes:
-    # Filtrar dados para incluir apenas discursos de ódio
-    data_usuarios = data_filtered[data_filtered["resultado_analise"] != "não é discurso de ódio"]
-
-    # Calcular a frequência de postagens por usuário e pegar os 5 mais ativos
-    frequencia_postagens = (
-        data_usuarios.groupby("usuario")
-        .size()
-        .reset_index(name="quantidade_postagens")
-        .sort_values(by="quantidade_postagens", ascending=False)
-        .head(5)  # Exibir os 5 usuários mais ativos
-    )
-
-    # Criar o gráfico de barras
-    fig_frequencia = px.bar(
-        frequencia_postagens,
-        x="usuario",
-        y="quantidade_postagens",
-        title="Top 5 Usuários que Mais Publicaram Discursos de Ódio",
-        labels={"usuario": "Usuário", "quantidade_postagens": "Quantidade de Postagens"},
-        text_auto=True,
-    )
-
-    # Estilo do gráfico
-    fig_frequencia.update_traces(marker_color="pink")
-    fig_frequencia.update_layout(
-        plot_bgcolor="black",
-        paper_bgcolor="black",
-        font=dict(color="white"),
-        xaxis=dict(title="Usuários", showgrid=False),
-        yaxis=dict(title="Frequência de Postagens", showgrid=True, gridcolor="gray"),
-        title=dict(font=dict(size=20)),
-    )
-    
-    # Aplicar estilo adicional, se necessário
-    aplicar_estilo(fig_frequencia)
-    
-    # Exibir o gráfico
-    st.plotly_chart(fig_frequencia)
-
-# Quantidade de Respostas por Tipo de Discurso
-if "Quantidade de Comentários" in visualizacoes:
-    # Filtrar dados para discursos de ódio
-    data_respostas = data_filtered[data_filtered["resultado_analise"] != "não é discurso de ódio"]
-
-    respostas_por_tipo = data_respostas.groupby("resultado_analise")["comentarios"].sum().reset_index()
-
-    fig_respostas_tipo = px.bar(
-        respostas_por_tipo,
-        x="resultado_analise",
-        y="comentarios",
-        title="Quantidade de Comentários por Tipo de Discurso de Ódio",
-        labels={"resultado_analise": "Tipo de Discurso de Ódio", "comentarios": "Total de Comentários"}
-    )
-    aplicar_estilo(fig_respostas_tipo)
-    st.plotly_chart(fig_respostas_tipo)
-
-
-    # Nota de rodapé
-    st.write("""
-    ---
-    Criado por: Isabelly Barbosa Gonçalves  
-    E-mail: isabelly.barbosa@aluno.ifsp.edu.br  
-    Telefone: (13) 988372120  
-    Instituição de Ensino: Instituto Federal de Educação, Ciência e Tecnologia de São Paulo, Campus Cubatão
-    """)
+            espaco.image(conteudo, use_container_width=True)
+
+    def figura_pronta(visao, chave):
+        # Figura do cache ou dos relatórios pré-calculados, sem calcular nada; devolve
+        # os bytes (ou None) e de onde vieram
+        conteudo = cache_figuras.buscar(chave)
+        if conteudo is not None:
+            return conteudo, "cache"
+        if relatorios is None:
+            return None, "relatorio"
+        formato = "json" if visao.tipo == "plotly" else "png"
+        conteudo = relatorios.buscar(data_inicio, data_fim, filtro_discurso, filtro_emocao, chave[-1], formato)
+        if conteudo is not None:
+            cache_figuras.guardar(chave, conteudo)
+        return conteudo, "relatorio"
+
+    selecionadas = [visao for visao in VISOES if visao.nome in visualizacoes]
+    chaves_figuras = {
+        visao.id: chave_figura(versao_dados, data_inicio, data_fim, filtro_discurso, filtro_emocao,
+                               id_figura(visao, contexto_visoes))
+        for visao in selecionadas
+    }
+    # Tarefas pedidas por renderizações anteriores desta sessão que não servem mais
+    executor_visoes.liberar(id_sessao, manter=set(chaves_figuras.values()))
+
+    # Um espaço por visão, na ordem de exibição; as pesadas que não estão prontas
+    # começam a ser calculadas antes das leves
+    espacos = {visao.id: st.empty() for visao in selecionadas}
+    pendentes = {}
+    for visao in selecionadas:
+        if not visao.pesada:
+            continue
+        inicio = time.perf_counter()
+        try:
+            conteudo, origem = figura_pronta(visao, chaves_figuras[visao.id])
+        except SemDados as aviso:
+            espacos[visao.id].write(str(aviso))
+            continue
+        if conteudo is None:
+            pendentes[visao.id] = executor_visoes.submeter(
+                chaves_figuras[visao.id], visao, contexto_visoes, cache_figuras, id_sessao
+            )
+            espacos[visao.id].info(f"Carregando {visao.nome}...")
+            continue
+        exibir_figura(espacos[visao.id], visao, conteudo)
+        rastreador.registrar(visao.id, (time.perf_counter() - inicio) * 1000, origem=origem)
+
+    for visao in selecionadas:
+        if visao.pesada:
+            continue
+        with rastreador.etapa(visao.id) as etapa:
+            try:
+                conteudo, etapa.atributos["origem"] = figura_pronta(visao, chaves_figuras[visao.id])
+                if conteudo is None:
+                    etapa.atributos["origem"] = "calculo"
+                    conteudo, medidas = construir_figura(visao, contexto_visoes)
+                    etapa.atributos.update(medidas)
+                    cache_figuras.guardar(chaves_figuras[visao.id], conteudo)
+            except SemDados as aviso:
+                espacos[visao.id].write(str(aviso))
+                continue
+            exibir_figura(espacos[visao.id], visao, conteudo)
+
+    # Quantidade de Respostas por Tipo de Discurso
+    if "Quantidade de Comentários" in visualizacoes:
+        # Nota de rodapé
+        st.write("""
+        ---
+        Criado por: Isabelly Barbosa Gonçalves  
+        E-mail: isabelly.barbosa@aluno.ifsp.edu.br  
+        Telefone: (13) 988372120  
+        Instituição de Ensino: Instituto Federal de Educação, Ciência e Tecnologia de São Paulo, Campus Cubatão
+        """)
+
+    # Espera as visões em segundo plano e exibe cada uma assim que fica pronta. O
+    # aviso de carregamento é atualizado a cada meio segundo: cada atualização é um
+    # ponto em que o Streamlit interrompe esta execução se os filtros mudarem
+    inicio_espera = time.perf_counter()
+    while pendentes:
+        concluidas, _ = wait([tarefa.futuro for tarefa in pendentes.values()], timeout=0.5,
+                             return_when=FIRST_COMPLETED)
+        for id_visao, tarefa in list(pendentes.items()):
+            visao = VISOES_POR_ID[id_visao]
+            if tarefa.futuro not in concluidas:
+                espacos[id_visao].info(f"Carregando {visao.nome}... {time.perf_counter() - inicio_espera:.0f} s")
+                continue
+            del pendentes[id_visao]
+            duracao_ms = (time.perf_counter() - tarefa.inicio) * 1000
+            rastreador.registrar(id_visao, duracao_ms, origem="segundo_plano", **tarefa.medidas)
+            try:
+                exibir_figura(espacos[id_visao], visao, tarefa.futuro.result())
+            except SemDados as aviso:
+                espacos[id_visao].write(str(aviso))
+
+# Painel de desempenho só com ?debug=1
+if st.query_params.get("debug") == "1":
+    with st.expander("Desempenho desta renderização", expanded=True):
+        st.dataframe(pd.DataFrame(rastreador.tabela()), use_container_width=True)
+        st.text(f"Total: {rastreador.duracao_total_ms:.1f} ms")
+        st.json(cache_figuras.estatisticas())
+        if BACKEND != "duckdb":
+            st.text(f"Conjunto compartilhado: {obter_conjunto(caminho_arquivo).memoria_mb():.1f} MB")
@@ -0,0 +1,89 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregados import FiltrosPainel, comparar_com_cubo, resumir_csv_em_blocos
+from cubo import GRANULARIDADES, CuboAgregado, tabela_frequencia_tipo
+from dados import NAO_E_DISCURSO_ODIO, ler_publicacoes, ler_textos
+
+DISCURSOS = [NAO_E_DISCURSO_ODIO, "racismo", "homofobia", "machismo"]
+EMOCOES = ["raiva", "tristeza", "medo"]
+PALAVRAS = ["ódio", "odio", "gente", "cidade", "respeito", "discurso", "Rua", "rua"]
+
+
+def escrever_publicacoes(caminho, linhas=60, semente=0):
+    # Poucos dias, usuários e categorias, com as linhas em ordem cronológica, para
+    # que vários blocos pequenos seguidos caiam no mesmo dia e na mesma categoria
+    rng = np.random.default_rng(semente)
+    dias = np.sort(rng.integers(0, 12, linhas))
+    dados = pd.DataFrame({
+        "id": [f"p{i}" for i in range(linhas)],
+        "usuario": [f"usuario_{u}" for u in rng.integers(0, 6, linhas)],
+        "texto": [" ".join(rng.choice(PALAVRAS, rng.integers(0, 6))) for _ in range(linhas)],
+        "upvotes": rng.integers(0, 50, linhas),
+        "comentarios": rng.integers(0, 10, linhas),
+        "compartilhamentos": rng.integers(0, 5, linhas),
+        "visualizacoes": rng.integers(0, 500, linhas),
+        "hora_postagem": [
+            (dt.datetime(2023, 12, 28) + dt.timedelta(days=int(d), hours=int(h))).isoformat(sep=" ")
+            for d, h in zip(dias, rng.integers(0, 24, linhas))
+        ],
+        "resultado_analise": rng.choice(DISCURSOS[:2], linhas, p=[0.3, 0.7]),
+        "emocao": rng.choice(EMOCOES, linhas),
+    })
+    # Algumas linhas com os outros tipos, sem data e sem emoção
+    dados.loc[5:8, "resultado_analise"] = DISCURSOS[2]
+    dados.loc[40:41, "resultado_analise"] = DISCURSOS[3]
+    dados.loc[12, "hora_postagem"] = None
+    dados.loc[20, "emocao"] = None
+    dados.to_csv(caminho, index=False)
+    return caminho
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    return escrever_publicacoes(str(tmp_path / "publicacoes.csv"))
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 2, 3, 7, 1000])
+def test_blocos_iguais_ao_cubo(arquivo, tamanho_bloco):
+    resumo = resumir_csv_em_blocos(arquivo, tamanho_bloco=tamanho_bloco)
+    assert comparar_com_cubo(resumo, ler_publicacoes(arquivo), ler_textos(arquivo)) == []
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 4])
+def test_blocos_com_filtros(arquivo, tamanho_bloco):
+    filtros = FiltrosPainel(dt.date(2023, 12, 30), dt.date(2024, 1, 4), DISCURSOS[:3], EMOCOES[:2])
+    resumo = resumir_csv_em_blocos(arquivo, filtros, tamanho_bloco)
+    assert comparar_com_cubo(resumo, ler_publicacoes(arquivo), ler_textos(arquivo), filtros) == []
+
+
+@pytest.mark.parametrize("granularidade", list(GRANULARIDADES.values()))
+def test_series_por_periodo(arquivo, granularidade):
+    # Os dias cruzam a virada do ano, então semanas e meses ficam divididos entre blocos
+    dados = ler_publicacoes(arquivo)
+    fatia = CuboAgregado(dados).fatiar(dt.date(2023, 1, 1), dt.date(2024, 12, 31), DISCURSOS, EMOCOES)
+    esperada = tabela_frequencia_tipo(fatia, granularidade)
+    obtida = resumir_csv_em_blocos(arquivo, tamanho_bloco=5).tabela_frequencia_tipo(granularidade)
+    assert obtida.astype(str).to_numpy().tolist() == esperada.astype(str).to_numpy().tolist()
+
+
+def test_contagens_iguais_ao_groupby(arquivo):
+    # Referência independente do cubo: groupby do pandas sobre o CSV inteiro
+    dados = pd.read_csv(arquivo).dropna(subset=["hora_postagem", "resultado_analise", "emocao"])
+    resumo = resumir_csv_em_blocos(arquivo, tamanho_bloco=3)
+    tipos = resumo.tabela_tipos_discurso().set_index("Tipo de Discurso")["Quantidade"]
+    assert tipos.to_dict() == dados["resultado_analise"].value_counts().to_dict()
+    odio = dados[dados["resultado_analise"] != NAO_E_DISCURSO_ODIO]
+    comentarios = resumo.tabela_comentarios().set_index("resultado_analise")["comentarios"]
+    assert comentarios.to_dict() == odio.groupby("resultado_analise")["comentarios"].sum().to_dict()
+
+
+def test_detecta_diferenca(arquivo):
+    resumo = resumir_csv_em_blocos(arquivo, tamanho_bloco=4)
+    resumo.por_discurso["upvotes"]["racismo"] += 1
+    resumo.palavras_odio["gente"] += 1
+    diferentes = comparar_com_cubo(resumo, ler_publicacoes(arquivo), ler_textos(arquivo))
+    assert diferentes == ["tabela_media_likes", "palavras_odio"]
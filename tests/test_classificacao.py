@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+import classificacao
+from classificacao import (
+    Classificador,
+    ClassificadorLocal,
+    LimitadorTaxa,
+    classificar_arquivo,
+    classificar_com_tentativas,
+    classificar_em_lotes,
+)
+
+TEXTOS = [
+    "que macaco",
+    "bom dia a todos",
+    "lugar de mulher é na cozinha",
+    "Viado",
+    "a cidade está linda",
+    "bom dia a todos",
+    "nordestino burro",
+]
+
+
+class ClassificadorInstavel(ClassificadorLocal):
+    # Falha nas `falhas` primeiras chamadas e depois responde como o backend local
+    nome = "instavel"
+
+    def __init__(self, falhas=0):
+        self.falhas = falhas
+        self.chamadas = []
+
+    async def classificar_lote(self, textos):
+        self.chamadas.append((time.monotonic(), list(textos)))
+        if len(self.chamadas) <= self.falhas:
+            raise RuntimeError("serviço indisponível")
+        return await super().classificar_lote(textos)
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    # Registra as esperas pedidas ao asyncio.sleep em vez de dormir
+    registradas = []
+
+    async def dormir(segundos):
+        registradas.append(segundos)
+
+    monkeypatch.setattr(classificacao.asyncio, "sleep", dormir)
+    monkeypatch.setattr(classificacao.random, "random", lambda: 0.0)
+    return registradas
+
+
+async def coletar(publicacoes, classificador, **opcoes):
+    return [(lote, resultados) async for lote, resultados in classificar_em_lotes(publicacoes, classificador, **opcoes)]
+
+
+def test_classificador_exige_classificar_lote():
+    with pytest.raises(TypeError):
+        Classificador()
+
+
+def test_lotes_cobrem_todas_as_publicacoes():
+    publicacoes = pd.DataFrame({"texto": TEXTOS})
+    classificador = ClassificadorInstavel()
+    lotes = asyncio.run(coletar(publicacoes, classificador, tamanho_lote=3, requisicoes_por_minuto=0))
+
+    assert sorted(len(lote) for lote, _ in lotes) == [1, 3, 3]
+    assert sorted(len(textos) for _, textos in classificador.chamadas) == [1, 3, 3]
+    resultados = {}
+    for lote, resultados_lote in lotes:
+        assert len(resultados_lote) == len(lote)
+        resultados.update(zip(lote.index, resultados_lote))
+    tipos = [resultados[i]["resultado_analise"] for i in range(len(TEXTOS))]
+    assert tipos == ["racismo", "não é discurso de ódio", "machismo", "homofobia",
+                     "não é discurso de ódio", "não é discurso de ódio", "xenofobia"]
+
+
+def test_nova_tentativa_com_espera_exponencial(esperas):
+    classificador = ClassificadorInstavel(falhas=3)
+    resultados = asyncio.run(classificar_com_tentativas(
+        classificador, TEXTOS[:2], LimitadorTaxa(0), tentativas=5, espera_inicial=0.5
+    ))
+
+    assert len(classificador.chamadas) == 4
+    assert esperas == [0.5, 1.0, 2.0]
+    assert [r["resultado_analise"] for r in resultados] == ["racismo", "não é discurso de ódio"]
+
+
+def test_falha_em_todas_as_tentativas(esperas):
+    classificador = ClassificadorInstavel(falhas=3)
+    with pytest.raises(RuntimeError):
+        asyncio.run(classificar_com_tentativas(classificador, TEXTOS[:2], LimitadorTaxa(0), tentativas=3))
+    assert len(classificador.chamadas) == 3
+    assert esperas == [1.0, 2.0]
+
+
+def test_lote_sem_sucesso_fica_de_fora(esperas, caplog):
+    # O primeiro lote esgota as tentativas; os demais são classificados
+    publicacoes = pd.DataFrame({"texto": TEXTOS})
+    classificador = ClassificadorInstavel(falhas=2)
+    lotes = asyncio.run(coletar(publicacoes, classificador, tamanho_lote=3, concorrencia=1,
+                                requisicoes_por_minuto=0, tentativas=2))
+
+    assert sorted(len(lote) for lote, _ in lotes) == [1, 3]
+    assert "não classificado" in caplog.text
+
+
+def test_limite_de_requisicoes_por_minuto():
+    publicacoes = pd.DataFrame({"texto": TEXTOS})
+    classificador = ClassificadorInstavel()
+    asyncio.run(coletar(publicacoes, classificador, tamanho_lote=1, concorrencia=4, requisicoes_por_minuto=1200))
+
+    envios = sorted(instante for instante, _ in classificador.chamadas)
+    intervalos = [b - a for a, b in zip(envios, envios[1:])]
+    assert len(envios) == len(TEXTOS)
+    # 1200 requisições por minuto: uma a cada 50 ms, mesmo com 4 lotes simultâneos
+    assert min(intervalos) >= 0.045
+
+
+def test_classificar_arquivo_retoma_e_reaproveita_textos(tmp_path):
+    entrada = str(tmp_path / "publicacoes.csv")
+    saida = str(tmp_path / "analisadas.csv")
+    pd.DataFrame({"id": [f"p{i}" for i in range(len(TEXTOS))], "texto": TEXTOS}).to_csv(entrada, index=False)
+    pd.DataFrame({"id": ["p0"], "texto": [TEXTOS[0]], "resultado_analise": ["racismo"],
+                  "emocao": ["raiva"]}).to_csv(saida, index=False)
+    classificador = ClassificadorInstavel()
+
+    total = asyncio.run(classificar_arquivo(entrada, saida, classificador, tamanho_lote=2,
+                                            requisicoes_por_minuto=0))
+
+    # p0 já estava na saída e o texto repetido de p5 só é enviado uma vez
+    assert total == len(TEXTOS) - 1
+    assert sum(len(textos) for _, textos in classificador.chamadas) == len(TEXTOS) - 2
+    analisadas = pd.read_csv(saida).set_index("id")
+    assert sorted(analisadas.index) == [f"p{i}" for i in range(len(TEXTOS))]
+    assert analisadas.loc["p5", "resultado_analise"] == analisadas.loc["p1", "resultado_analise"]
+    assert analisadas.loc["p6", "resultado_analise"] == "xenofobia"
+
+
+def test_classificar_arquivo_segue_cabecalho_da_saida(tmp_path):
+    # A saída existente tem outra ordem de colunas e uma coluna que a entrada não tem
+    entrada = str(tmp_path / "publicacoes.csv")
+    saida = str(tmp_path / "analisadas.csv")
+    pd.DataFrame({"id": ["p0", "p1"], "usuario": ["ana", "bia"], "texto": TEXTOS[:2]}).to_csv(entrada, index=False)
+    pd.DataFrame({"emocao": ["raiva"], "link": ["https://exemplo/p0"], "id": ["p0"], "texto": [TEXTOS[0]],
+                  "resultado_analise": ["racismo"]}).to_csv(saida, index=False)
+
+    asyncio.run(classificar_arquivo(entrada, saida, ClassificadorInstavel(), requisicoes_por_minuto=0))
+
+    analisadas = pd.read_csv(saida, dtype=str)
+    assert list(analisadas.columns) == ["emocao", "link", "id", "texto", "resultado_analise"]
+    nova = analisadas.set_index("id").loc["p1"]
+    assert nova["texto"] == TEXTOS[1]
+    assert nova["resultado_analise"] == "não é discurso de ódio"
+    assert pd.isna(nova["link"])
@@ -0,0 +1,43 @@
+import datetime as dt
+import os
+
+import numpy as np
+import pytest
+
+from dados import COLUNAS_PAINEL, converter_para_colunar, ler_publicacoes, ler_textos
+from test_agregados import escrever_publicacoes
+
+pytest.importorskip("duckdb")
+
+from consulta_duckdb import FonteDuckDB, comparar_com_pandas  # noqa: E402
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def arquivo(tmp_path, request):
+    caminho = escrever_publicacoes(str(tmp_path / "publicacoes.csv"))
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+        return converter_para_colunar(caminho)
+    return caminho
+
+
+def test_tabelas_iguais_ao_pandas(arquivo):
+    assert comparar_com_pandas(arquivo, dt.date(2023, 1, 1), dt.date(2024, 12, 31)) == []
+
+
+def test_textos_ficam_fora_do_banco(arquivo):
+    fonte = FonteDuckDB(arquivo)
+    colunas = fonte.consultar("SELECT column_name FROM information_schema.columns WHERE table_name = 'publicacoes'")
+    assert "texto" not in colunas["column_name"].tolist()
+    banco, = fonte.consultar("SELECT path FROM duckdb_databases() WHERE database_name = current_database()")["path"]
+    assert os.path.exists(banco)
+
+    dados = ler_publicacoes(arquivo, COLUNAS_PAINEL)
+    posicoes = np.array([7, 0, 31, 12, 59])
+    pagina = fonte.linhas(posicoes, ["usuario", "texto"])
+    assert pagina.index.tolist() == dados.index[posicoes].tolist()
+    assert pagina["texto"].fillna("").tolist() == ler_textos(arquivo).loc[pagina.index].fillna("").tolist()
+    assert pagina["usuario"].tolist() == dados["usuario"].iloc[posicoes].astype(str).tolist()
+
+    fonte.fechar()
+    assert not os.path.exists(banco)
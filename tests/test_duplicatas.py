@@ -0,0 +1,34 @@
+import numpy as np
+
+import duplicatas
+from duplicatas import IndiceDuplicatas
+
+BASE = ("a coleta das publicações do fórum reuniu relatos de moradores sobre o bairro e a "
+        "segurança das ruas durante a noite com muitos detalhes sobre horários linhas de ônibus "
+        "iluminação pública e a presença de policiamento em cada esquina da região central")
+
+
+def test_candidatos_sao_todo_o_balde(tmp_path, monkeypatch):
+    # Todas as publicações caem no mesmo balde de todas as faixas; a quase
+    # duplicata de D é o membro do meio, e não o primeiro nem o anterior a D
+    monkeypatch.setattr(duplicatas, "chaves_faixas",
+                        lambda assinaturas: np.zeros((len(assinaturas), duplicatas.FAIXAS), dtype=np.int64))
+    indice = IndiceDuplicatas(str(tmp_path / "duplicatas.sqlite3"))
+    indice.adicionar(["A", "B", "C"], [
+        "texto completamente diferente sobre futebol campeonato estadual e a final de domingo no estádio",
+        BASE,
+        "outro assunto sem relação nenhuma receitas de bolo de cenoura com cobertura de chocolate",
+    ])
+    indice.adicionar(["D"], [BASE.replace("central", "centro")])
+
+    grupos = indice.grupos(["A", "B", "C", "D"])
+    assert grupos["D"] == "B"
+    assert grupos[["A", "B", "C"]].tolist() == ["A", "B", "C"]
+    indice.fechar()
+
+
+def test_mesmo_lote(tmp_path):
+    indice = IndiceDuplicatas(str(tmp_path / "duplicatas.sqlite3"))
+    indice.adicionar(["A", "B", "C"], [BASE, "um texto curto qualquer sobre outro tema", BASE + " fim"])
+    assert indice.grupos(["A", "B", "C"]).tolist() == ["A", "B", "A"]
+    indice.fechar()
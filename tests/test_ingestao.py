@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from busca import IndiceBusca
+from dados import COLUNAS_PAINEL, ler_publicacoes, ler_textos
+from ingestao import ConjuntoIncremental, ingerir
+from palavras import IndicePalavras
+from test_agregados import DISCURSOS, EMOCOES, escrever_publicacoes
+
+
+def congelar_palavras(indice):
+    return {dia: {chave: dict(c) for chave, c in grupos.items()} for dia, grupos in indice.grupos.items()}
+
+
+def congelar_busca(indice):
+    return {termo: list(linhas) for termo, linhas in indice.linhas.items()}, list(indice.vocabulario)
+
+
+def test_acrescimo_nao_altera_indices_em_uso(tmp_path):
+    todas = pd.read_csv(escrever_publicacoes(str(tmp_path / "todas.csv")))
+    caminho = str(tmp_path / "publicacoes.csv")
+    todas.iloc[:40].to_csv(caminho, index=False)
+    conjunto = ConjuntoIncremental(caminho, COLUNAS_PAINEL)
+    palavras = conjunto.indice_palavras()
+    busca = conjunto.indice_busca()
+    antes = congelar_palavras(palavras), congelar_busca(busca)
+
+    ingerir(caminho, todas.iloc[40:])
+    # Garante uma versão diferente mesmo com a mesma data de modificação
+    os.utime(caminho, ns=(os.stat(caminho).st_atime_ns, os.stat(caminho).st_mtime_ns + 1))
+    conjunto.atualizar()
+    # Só o trecho novo foi lido: os índices foram atualizados, não descartados
+    assert conjunto.indice is not None and conjunto.busca is not None
+
+    # Quem já tinha os índices continua vendo o estado anterior, intacto
+    assert (congelar_palavras(palavras), congelar_busca(busca)) == antes
+    assert conjunto.indice_palavras() is not palavras and conjunto.indice_busca() is not busca
+
+    # Os índices novos são iguais aos montados do zero com o arquivo completo
+    dados, textos = ler_publicacoes(caminho, COLUNAS_PAINEL), ler_textos(caminho)
+    assert congelar_palavras(conjunto.indice_palavras()) == congelar_palavras(IndicePalavras.construir(dados, textos))
+    assert congelar_busca(conjunto.indice_busca()) == congelar_busca(IndiceBusca.construir(textos))
+    limites = (dados["hora_postagem"].min(), dados["hora_postagem"].max())
+    assert conjunto.indice_palavras().frequencias(*limites, DISCURSOS, EMOCOES) == \
+        IndicePalavras.construir(dados, textos).frequencias(*limites, DISCURSOS, EMOCOES)
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from busca import IndiceBusca, indexar_particao
+from paralelo import MotorAgregacao
+
+
+@pytest.fixture
+def motor():
+    motor = MotorAgregacao(2, linhas_minimas=4)
+    yield motor
+    motor.fechar()
+
+
+def test_processos_por_padrao(motor, monkeypatch):
+    monkeypatch.delenv("ANALISE_EXECUTOR", raising=False)
+    assert MotorAgregacao(2).tipo_executor == "processos"
+
+
+def test_indice_em_paralelo_igual_ao_serial(motor):
+    textos = pd.Series([f"discurso de ódio {i % 3} na rua" for i in range(40)], index=range(100, 140))
+    paralelo = IndiceBusca.construir(textos, motor)
+    serial = IndiceBusca.construir(textos)
+    assert {t: list(l) for t, l in paralelo.linhas.items()} == {t: list(l) for t, l in serial.linhas.items()}
+    assert paralelo.vocabulario == serial.vocabulario
+
+
+def test_erro_da_tarefa_nao_desativa_o_paralelismo(motor):
+    # Um erro dentro da tarefa chega a quem chamou e o motor continua paralelo
+    particoes = motor.particionar(pd.Series(["texto"] * 4 + [5] * 4))
+    with pytest.raises(AttributeError):
+        motor.mapear(indexar_particao, particoes)
+    assert not motor.serial
+    assert len(motor.mapear(indexar_particao, motor.particionar(pd.Series(["a b"] * 8)))) == 2
@@ -0,0 +1,150 @@
+# Registro das visualizações do painel. Cada visão sabe calcular sua tabela a
+# partir do contexto (fatia do cubo e índice de palavras) e montar a figura a
+# partir dessa tabela, de forma independente do Streamlit; o app e o gerador de
+# relatórios (relatorios.py) percorrem o mesmo registro.
+import datetime as dt
+from collections import namedtuple
+
+import pandas as pd
+
+from agregados import mais_frequentes
+from cubo import (
+    GRANULARIDADE_PADRAO,
+    QUANTIDADE_USUARIOS_PADRAO,
+    tabela_comentarios,
+    tabela_emocoes,
+    tabela_frequencia_tipo,
+    tabela_frequencia_usuario,
+    tabela_media_likes,
+    tabela_tipos_discurso,
+    tabela_visualizacoes,
+)
+from dados import NAO_E_DISCURSO_ODIO
+from graficos import (
+    figura_comentarios,
+    figura_discurso_odio,
+    figura_emocoes,
+    figura_frequencia_tipo,
+    figura_frequencia_usuario,
+    figura_media_likes,
+    figura_nuvem_palavras,
+    figura_tipos_discurso,
+    figura_visualizacoes,
+)
+
+# Período exibido quando o app é aberto
+DATA_INICIO_PADRAO = dt.date(2017, 9, 1)
+DATA_FIM_PADRAO = dt.date(2024, 12, 31)
+
+
+class SemDados(Exception):
+    # A visão não tem o que exibir com os filtros atuais; a mensagem é mostrada ao usuário
+    pass
+
+
+# fatia: FatiaCubo dos filtros ativos; indice_palavras: função que devolve o
+# IndicePalavras (chamada apenas pela nuvem de palavras); granularidade: período
+# da série temporal (cubo.GRANULARIDADES); quantidade_usuarios: tamanho do
+# ranking de "Frequência por usuário"
+ContextoVisoes = namedtuple(
+    "ContextoVisoes",
+    ["fatia", "indice_palavras", "data_inicio", "data_fim", "filtro_discurso", "filtro_emocao", "granularidade",
+     "quantidade_usuarios"],
+    defaults=[GRANULARIDADE_PADRAO, QUANTIDADE_USUARIOS_PADRAO],
+)
+
+# tipo: "plotly" ou "png" (Matplotlib); pesada: construída em segundo plano no
+# app (renderizacao.py), depois das visões leves
+Visao = namedtuple("Visao", ["id", "nome", "tipo", "tabela", "figura", "pesada"], defaults=[False])
+
+
+def tabela_discurso_odio(contexto):
+    return contexto.fatia.contagem_odio().rename_axis("eh_discurso_odio").reset_index(name="count")
+
+
+def figura_discurso_odio_tabela(tabela):
+    return figura_discurso_odio(tabela.set_index("eh_discurso_odio")["count"])
+
+
+def tabela_likes(contexto):
+    if len(contexto.fatia) == 0:
+        raise SemDados("Não há dados de upvotes para os tipos de discurso de ódio.")
+    return tabela_media_likes(contexto.fatia)
+
+
+def tabela_palavras(contexto):
+    if contexto.fatia.somente_odio().valores("contagem").sum() == 0:
+        raise SemDados("Não há dados de discurso de ódio para gerar a nuvem de palavras.")
+    # Excluir os que não são discurso de ódio
+    discursos_odio = [tipo for tipo in contexto.filtro_discurso if tipo != NAO_E_DISCURSO_ODIO]
+    frequencias = contexto.indice_palavras().frequencias(
+        contexto.data_inicio, contexto.data_fim, discursos_odio, contexto.filtro_emocao
+    )
+    if not frequencias:
+        raise SemDados("Nenhum texto disponível para gerar a nuvem de palavras.")
+    # Empates em ordem alfabética: a tabela não depende da ordem de contagem
+    return pd.DataFrame(mais_frequentes(frequencias, len(frequencias)), columns=["palavra", "frequencia"])
+
+
+def figura_palavras_tabela(tabela):
+    return figura_nuvem_palavras(dict(zip(tabela["palavra"], tabela["frequencia"])))
+
+
+def tabela_frequencia_periodo(contexto):
+    return tabela_frequencia_tipo(contexto.fatia, contexto.granularidade)
+
+
+def tabela_usuarios(contexto):
+    return tabela_frequencia_usuario(contexto.fatia, contexto.quantidade_usuarios)
+
+
+def de_fatia(funcao):
+    # Adapta as funções tabela_* de cubo.py, que recebem apenas a fatia
+    return lambda contexto: funcao(contexto.fatia)
+
+
+# Na ordem em que os gráficos aparecem no app
+VISOES = [
+    Visao("discurso_odio", "Discurso (Ódio/Não Ódio)", "plotly", tabela_discurso_odio, figura_discurso_odio_tabela),
+    Visao("tipos_discurso", "Tipos de Discurso de Ódio", "plotly", de_fatia(tabela_tipos_discurso), figura_tipos_discurso),
+    Visao("emocoes", "Emoções", "plotly", de_fatia(tabela_emocoes), figura_emocoes),
+    Visao("frequencia_tipo", "Frequência por tipo de discurso", "plotly",
+          tabela_frequencia_periodo, figura_frequencia_tipo, pesada=True),
+    Visao("media_likes", "Likes (Upvotes)", "plotly", tabela_likes, figura_media_likes),
+    Visao("visualizacoes", "Visualizações", "plotly", de_fatia(tabela_visualizacoes), figura_visualizacoes),
+    Visao("nuvem_palavras", "Palavras Mais Comuns", "png", tabela_palavras, figura_palavras_tabela, pesada=True),
+    Visao("frequencia_usuario", "Frequência por usuário", "plotly",
+          tabela_usuarios, figura_frequencia_usuario),
+    Visao("comentarios", "Quantidade de Comentários", "plotly", de_fatia(tabela_comentarios), figura_comentarios),
+]
+
+VISOES_POR_ID = {visao.id: visao for visao in VISOES}
+
+# Opções do seletor de visualizações
+OPCOES = [
+    "Discurso (Ódio/Não Ódio)",
+    "Tipos de Discurso de Ódio",
+    "Emoções",
+    "Quantidade de Comentários",
+    "Visualizações",
+    "Likes (Upvotes)",
+    "Frequência por tipo de discurso",
+    "Frequência por usuário",
+    "Palavras Mais Comuns"
+]
+
+
+def id_figura(visao, contexto):
+    # Identifica a figura no cache e nos relatórios; a série temporal tem uma
+    # figura por granularidade e o ranking de usuários uma por quantidade (os
+    # valores padrão mantêm o id da visão)
+    if visao.id == "frequencia_tipo" and contexto.granularidade != GRANULARIDADE_PADRAO:
+        return f"{visao.id}_{contexto.granularidade}"
+    if visao.id == "frequencia_usuario" and contexto.quantidade_usuarios != QUANTIDADE_USUARIOS_PADRAO:
+        return f"{visao.id}_{contexto.quantidade_usuarios}"
+    return visao.id
+
+
+def opcoes_filtro(dados, coluna):
+    # Valores oferecidos nos filtros de tipo de discurso e emoção ("Todos"/"Todas")
+    return list(dados[coluna].dropna().unique())